@@ -34,6 +34,10 @@ else :
 
 import datetime
 import os
+import io
+import itertools
+import threading
+import time
 
 import rdflib
 from rdflib	import URIRef
@@ -51,15 +55,26 @@ else :
 
 import urllib.parse
 
-from pyRdfa.utils import URIOpener
-from pyRdfa       import HTTPError, FailedSource
-
-from pyMicrodata.microdata	import MicrodataConversion
-
 from pySde.options import SDEOptions
+from pySde.limits  import LimitExceeded, StageTimer, read_limited
 
 debug = False
 
+# These used to be imported here; they are still available as module attributes, but the (fairly large) pyRdfa and
+# pyMicrodata packages are now imported only if they are really used (e.g., if the RDFa extractor is switched on)
+_lazy_attributes = {
+	"URIOpener"           : "pyRdfa.utils",
+	"HTTPError"           : "pyRdfa",
+	"FailedSource"        : "pyRdfa",
+	"MicrodataConversion" : "pyMicrodata.microdata",
+}
+
+def __getattr__(name) :
+	if name in _lazy_attributes :
+		import importlib
+		return getattr(importlib.import_module(_lazy_attributes[name]), name)
+	raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
 ns_sde   = Namespace("http://www.w3.org/2012/pySde/vocab#")
 ns_dc    = Namespace("http://purl.org/dc/terms/")
 ns_xsd   = Namespace('http://www.w3.org/2001/XMLSchema#')
@@ -70,15 +85,47 @@ class pySde :
 	"""Main processing class for the distiller
 	@ivar base: the base value for processing
 	@ivar http_status: HTTP Status, to be returned when the package is used via a CGI entry. Initially set to 200, may be modified by exception handlers
+	@ivar fetcher: the fetcher used to retrieve the content of URIs (see the L{fetch} module)
+	@ivar result_cache: cache of the extraction results, or None (see L{cache.ResultCache})
+	@ivar metrics: collector of the processing metrics, or None (see L{metrics.Metrics})
+	@ivar engine: process pool used for the extraction of several sources, or None (see L{engine.ProcessEngine})
+	@ivar vocab_cache: cache of the vocabularies used for the vocabulary expansion, or None for the shared one (see L{vocab.VocabCache})
+
+	The RDFa and microdata processors and the HTML parser are created only once, at their first use, and reused
+	for all subsequent documents; it is therefore more efficient to use the same instance for many documents. An instance
+	should not be used by several threads at the same time, though.
 	"""
 
-	def __init__(self, base = "", options = SDEOptions()) :
+	def __init__(self, base = "", options = SDEOptions(), fetcher = None, result_cache = None, metrics = None, engine = None, vocab_cache = None) :
 		"""
 		@keyword base: URI for the default "base" value (usually the URI of the file to be processed)
+		@keyword fetcher: the fetcher used to retrieve the content of URIs; if None, pyRdfa's C{URIOpener} is used (see L{fetch.URIOpenerFetcher}). A long lived processor (or a set of processors in a long running service) should rather share a L{fetch.PooledHTTPFetcher}, to reuse the connections
+		@keyword result_cache: cache of the extraction results; if set, an input with the same content, base, and options as an earlier one is not parsed again
+		@type result_cache: L{cache.ResultCache}
+		@keyword metrics: collector of the processing metrics; if set, the time spent in each stage is recorded for each source
+		@type metrics: L{metrics.Metrics}
+		@keyword engine: process pool for the extraction; if set, it is used by L{graphs_from_sources} (and hence by L{rdf_from_sources}) whatever the number of workers
+		@type engine: L{engine.ProcessEngine}
+		@keyword vocab_cache: cache of the vocabularies, used if the C{vocab_expansion} option is set; if None, the cache shared by all processors is used (see L{vocab.default_cache})
+		@type vocab_cache: L{vocab.VocabCache}
 		"""
-		self.http_status = 200
-		self.base        = base
-		self.options     = options
+		if fetcher == None :
+			from pySde.fetch import URIOpenerFetcher
+			fetcher = URIOpenerFetcher()
+		self.http_status  = 200
+		self.base         = base
+		self.options      = options
+		self.fetcher      = fetcher
+		self.result_cache = result_cache
+		self.metrics      = metrics
+		self.engine       = engine
+		self.vocab_cache  = vocab_cache
+		self._rdfa        = None
+		self._microdata   = None
+		self._parser      = None
+		# The source being processed, and the metrics recorded for it
+		self._source      = "-"
+		self._stages      = []
 		if options.rdfa == False and options.microdata == False and options.hturtle == False :
 			self.empty = True
 		else :
@@ -96,30 +143,72 @@ class pySde :
 		else :
 			retval = pgraph
 
-		pgraph.bind( "dc","http://purl.org/dc/terms/" )
-		pgraph.bind( "xsd",'http://www.w3.org/2001/XMLSchema#' )
-		pgraph.bind( "ht",'http://www.w3.org/2006/http#' )
-		pgraph.bind( "pySde",'http://www.w3.org/2012/pySde/vocab#' )
+		retval.bind( "dc","http://purl.org/dc/terms/" )
+		retval.bind( "xsd",'http://www.w3.org/2001/XMLSchema#' )
+		retval.bind( "ht",'http://www.w3.org/2006/http#' )
+		retval.bind( "pySde",'http://www.w3.org/2012/pySde/vocab#' )
 
 		bnode = BNode()
-		retval.add((bnode, ns_rdf["type"], ns_micro["Error"]))
+		retval.add((bnode, ns_rdf["type"], ns_sde["Error"]))
 		retval.add((bnode, ns_dc["description"], Literal(full_msg)))
 		retval.add((bnode, ns_dc["date"], Literal(datetime.datetime.utcnow().isoformat(),datatype=ns_xsd["dateTime"])))
 
 		if uri != None :
 			htbnode = BNode()
-			retval.add( (bnode, ns_micro["context"],htbnode) )
+			retval.add( (bnode, ns_sde["context"],htbnode) )
 			retval.add( (htbnode, ns_rdf["type"], ns_ht["Request"]) )
 			retval.add( (htbnode, ns_ht["requestURI"], Literal(uri)) )
 
 		if self.http_status != 200 :
 			htbnode = BNode()
-			retval.add( (bnode, ns_micro["context"],htbnode) )
+			retval.add( (bnode, ns_sde["context"],htbnode) )
 			retval.add( (htbnode, ns_rdf["type"], ns_ht["Response"]) )
 			retval.add( (htbnode, ns_ht["responseCode"], URIRef("http://www.w3.org/2006/http#%s" % self.http_status)) )
 
 		return retval
 
+	def _generate_metrics_graph(self, graph) :
+		"""
+		Add the metrics recorded for the current source to the graph, as provenance triples.
+		@param graph: an RDF Graph
+		"""
+		graph.bind( "dc","http://purl.org/dc/terms/" )
+		graph.bind( "xsd",'http://www.w3.org/2001/XMLSchema#' )
+		graph.bind( "pySde",'http://www.w3.org/2012/pySde/vocab#' )
+
+		bnode = BNode()
+		graph.add((bnode, ns_rdf["type"], ns_sde["Metrics"]))
+		graph.add((bnode, ns_sde["source"], Literal(self._source)))
+		graph.add((bnode, ns_dc["date"], Literal(datetime.datetime.utcnow().isoformat(),datatype=ns_xsd["dateTime"])))
+		for record in self._stages :
+			stage = BNode()
+			graph.add((bnode, ns_sde["stage"], stage))
+			graph.add((stage, ns_sde["name"], Literal(record.stage)))
+			graph.add((stage, ns_sde["seconds"], Literal(record.seconds, datatype=ns_xsd["double"])))
+			graph.add((stage, ns_sde["bytes"], Literal(record.bytes_in)))
+			graph.add((stage, ns_sde["nodes"], Literal(record.nodes)))
+			graph.add((stage, ns_sde["triples"], Literal(record.triples)))
+
+	def _record(self, stage, start, bytes_in = 0, nodes = 0, triples = 0) :
+		"""
+		Record the metrics of a stage for the current source, if metrics are collected at all.
+		@param stage: name of the stage
+		@param start: the value of C{time.perf_counter()} at the start of the stage
+		"""
+		if self.metrics != None :
+			self._stages.append(self.metrics.record(self._source, stage, time.perf_counter() - start, bytes_in, nodes, triples))
+
+	def _check_triples(self, graph, origin) :
+		"""
+		Check the number of triples extracted from the current source against the C{max_triples} option.
+		@param graph: the graph
+		@param origin: the size of the graph before the extraction
+		@raise LimitExceeded: the limit is exceeded
+		"""
+		max_triples = self.options.max_triples
+		if max_triples != None and len(graph) - origin > max_triples :
+			raise LimitExceeded("More than the limit of %s triples have been extracted" % max_triples)
+
 	def _get_input(self, name) :
 		"""
 		Trying to guess whether "name" is a URI, a string; it then tries to open these as such accordingly,
@@ -140,14 +229,143 @@ class pySde :
 			# check if this is a URI, ie, if there is a valid 'scheme' part
 			# otherwise it is considered to be a simple file
 			if urllib.parse.urlparse(name)[0] != "" :
-				url_request = URIOpener(name)
-				self.base   = url_request.location
-				return url_request.data
+				from pySde.fetch import fetch_limited
+				start     = time.perf_counter()
+				with StageTimer("fetch", self.options.max_stage_time) :
+					result = fetch_limited(self.fetcher, name, self.options.max_bytes)
+				self.base = result.location
+				# The size is known only if the fetcher returns the content itself
+				self._record("fetch", start, bytes_in = len(result.data) if isinstance(result.data, bytes) else 0)
+				return result.data
 			else :
 				self.base = 'file://' + name
+				if self.options.max_bytes != None :
+					with open(name, 'rb') as f :
+						return read_limited(f, self.options.max_bytes)
 				return open(name, 'rb')
 		else :
-			return name
+			return read_limited(name, self.options.max_bytes) if self.options.max_bytes != None else name
+
+	def _parse(self, input) :
+		"""
+		Parse the HTML input into a DOM tree, using the parser backend set in the options (see L{parsers}).
+		@param input: the input, as returned by L{_get_input}
+		@return: the DOM tree
+		"""
+		if self._parser == None :
+			from pySde.parsers import get_parser
+			self._parser = get_parser(self.options.parser)
+		if self.metrics != None :
+			# The input is read first, to know its size
+			input = _read_input(input)
+		start = time.perf_counter()
+		with StageTimer("parse", self.options.max_stage_time) :
+			dom = self._parser(input)
+		if self.metrics != None :
+			self._record("parse", start, bytes_in = len(input))
+		return dom
+
+	def _rdfa_processor(self) :
+		"""
+		Return the RDFa processor, creating it at the first call. The processor is prepared for a new document: its
+		base is set to the current base, and the RDFa version (that may be changed by a document) is reset.
+		@return: a pyRdfa processor
+		"""
+		if self._rdfa == None :
+			from pyRdfa         import pyRdfa
+			from pyRdfa.options import Options
+			from pyRdfa.host    import HostLanguage
+			# The vocabulary expansion is not left to pyRdfa, see graph_from_DOM
+			rdfa_options = Options(
+				embedded_rdf    = False,
+				vocab_expansion = False
+			)
+			rdfa_options.set_host_language(HostLanguage.html5)
+			self._rdfa = pyRdfa(rdfa_options, self.base)
+		self._rdfa.base          = self.base
+		self._rdfa.required_base = self.base if self.base != "" else None
+		self._rdfa.rdfa_version  = None
+		return self._rdfa
+
+	def _vocab_cache(self) :
+		"""
+		Return the vocabulary cache of the processor or, if it has none, the shared one.
+		@rtype: L{vocab.VocabCache}
+		"""
+		if self.vocab_cache != None :
+			return self.vocab_cache
+		from pySde.vocab import default_cache
+		return default_cache()
+
+	def _microdata_processor(self) :
+		"""
+		Return the microdata processor, creating it at the first call. The base of the processor is set to the current base.
+		@return: a pyMicrodata processor
+		"""
+		if self._microdata == None :
+			from pyMicrodata import pyMicrodata
+			self._microdata = pyMicrodata(base = self.base)
+		self._microdata.base = self.base
+		return self._microdata
+
+	def _graph_from_input(self, input, graph, uri) :
+		"""
+		Extract the graph from the input: the input is parsed, and the extractors are run, in parallel if the
+		C{parallel_extractors} option is set (see L{parallel.graph_from_data}).
+		@param input: the input, as returned by L{_get_input}
+		@param graph: an RDF Graph (if None, than a new one is created)
+		@param uri: the URI or file name of the source, for the error messages and the metrics
+		@return: an RDF Graph
+		"""
+		if self.options.parallel_extractors :
+			from pySde.parallel import graph_from_data
+			input = _read_input(input)
+			source_graph = graph_from_data(self, input, uri if isinstance(uri, str) else None)
+			if source_graph != None :
+				if graph == None :
+					return source_graph
+				_merge(graph, source_graph)
+				return graph
+		dom = self._parse(input)
+		if self.options.max_triples != None or self.options.max_stage_time != None :
+			# A source hitting a limit should not leave partial results behind in the graph
+			source_graph = self.graph_from_DOM(dom, Graph())
+			if graph == None :
+				return source_graph
+			_merge(graph, source_graph)
+			return graph
+		return self.graph_from_DOM(dom, graph)
+
+	def _cached_graph_from_input(self, input, graph, uri) :
+		"""
+		Extract the graph from the input using the result cache: if the same content has already been processed with
+		the same base and options, the cached triples are used; otherwise the graph is extracted (see
+		L{_graph_from_input}) and the result is stored.
+		@param input: the input, as returned by L{_get_input}
+		@param graph: an RDF Graph (if None, than a new one is created)
+		@param uri: the URI or file name of the source, for the error messages and the metrics
+		@return: an RDF Graph
+		"""
+		data = _read_input(input)
+		if graph == None :
+			graph = Graph()
+
+		key   = self.result_cache.key(data, self.base, self.options)
+		entry = self.result_cache.get(key, len(data))
+		if entry != None :
+			start  = time.perf_counter()
+			before = len(graph)
+			(triples, namespaces) = entry
+			graph.parse(data = triples, format = "nt")
+			for (prefix, ns) in namespaces :
+				graph.bind(prefix, ns, override = False)
+			self._record("cache", start, bytes_in = len(data), triples = len(graph) - before)
+		else :
+			# The result of this very source must be stored, hence a separate graph
+			source_graph = self._graph_from_input(data, Graph(), uri)
+			self.result_cache.put(key, source_graph.serialize(format = "nt", encoding = "utf-8"), list(source_graph.namespaces()))
+			_merge(graph, source_graph)
+		return graph
 
 	####################################################################################################################
 	# Externally used methods
@@ -165,92 +383,268 @@ class pySde :
 			# Create the RDF Graph that will contain the return triples...
 			graph   = Graph()
 
-		if self.options.rdfa :
-			from pyRdfa         import pyRdfa
-			from pyRdfa.options import Options
-			from pyRdfa.host    import HostLanguage
-			rdfa_options = Options(
-				embedded_rdf    = False,
-				vocab_expansion = self.options.vocab_expansion
-			)
-			rdfa_options.set_host_language(HostLanguage.html5)
-			processor = pyRdfa(rdfa_options, self.base)
-			graph = processor.graph_from_DOM(dom, graph)
-		if self.options.microdata :
-			from pyMicrodata import pyMicrodata
-			processor = pyMicrodata(base = self.base)
-			graph = processor.graph_from_DOM(dom, graph)
-			pass
-		if self.options.hturtle :
+		if self.options.region != None :
+			# Only the selected regions are handed over to the extractors
+			from pySde.region import restrict_DOM
+			dom = restrict_DOM(dom, self.options.region)
+			if dom == None :
+				return graph
+
+		# A single walk through the tree to find out which extractors have anything to do
+		from pySde.scan import scan_DOM
+		start = time.perf_counter()
+		scan  = scan_DOM(dom, self.options, count = self.metrics != None)
+		self._record("scan", start, nodes = scan.nodes)
+
+		max_stage_time = self.options.max_stage_time
+		origin         = len(graph)
+		if self.options.rdfa and scan.rdfa :
+			(start, before) = (time.perf_counter(), len(graph))
+			with StageTimer("rdfa", max_stage_time) :
+				if self.options.vocab_expansion :
+					# Only the RDFa triples are expanded, with the vocabularies of the cache
+					rdfa_graph = self._rdfa_processor().graph_from_DOM(dom, Graph())
+					self._vocab_cache().expand(rdfa_graph)
+					_merge(graph, rdfa_graph)
+				else :
+					graph = self._rdfa_processor().graph_from_DOM(dom, graph)
+			self._record("rdfa", start, nodes = scan.nodes, triples = len(graph) - before)
+			self._check_triples(graph, origin)
+		if self.options.microdata and scan.microdata :
+			(start, before) = (time.perf_counter(), len(graph))
+			with StageTimer("microdata", max_stage_time) :
+				graph = self._microdata_processor().graph_from_DOM(dom, graph)
+			self._record("microdata", start, nodes = scan.nodes, triples = len(graph) - before)
+			self._check_triples(graph, origin)
+		if self.options.hturtle and len(scan.turtle_scripts) > 0 :
 			from pySde.hturtle import handle_embeddedRDF
-			handle_embeddedRDF(dom.documentElement, graph, self.base)
+			(start, before) = (time.perf_counter(), len(graph))
+			with StageTimer("hturtle", max_stage_time) :
+				handle_embeddedRDF(dom.documentElement, graph, self.base, scan.turtle_scripts)
+			self._record("hturtle", start, triples = len(graph) - before)
+			self._check_triples(graph, origin)
 
 		return graph
 
-	def graph_from_source(self, name, graph = None, rdfOutput = False) :
+	def graph_from_source(self, name, graph = None, rdfOutput = False, label = None) :
 		"""
 		Extract an RDF graph from an HTML source. The source is parsed, the RDF extracted, and the RDF Graph is
 		returned. This is a front-end to the L{pySde.graph_from_DOM} method.
 
+		If metrics are collected and their provenance is requested (see L{metrics.Metrics}), the metrics of the
+		source are also added to the graph.
+
 		@param name: a URI, a file name, or a file-like object
+		@keyword label: the URI or file name of the source, to be used in the error graphs and the metrics, if C{name} is the content itself (e.g., when it has been fetched elsewhere)
 		@return: an RDF Graph
 		@rtype: rdflib Graph instance
 		"""
-		# First, open the source...
+		uri = name if label == None else label
+		self._source = _source_label(uri)
+		self._stages = []
+		graph = self._graph_from_source(name, graph, rdfOutput, uri)
+		if self.metrics != None and self.metrics.provenance :
+			self._generate_metrics_graph(graph)
+		return graph
+
+	def _open_source(self, name, graph, rdfOutput, uri) :
+		"""
+		Open the source for L{graph_from_source}. Possible HTTP errors are returned as error triples.
+		@return: a tuple with the input (see L{_get_input}) and None, or None and the error graph
+		"""
 		try :
-			# First, open the source... Possible HTTP errors are returned as error triples
-			input = None
-			try :
-				input = self._get_input(name)
-			except FailedSource :
-				f = sys.exc_info()[1]
-				self.http_status = 400
-				if not rdfOutput : raise f
-				return self._generate_error_graph(graph, f.msg, uri=name)
-			except HTTPError :
-				h = sys.exc_info()[1]
-				self.http_status = h.http_code
-				if not rdfOutput : raise h
-				return self._generate_error_graph(graph, "HTTP Error: %s (%s)" % (h.http_code,h.msg), uri=name)
-			except Exception :
-				e = sys.exc_info()[1]
+			return (self._get_input(name), None)
+		except Exception :
+			e = sys.exc_info()[1]
+			# pyRdfa's exceptions (raised by the fetchers) are imported only when there is an error to classify
+			from pyRdfa import HTTPError, FailedSource
+			if isinstance(e, LimitExceeded) :
+				(self.http_status, msg) = (e.http_code, e.msg)
+			elif isinstance(e, FailedSource) :
+				(self.http_status, msg) = (400, e.msg)
+			elif isinstance(e, HTTPError) :
+				(self.http_status, msg) = (e.http_code, "HTTP Error: %s (%s)" % (e.http_code,e.msg))
+			else :
 				# Something nasty happened:-(
-				self.http_status = 500
-				if not rdfOutput : raise e
-				return self._generate_error_graph(graph, str(e), uri=name)
+				(self.http_status, msg) = (500, str(e))
+			if not rdfOutput : raise e
+			return (None, self._generate_error_graph(graph, msg, uri=uri))
+
+	def _graph_from_source(self, name, graph, rdfOutput, uri) :
+		"""
+		The real work of L{graph_from_source}, minus the metrics provenance.
+		"""
+		try :
+			# First, open the source...
+			(input, error_graph) = self._open_source(name, graph, rdfOutput, uri)
+			if error_graph != None :
+				return error_graph
 
 			dom = None
 			try :
-				import warnings
-				warnings.filterwarnings("ignore", category=DeprecationWarning)
-				import html5lib
-				parser = html5lib.HTMLParser(tree=html5lib.treebuilders.getTreeBuilder("dom"))
-				dom = parser.parse(input)
-				return self.graph_from_DOM(dom, graph)
+				if self.options.prefilter :
+					from pySde.prefilter import may_contain_structured_data
+					input = _read_input(input)
+					start = time.perf_counter()
+					found = may_contain_structured_data(input, self.options)
+					self._record("prefilter", start, bytes_in = len(input))
+					if not found :
+						# Nothing to extract, the page is not even parsed
+						return graph if graph != None else Graph()
+				if self.result_cache != None :
+					return self._cached_graph_from_input(input, graph, uri)
+				return self._graph_from_input(input, graph, uri)
+			except LimitExceeded :
+				l = sys.exc_info()[1]
+				self.http_status = l.http_code
+				if not rdfOutput : raise l
+				return self._generate_error_graph(graph, l.msg, uri=uri)
 			except Exception :
 				e = sys.exc_info()[1]
 				# Something nasty happened:-(
 				self.http_status = 400
 				if not rdfOutput : raise e
-				return self._generate_error_graph(graph, str(e), uri=name)
+				return self._generate_error_graph(graph, str(e), uri=uri)
 
+		except LimitExceeded :
+			# Re-raised above, with its own HTTP status already set
+			raise
 		except Exception :
 			e = sys.exc_info()[1]
 			# Something nasty happened:-(
 			self.http_status = 500
 			if not rdfOutput : raise e
-			return self._generate_error_graph(graph, str(e), uri=name)
+			return self._generate_error_graph(graph, str(e), uri=uri)
+
+	def graphs_from_sources(self, names, rdfOutput = False, workers = 1, processes = False) :
+		"""
+		Extract a separate RDF graph for each source in a list. With more than one worker the sources are fetched,
+		parsed, and extracted in parallel, using a thread pool or, if requested, a process pool; each worker builds
+		its own graph. The graphs are returned in the order of C{names}, regardless of the order in which the workers finish.
+
+		A file-like object cannot be handed over to another process; in process mode its content is read here and
+		sent to the worker as bytes.
+
+		If an engine is set for the processor, the sources are handed over to it, and the C{workers} and C{processes}
+		arguments are ignored (see L{engine.ProcessEngine}).
+
+		@param names: list of sources, each can be a URI, a file name, or a file-like object
+		@keyword rdfOutput: whether exceptions should be turned into error triples in the graph of the failing source
+		@keyword workers: number of parallel workers; 1 means sequential processing
+		@keyword processes: whether a process pool (instead of a thread pool) should be used for the workers
+		@return: an iterator of (name, graph) pairs
+		"""
+		if self.engine != None :
+			for item in self.engine.graphs_from_sources(self, names, rdfOutput) :
+				yield item
+			return
+
+		if workers <= 1 :
+			for name in names :
+				yield (name, self.graph_from_source(name, Graph(), rdfOutput))
+			return
+
+		from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+		from collections import deque
+		if processes :
+			executor = ProcessPoolExecutor(max_workers = workers)
+		else :
+			executor = ThreadPoolExecutor(max_workers = workers)
+
+		# Only a limited number of sources are submitted ahead of the one being returned, to keep the memory
+		# used by the finished, but not yet consumed, graphs under control
+		pending = deque()
+		sources = iter(names)
+		# The vocabulary cache is sent explicitly, so that the shared one (and its preloaded vocabularies) is used by the processes, too
+		vocab_cache = self._vocab_cache() if self.options.vocab_expansion else None
+		try :
+			while True :
+				while len(pending) < 2 * workers :
+					try :
+						name = next(sources)
+					except StopIteration :
+						break
+					source = name
+					if processes and not isinstance(name, str) and not isinstance(name, bytes) :
+						source = name.read()
+						if isinstance(source, str) : source = source.encode('utf-8')
+					future = executor.submit(_graph_from_source_worker, self.base, self.options, self.fetcher, self.result_cache, self.metrics, source, rdfOutput, processes,
+											 None, vocab_cache)
+					pending.append((name, future))
+				if len(pending) == 0 :
+					break
+				(name, future) = pending.popleft()
+				(http_status, result, namespaces, records) = future.result()
+				if http_status != 200 :
+					self.http_status = http_status
+				if processes :
+					if self.metrics != None :
+						self.metrics.merge(records)
+					graph = Graph()
+					graph.parse(data = result, format = "nt")
+					for (prefix, ns) in namespaces :
+						graph.bind(prefix, ns)
+				else :
+					graph = result
+				yield (name, graph)
+		finally :
+			executor.shutdown(wait = True, cancel_futures = True)
+
+	def store_from_sources(self, names, target, rdfOutput = False, workers = 1, processes = False) :
+		"""
+		Extract RDF from a list of sources into a target (see the L{target} module). The graph of each source is handed
+		over to the target, in batches, as soon as the source is processed; no global graph is built.
+		@param names: list of sources, each can be a URI, a file name, or a file-like object
+		@param target: the target
+		@type target: L{target.Target}
+		@keyword rdfOutput: whether exceptions should be turned into error triples in the graph of the failing source
+		@keyword workers: number of parallel workers (see L{graphs_from_sources})
+		@keyword processes: whether a process pool (instead of a thread pool) should be used for the parallel workers
+		@return: the number of triples handed over to the target (duplicates included)
+		"""
+		if self.empty :
+			return 0
+
+		count = 0
+		for (name, graph) in self.graphs_from_sources(names, rdfOutput, workers, processes) :
+			start  = time.perf_counter()
+			added  = target.add(name, graph)
+			count += added
+			if self.metrics != None :
+				self._source = _source_label(name)
+				self._record("store", start, triples = added)
+		return count
 
-	def rdf_from_sources(self, names, outputFormat = "pretty-xml", rdfOutput = False) :
+	def rdf_from_sources(self, names, outputFormat = "pretty-xml", rdfOutput = False, workers = 1, processes = False, graph = None) :
 		"""
 		Extract and RDF graph from a list of RDFa sources and serialize them in one graph. The sources are parsed, the RDF
 		extracted, and serialization is done in the specified format.
 		@param names: list of sources, each can be a URI, a file name, or a file-like object
 		@keyword outputFormat: serialization format. Can be one of "turtle", "n3", "xml", "pretty-xml", "nt". "xml" and "pretty-xml", as well as "turtle" and "n3" are synonyms.
+		@keyword workers: number of parallel workers; if more than 1, the sources are processed in parallel (see L{graphs_from_sources}) and the results are merged in the order of the sources
+		@keyword processes: whether a process pool (instead of a thread pool) should be used for the parallel workers
+		@keyword graph: the graph the sources are merged into, instead of a new in-memory graph; e.g., a graph backed by a persistent store. The graph of each source is added to it in batches (see L{target.add_graph})
 		@return: a serialized RDF Graph
 		@rtype: string
 		"""
-		if rdflib.__version__ >= "3.0.0" :
+		graph  = self._merged_graph(names, rdfOutput, workers, processes, graph)
+		start  = time.perf_counter()
+		retval = _serialize(graph, outputFormat)
+		if self.metrics != None :
+			self._source = "-"
+			self._record("serialize", start, bytes_in = len(retval), triples = len(graph))
+		return retval
+
+	def _merged_graph(self, names, rdfOutput, workers, processes, graph = None) :
+		"""
+		Extract the RDF graph of a list of sources and merge them into one graph (see L{rdf_from_sources}).
+		@return: the merged graph
+		"""
+		stored = graph != None
+		if stored :
+			from pySde.target import GraphTarget
+			self.store_from_sources(names, GraphTarget(graph), rdfOutput, workers, processes)
+		elif rdflib.__version__ >= "3.0.0" :
 			graph = Graph()
 		else :
 			# We may need the extra utilities for older rdflib versions...
@@ -261,16 +655,41 @@ class pySde :
 				graph = Graph()
 
 		# the value of rdfOutput determines the reaction on exceptions...
-		if self.empty == False :
-			for name in names :
-				self.graph_from_source(name, graph, rdfOutput)
+		if self.empty == False and not stored :
+			if workers <= 1 and self.engine == None :
+				for name in names :
+					self.graph_from_source(name, graph, rdfOutput)
+			else :
+				for (name, source_graph) in self.graphs_from_sources(names, rdfOutput, workers, processes) :
+					_merge(graph, source_graph)
+		return graph
 
-		# Stupid difference between python2 and python3...
-		if PY3 :
-			return str(graph.serialize(format=outputFormat), encoding='utf-8')
-		else :
-			return graph.serialize(format=outputFormat)
+	def chunks_from_sources(self, names, outputFormat = "turtle", rdfOutput = False, workers = 1, processes = False, chunk_size = 65536) :
+		"""
+		Extract an RDF graph from a list of sources, as L{rdf_from_sources} does, and serialize it in chunks (see the
+		L{streaming} module). The sources are processed when this method is called, ie, the exceptions (if
+		C{rdfOutput} is False) are raised here; the serialization goes on while the chunks are consumed.
+		@param names: list of sources, each can be a URI, a file name, or a file-like object
+		@keyword outputFormat: serialization format
+		@keyword rdfOutput: whether exceptions should be turned into error triples in the graph of the failing source
+		@keyword workers: number of parallel workers (see L{graphs_from_sources})
+		@keyword processes: whether a process pool (instead of a thread pool) should be used for the parallel workers
+		@keyword chunk_size: the (approximate) size of the chunks, in bytes
+		@return: an iterator of UTF-8 encoded chunks
+		"""
+		from pySde.streaming import serialize_chunks
+		graph = self._merged_graph(names, rdfOutput, workers, processes)
+		name  = names[0] if len(names) == 1 else None
 
+		def chunks() :
+			(start, size) = (time.perf_counter(), 0)
+			for chunk in serialize_chunks(graph, outputFormat, chunk_size, name) :
+				size += len(chunk)
+				yield chunk
+			if self.metrics != None :
+				self._source = "-"
+				self._record("serialize", start, bytes_in = size, triples = len(graph))
+		return chunks()
 
 	def rdf_from_source(self, name, outputFormat = "pretty-xml", rdfOutput = False) :
 		"""
@@ -283,21 +702,192 @@ class pySde :
 		"""
 		return self.rdf_from_sources([name], outputFormat, rdfOutput)
 
-################################################# CGI Entry point
-def processURI(uri, outputFormat, form) :
-	"""The standard processing of a microdata uri options in a form, ie, as an entry point from a CGI call.
+	def stream_from_sources(self, names, sink, outputFormat = "nt", rdfOutput = False, workers = 1, processes = False) :
+		"""
+		Extract RDF from a list of sources and write the serialization into a sink. For the line based formats ("nt" and
+		"nquads") the triples of each source are written as soon as that source is processed, and no global graph is
+		built; in the "nquads" case each source gets its own named graph (see L{graph_name}). For all other formats the
+		graphs are merged and the serialization of the merged graph is written at the end.
+		@param names: list of sources, each can be a URI, a file name, or a file-like object
+		@param sink: a file-like object, in text or binary mode
+		@keyword outputFormat: serialization format
+		@keyword rdfOutput: whether exceptions should be turned into error triples in the graph of the failing source
+		@keyword workers: number of parallel workers (see L{graphs_from_sources})
+		@keyword processes: whether a process pool (instead of a thread pool) should be used for the parallel workers
+		"""
+		if self.empty :
+			return
 
-	The call accepts extra form options (eg, HTTP GET options) as follows:
+		if outputFormat in ["nt", "nquads"] :
+			for (name, graph) in self.graphs_from_sources(names, rdfOutput, workers, processes) :
+				start   = time.perf_counter()
+				triples = graph.serialize(format = "nt", encoding = "utf-8")
+				if outputFormat == "nquads" :
+					label   = (" %s .\n" % graph_name(name).n3()).encode("utf-8")
+					triples = b"".join([line[:-2] + label for line in triples.split(b"\n") if line.endswith(b" .")])
+				if self.metrics != None :
+					self._source = _source_label(name)
+					self._record("serialize", start, bytes_in = len(triples), triples = len(graph))
+				_write(sink, triples)
+		else :
+			graph = Graph()
+			for (name, source_graph) in self.graphs_from_sources(names, rdfOutput, workers, processes) :
+				_merge(graph, source_graph)
+			start = time.perf_counter()
+			if isinstance(sink, io.TextIOBase) :
+				sink.write(_serialize(graph, outputFormat))
+			else :
+				graph.serialize(destination = sink, format = outputFormat, encoding = "utf-8")
+			if self.metrics != None :
+				self._source = "-"
+				self._record("serialize", start, triples = len(graph))
 
-	@param uri: URI to access. Note that the "text:" and "uploaded:" values are treated separately; the former is for textual intput (in which case a StringIO is used to get the data) and the latter is for uploaded file, where the form gives access to the file directly.
-	@param outputFormat: serialization formats, as understood by RDFLib. Note that though "turtle" is
-	a possible parameter value, some versions of the RDFLib turtle generation does funny (though legal) things with
-	namespaces, defining unusual and unwanted prefixes...
-	@param form: extra call options (from the CGI call) to set up the local options
-	@type form: cgi FieldStorage instance
-	@return: serialized graph
+################################################# Utilities
+def graph_name(name) :
+	"""
+	The name of the graph for a source, when each source is put into a separate named graph: the URI of the source
+	or, for a file name, the corresponding C{file://} URI. A file-like object gets a blank node.
+	@param name: a URI, a file name, or a file-like object
+	@rtype: URIRef or BNode
+	"""
+	if isinstance(name, str) :
+		if urllib.parse.urlparse(name)[0] != "" :
+			return URIRef(name)
+		else :
+			return URIRef('file://' + name)
+	return BNode()
+
+def _source_label(name) :
+	"""
+	The label of a source in the metrics: the URI or the file name, "-" for a file-like object or for content.
+	"""
+	return name if isinstance(name, str) else "-"
+
+def _write(sink, data) :
+	"""
+	Write UTF-8 encoded data into a sink, decoding it if the sink is in text mode.
+	@param sink: a file-like object
+	@param data: the data
+	@type data: bytes
+	"""
+	if isinstance(sink, io.TextIOBase) :
+		sink.write(data.decode("utf-8"))
+	else :
+		sink.write(data)
+
+def _read_input(input) :
+	"""
+	Read the full content of an input (as returned by L{pySde._get_input}).
+	@param input: a file-like object, or the content itself
+	@return: the content
+	@rtype: bytes or string, depending on the input
+	"""
+	if isinstance(input, bytes) or isinstance(input, str) :
+		return input
+	return input.read()
+
+def _merge(graph, source_graph) :
+	"""
+	Merge the triples and the namespace bindings of a graph into another one.
+	@param graph: the target graph
+	@param source_graph: the graph to merge
+	"""
+	graph += source_graph
+	for (prefix, ns) in source_graph.namespaces() :
+		graph.bind(prefix, ns, override = False)
+
+def _serialize(graph, outputFormat) :
+	"""
+	Serialize a graph into a string.
+	@param graph: the graph
+	@param outputFormat: the serialization format
+	@rtype: string
+	"""
+	# Stupid difference between python2 and python3... Note that newer versions of RDFLib return
+	# a string unless an encoding is explicitly set
+	if PY3 :
+		return str(graph.serialize(format=outputFormat, encoding='utf-8'), encoding='utf-8')
+	else :
+		return graph.serialize(format=outputFormat)
+
+################################################# Batch worker
+_worker_state = threading.local()
+
+def _worker_processor(base, options, fetcher, result_cache, metrics, vocab_cache = None) :
+	"""
+	Return a processor for a pool worker. Each worker thread (or process) keeps its processors and reuses them for the
+	subsequent sources with the same options (see the remark on reuse at L{pySde}); the base, the HTTP status, the
+	fetcher, the result cache, the metrics collector, and the vocabulary cache are reset for each source.
+	@return: a processor
+	@rtype: L{pySde}
+	"""
+	if not hasattr(_worker_state, "processors") :
+		_worker_state.processors = {}
+	key = options.cache_key()
+	if key not in _worker_state.processors :
+		_worker_state.processors[key] = pySde(base = base, options = options, fetcher = fetcher, result_cache = result_cache, metrics = metrics, vocab_cache = vocab_cache)
+	processor = _worker_state.processors[key]
+	processor.base         = base
+	processor.http_status  = 200
+	processor.fetcher      = fetcher
+	processor.result_cache = result_cache
+	processor.metrics      = metrics
+	processor.vocab_cache  = vocab_cache
+	return processor
+
+def _graph_from_source_worker(base, options, fetcher, result_cache, metrics, name, rdfOutput, serialize, label = None, vocab_cache = None) :
+	"""
+	Extract the graph of a single source in a pool worker (see L{pySde.graphs_from_sources}). A separate
+	processor instance is used for each source, because the base and the HTTP status are changed while processing it.
+	This is a module level function so that it can also be sent to a process pool.
+	@param base: the base value of the calling processor
+	@param options: the options of the calling processor
+	@param fetcher: the fetcher of the calling processor
+	@param result_cache: the result cache of the calling processor
+	@param metrics: the metrics collector of the calling processor; in a process this is a copy, whose records are sent back
+	@param name: a URI, a file name, a file-like object or, if sent to a process, the content of the source as bytes
+	@param rdfOutput: whether exceptions should be turned into error triples
+	@param serialize: whether the graph should be returned as N-Triples bytes (necessary for a process pool, to send the result back)
+	@keyword label: the URI or file name of the source, if C{name} is its content (see L{pySde.graph_from_source})
+	@keyword vocab_cache: the vocabulary cache of the calling processor
+	@return: a tuple of the HTTP status, the graph (or its N-Triples serialization), the list of namespace bindings, and the list of metrics records collected in the process
+	"""
+	processor = _worker_processor(base, options, fetcher, result_cache, metrics, vocab_cache)
+	graph     = processor.graph_from_source(name, Graph(), rdfOutput, label)
+	if serialize :
+		records = metrics.drain() if metrics != None else []
+		return (processor.http_status, graph.serialize(format = "nt", encoding = "utf-8"), list(graph.namespaces()), records)
+	else :
+		return (processor.http_status, graph, None, None)
+
+################################################# CGI Entry point
+def _http_error_page(uri, h) :
+	"""
+	The CGI response of L{processURI} for an HTTP error.
+	@param uri: the URI of the source
+	@param h: the exception
+	@type h: pyRdfa's HTTPError
 	@rtype: string
 	"""
+	from html import escape
+
+	retval = 'Content-type: text/html; charset=utf-8\nStatus: %s \n\n' % h.http_code
+	retval += "<html>\n"
+	retval += "<head>\n"
+	retval += "<title>HTTP Error in structured data processing</title>\n"
+	retval += "</head><body>\n"
+	retval += "<h1>HTTP Error in distilling structured data</h1>\n"
+	retval += "<p>HTTP Error: %s (%s)</p>\n" % (h.http_code,h.msg)
+	retval += "<p>On URI: <code>'%s'</code></p>\n" % escape(uri)
+	retval +="</body>\n"
+	retval +="</html>\n"
+	return retval
+
+def _processor_from_form(uri, form, result_cache, metrics, engine, fetcher) :
+	"""
+	Set up the processor and the input for L{processURI} and L{processURI_chunks}, from the form options.
+	@return: a tuple of the processor and the input
+	"""
 	def _get_option(param, compare_value, default) :
 		param_old = param.replace('_','-')
 		if param in list(form.keys()) :
@@ -322,6 +912,8 @@ def processURI(uri, outputFormat, form) :
 		base	= uri
 
 	vocab_expansion     = _get_option( "vocab_expansion", "true", False)
+	parallel_extractors = _get_option( "parallel_extractors", "true", False)
+	region              = form.getfirst("region")
 
 	sources = form.getlist("source")
 	rdfa      = "rdfa" in sources
@@ -331,72 +923,117 @@ def processURI(uri, outputFormat, form) :
 	options = SDEOptions( hturtle         = "hturtle" in sources,
 						  rdfa            = "rdfa" in sources,
 						  microdata       = "microdata" in sources,
-						  vocab_expansion = vocab_expansion)
+						  vocab_expansion = vocab_expansion,
+						  region          = region if region else None,
+						  parallel_extractors = parallel_extractors)
+
+	processor = pySde(base = base, options = options, fetcher = fetcher, result_cache = result_cache, metrics = metrics, engine = engine)
+	return (processor, input)
+
+def _content_type(outputFormat) :
+	"""The CGI header block of a successful L{processURI} response"""
+	if outputFormat == "n3" :
+		retval = 'Content-Type: text/rdf+n3; charset=utf-8\n'
+	elif outputFormat == "nt" or outputFormat == "turtle" :
+		retval = 'Content-Type: text/turtle; charset=utf-8\n'
+	elif outputFormat == "json-ld" or outputFormat == "json" :
+		retval = 'Content-Type: application/json; charset=utf-8\n'
+	else :
+		retval = 'Content-Type: application/rdf+xml; charset=utf-8\n'
+	retval += '\n'
+	return retval
 
-	processor = pySde(base = base, options = options)
+def _exception_page(uri, outputFormat, form, processor) :
+	"""
+	The CGI response of L{processURI} for the exception being handled.
+	@rtype: string
+	"""
+	from pyRdfa import HTTPError
+	if isinstance(sys.exc_info()[1], HTTPError) :
+		return _http_error_page(uri, sys.exc_info()[1])
+
+	# This branch should occur only if an exception is really raised, ie, if it is not turned
+	# into a graph value.
+	(type,value,traceback) = sys.exc_info()
+
+	import traceback
+	from html import escape
+
+	retval = 'Content-type: text/html; charset=utf-8\nStatus: %s\n\n' % processor.http_status
+	retval += "<html>\n"
+	retval += "<head>\n"
+	retval += "<title>Exception in structured data processing</title>\n"
+	retval += "</head><body>\n"
+	retval += "<h1>Exception in distilling structured data</h1>\n"
+	retval += "<pre>\n"
+	strio  = StringIO()
+	traceback.print_exc(file=strio)
+	retval += strio.getvalue()
+	retval +="</pre>\n"
+	retval +="<pre>%s</pre>\n" % value
+	retval +="<h1>Request details</h1>\n"
+	retval +="<dl>\n"
+	if uri == "text:" and "text" in form and form["text"].value != None and len(form["text"].value.strip()) != 0 :
+		retval +="<dt>Text input:</dt><dd>%s</dd>\n" % escape(form["text"].value).replace('\n','<br/>')
+	elif uri == "uploaded:" :
+		retval +="<dt>Uploaded file</dt>\n"
+	else :
+		retval +="<dt>URI received:</dt><dd><code>'%s'</code></dd>\n" % escape(uri)
+	retval +="<dt>Output serialization format:</dt><dd> %s</dd>\n" % outputFormat
+	retval +="</dl>\n"
+	retval +="</body>\n"
+	retval +="</html>\n"
+	return retval
+
+def processURI(uri, outputFormat, form, result_cache = None, metrics = None, engine = None, fetcher = None) :
+	"""The standard processing of a microdata uri options in a form, ie, as an entry point from a CGI call.
+
+	The call accepts extra form options (eg, HTTP GET options) as follows:
+
+	@param uri: URI to access. Note that the "text:" and "uploaded:" values are treated separately; the former is for textual intput (in which case a StringIO is used to get the data) and the latter is for uploaded file, where the form gives access to the file directly.
+	@param outputFormat: serialization formats, as understood by RDFLib. Note that though "turtle" is
+	a possible parameter value, some versions of the RDFLib turtle generation does funny (though legal) things with
+	namespaces, defining unusual and unwanted prefixes...
+	@param form: extra call options (from the CGI call) to set up the local options
+	@type form: cgi FieldStorage instance, or any object with the same interface (see L{wsgi.Form})
+	@keyword result_cache: cache of the extraction results, shared among calls (see L{cache.ResultCache})
+	@keyword metrics: collector of the processing metrics, shared among calls (see L{metrics.Metrics})
+	@keyword engine: process pool for the extraction, shared among calls (see L{engine.ProcessEngine})
+	@keyword fetcher: the fetcher used to retrieve the URI, shared among calls (see L{fetch.PooledHTTPFetcher}); pyRdfa's C{URIOpener} is used if None
+	@return: serialized graph
+	@rtype: string
+	"""
+	(processor, input) = _processor_from_form(uri, form, result_cache, metrics, engine, fetcher)
 
 	# Decide the output format; the issue is what should happen in case of a top level error like an inaccessibility of
 	# the html source: should a graph be returned or an HTML page with an error message?
 
 	try :
 		graph = processor.rdf_from_source(input, outputFormat, rdfOutput = ("forceRDFOutput" in list(form.keys())))
-		if outputFormat == "n3" :
-			retval = 'Content-Type: text/rdf+n3; charset=utf-8\n'
-		elif outputFormat == "nt" or outputFormat == "turtle" :
-			retval = 'Content-Type: text/turtle; charset=utf-8\n'
-		elif outputFormat == "json-ld" or outputFormat == "json" :
-			retval = 'Content-Type: application/json; charset=utf-8\n'
-		else :
-			retval = 'Content-Type: application/rdf+xml; charset=utf-8\n'
-		retval += '\n'
+		return _content_type(outputFormat) + graph
+	except :
+		return _exception_page(uri, outputFormat, form, processor)
 
-		retval += graph
-		return retval
-	except HTTPError as h :
-		import cgi
-
-		retval = 'Content-type: text/html; charset=utf-8\nStatus: %s \n\n' % h.http_code
-		retval += "<html>\n"
-		retval += "<head>\n"
-		retval += "<title>HTTP Error in structured data processing</title>\n"
-		retval += "</head><body>\n"
-		retval += "<h1>HTTP Error in distilling structured data</h1>\n"
-		retval += "<p>HTTP Error: %s (%s)</p>\n" % (h.http_code,h.msg)
-		retval += "<p>On URI: <code>'%s'</code></p>\n" % cgi.escape(uri)
-		retval +="</body>\n"
-		retval +="</html>\n"
-		return retval
+def processURI_chunks(uri, outputFormat, form, result_cache = None, metrics = None, engine = None, chunk_size = 65536, fetcher = None) :
+	"""
+	The streaming counterpart of L{processURI}: the same response, as an iterator of UTF-8 encoded chunks (see the
+	L{streaming} module). The first chunk is the CGI header block; the serialization is sent in the subsequent
+	chunks, as it goes on, ie, the full response is never held in memory. An error page is returned in one chunk.
+	@param uri: URI to access (see L{processURI})
+	@param outputFormat: serialization format
+	@param form: extra call options (see L{processURI})
+	@keyword result_cache: cache of the extraction results, shared among calls (see L{cache.ResultCache})
+	@keyword metrics: collector of the processing metrics, shared among calls (see L{metrics.Metrics})
+	@keyword engine: process pool for the extraction, shared among calls (see L{engine.ProcessEngine})
+	@keyword chunk_size: the (approximate) size of the chunks, in bytes
+	@keyword fetcher: the fetcher used to retrieve the URI, shared among calls (see L{processURI})
+	@return: an iterator of bytes
+	"""
+	(processor, input) = _processor_from_form(uri, form, result_cache, metrics, engine, fetcher)
+	try :
+		chunks = processor.chunks_from_sources([input], outputFormat, rdfOutput = ("forceRDFOutput" in list(form.keys())), chunk_size = chunk_size)
 	except :
-		# This branch should occur only if an exception is really raised, ie, if it is not turned
-		# into a graph value.
-		(type,value,traceback) = sys.exc_info()
-
-		import traceback, cgi
-
-		retval = 'Content-type: text/html; charset=utf-8\nStatus: %s\n\n' % processor.http_status
-		retval += "<html>\n"
-		retval += "<head>\n"
-		retval += "<title>Exception in structured data processing</title>\n"
-		retval += "</head><body>\n"
-		retval += "<h1>Exception in distilling structured data</h1>\n"
-		retval += "<pre>\n"
-		strio  = StringIO()
-		traceback.print_exc(file=strio)
-		retval += strio.getvalue()
-		retval +="</pre>\n"
-		retval +="<pre>%s</pre>\n" % value
-		retval +="<h1>Request details</h1>\n"
-		retval +="<dl>\n"
-		if uri == "text:" and "text" in form and form["text"].value != None and len(form["text"].value.strip()) != 0 :
-			retval +="<dt>Text input:</dt><dd>%s</dd>\n" % cgi.escape(form["text"].value).replace('\n','<br/>')
-		elif uri == "uploaded:" :
-			retval +="<dt>Uploaded file</dt>\n"
-		else :
-			retval +="<dt>URI received:</dt><dd><code>'%s'</code></dd>\n" % cgi.escape(uri)
-		retval +="<dt>Output serialization format:</dt><dd> %s</dd>\n" % outputFormat
-		retval +="</dl>\n"
-		retval +="</body>\n"
-		retval +="</html>\n"
-		return retval
+		return iter([_exception_page(uri, outputFormat, form, processor).encode("utf-8")])
+	return itertools.chain([_content_type(outputFormat).encode("utf-8")], chunks)
 
 ###################################################################################################
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Compact accumulation of the triples of a batch. Merging the graphs of many sources into one rdflib graph keeps a
+separate rdflib term object, and the indexes of the in-memory store, for each triple; the same predicates and type URIs
+(e.g., schema.org terms) are found on almost every page of a crawl. A L{TripleAccumulator} interns the terms instead:
+each distinct term is kept once, as its N-Triples representation, and the triples are kept as three arrays of integer
+term identifiers. rdflib terms are created again only if the accumulated triples are turned into a graph (see
+L{TripleAccumulator.graph}); the N-Triples and N-Quads serializations (see L{TripleAccumulator.serialize}) are written
+from the interned representations directly.
+
+The accumulator is a target (see the L{target} module), ie, it can be filled through L{pySde.store_from_sources}. Unlike
+a graph, the accumulator does not remove the duplicate triples of different sources (the triples of one source are
+unique, though); the line based serializations may therefore contain duplicates, which is fine for N-Triples and
+N-Quads consumers. L{TripleAccumulator.graph} removes them.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+from array import array
+
+from rdflib import Graph, Dataset
+from rdflib.util import from_n3
+
+from pySde           import graph_name, _write
+from pySde.target    import Target
+from pySde.streaming import nt_term
+
+class TripleAccumulator(Target) :
+	"""
+	Target accumulating the triples with interned terms.
+	@ivar terms: the interned terms, as N-Triples strings; the identifier of a term is its index in this list
+	@ivar subjects: identifiers of the subjects of the triples
+	@type subjects: array
+	@ivar predicates: identifiers of the predicates of the triples
+	@type predicates: array
+	@ivar objects: identifiers of the objects of the triples
+	@type objects: array
+	@ivar contexts: identifiers of the names of the graphs of the triples (see L{graph_name}), or None if the named graphs are not kept
+	@type contexts: array
+	@ivar namespaces: the namespace bindings of the graphs, a dictionary from prefixes to URIs
+	"""
+	def __init__(self, named_graphs = False) :
+		"""
+		@keyword named_graphs: whether the source of each triple should be kept (see L{graph_name}), eg, for an N-Quads output
+		"""
+		self.terms      = []
+		self._ids       = {}
+		self.subjects   = array("I")
+		self.predicates = array("I")
+		self.objects    = array("I")
+		self.contexts   = array("I") if named_graphs else None
+		self.namespaces = {}
+
+	def __len__(self) :
+		return len(self.subjects)
+
+	def _intern(self, term) :
+		"""The identifier of a term; a new one is created if the term has not been seen yet"""
+		key = nt_term(term)
+		id  = self._ids.get(key)
+		if id == None :
+			id = len(self.terms)
+			self._ids[key] = id
+			self.terms.append(key)
+		return id
+
+	def add(self, name, graph) :
+		intern = self._intern
+		count  = 0
+		for (s, p, o) in graph :
+			self.subjects.append(intern(s))
+			self.predicates.append(intern(p))
+			self.objects.append(intern(o))
+			count += 1
+		if self.contexts != None :
+			self.contexts.extend([intern(graph_name(name))] * count)
+		for (prefix, ns) in graph.namespaces() :
+			self.namespaces.setdefault(prefix, ns)
+		return count
+
+	def lines(self, named_graphs = False) :
+		"""
+		The triples in N-Triples or N-Quads format.
+		@keyword named_graphs: whether the triples should be in the named graph of their source; the accumulator must keep the named graphs
+		@return: an iterator of strings, one line (ending with a new line character) per triple
+		"""
+		if named_graphs and self.contexts == None :
+			raise ValueError("The accumulator does not keep the named graphs")
+		terms = self.terms
+		if named_graphs :
+			for (s, p, o, c) in zip(self.subjects, self.predicates, self.objects, self.contexts) :
+				yield "%s %s %s %s .\n" % (terms[s], terms[p], terms[o], terms[c])
+		else :
+			for (s, p, o) in zip(self.subjects, self.predicates, self.objects) :
+				yield "%s %s %s .\n" % (terms[s], terms[p], terms[o])
+
+	def serialize(self, sink, outputFormat = "nt", batch_size = 10000) :
+		"""
+		Write the triples into a sink.
+		@param sink: a file-like object, in text or binary mode
+		@keyword outputFormat: "nt" or "nquads"
+		@keyword batch_size: number of lines written in one write call
+		"""
+		batch = []
+		for line in self.lines(outputFormat == "nquads") :
+			batch.append(line)
+			if len(batch) >= batch_size :
+				_write(sink, "".join(batch).encode("utf-8"))
+				batch = []
+		if len(batch) > 0 :
+			_write(sink, "".join(batch).encode("utf-8"))
+
+	def graph(self) :
+		"""
+		Convert the accumulated triples into an rdflib graph; a C{Dataset} if the named graphs are kept.
+		@return: the graph
+		"""
+		terms = {}
+		def term(id) :
+			if id not in terms :
+				terms[id] = from_n3(self.terms[id])
+			return terms[id]
+
+		if self.contexts != None :
+			graph = Dataset()
+			for (s, p, o, c) in zip(self.subjects, self.predicates, self.objects, self.contexts) :
+				graph.add((term(s), term(p), term(o), term(c)))
+		else :
+			graph = Graph()
+			for (s, p, o) in zip(self.subjects, self.predicates, self.objects) :
+				graph.add((term(s), term(p), term(o)))
+		for (prefix, ns) in self.namespaces.items() :
+			graph.bind(prefix, ns, override = False)
+		return graph
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous (asyncio based) interface to the distiller, for the processing of many sources at the same time. The
+fetching of the URIs is done concurrently, with a limit on the number of parallel requests per host and a timeout on each
+request; the fetched contents are handed over to a worker pool for the (CPU bound) parsing and extraction.
+
+The fetching itself relies on the fetcher of the processor (see the L{fetch} module), run in a thread pool; a request
+that times out is reported as an error, although the underlying thread may only finish later. Such a request still
+counts for the per host limit until its thread finishes, ie, the limit is never exceeded. The fetcher's own timeout
+(e.g., L{fetch.HTTPFetcher.timeout}) should therefore be set, too, if possible.
+
+Typical usage::
+
+	processor = pySde(options = SDEOptions())
+	result    = asyncio.run(rdf_from_sources(processor, uris, "turtle", per_host = 2, timeout = 10))
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import sys
+import time
+import asyncio
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from rdflib import Graph
+
+from pyRdfa import HTTPError, FailedSource
+
+from pySde        import _graph_from_source_worker, _merge, _serialize
+from pySde.fetch  import fetch_limited
+from pySde.limits import LimitExceeded
+
+class _Fetching :
+	"""
+	Shared state of the concurrent fetches of a run: the thread pool for the (blocking) fetchers, the per host
+	semaphores, and the timeout.
+	"""
+	def __init__(self, max_connections, per_host, timeout) :
+		self.executor   = ThreadPoolExecutor(max_workers = max_connections)
+		self.per_host   = per_host
+		self.timeout    = timeout
+		self.semaphores = {}
+
+	def semaphore(self, uri) :
+		host = urllib.parse.urlparse(uri)[1]
+		if host not in self.semaphores :
+			self.semaphores[host] = asyncio.Semaphore(self.per_host)
+		return self.semaphores[host]
+
+	async def fetch(self, fetcher, uri, max_bytes = None) :
+		loop      = asyncio.get_running_loop()
+		semaphore = self.semaphore(uri)
+		await semaphore.acquire()
+		future    = loop.run_in_executor(self.executor, fetch_limited, fetcher, uri, max_bytes)
+		def done(f) :
+			# The host is released only when the fetch really ends: a fetch that timed out still occupies its thread
+			semaphore.release()
+			if not f.cancelled() :
+				f.exception()
+		future.add_done_callback(done)
+		try :
+			return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+		except asyncio.TimeoutError :
+			raise FailedSource("Timeout (%s seconds) when accessing %s" % (self.timeout, uri), 504)
+
+	def close(self) :
+		self.executor.shutdown(wait = False)
+
+def _is_uri(name) :
+	return isinstance(name, str) and urllib.parse.urlparse(name)[0] != ""
+
+async def _graph_from_source(processor, name, rdfOutput, fetching, executor) :
+	"""
+	Fetch (if necessary) and extract a single source; see L{graph_from_source}.
+	@return: an RDF Graph
+	"""
+	loop = asyncio.get_running_loop()
+	base = processor.base
+	if _is_uri(name) :
+		# The errors are reported the same way as by pySde.graph_from_source
+		try :
+			start  = time.perf_counter()
+			result = await fetching.fetch(processor.fetcher, name, processor.options.max_bytes)
+			base   = result.location
+			source = result.data
+			if processor.metrics != None :
+				processor.metrics.record(name, "fetch", time.perf_counter() - start, len(source) if isinstance(source, bytes) else 0)
+		except LimitExceeded :
+			l = sys.exc_info()[1]
+			processor.http_status = l.http_code
+			if not rdfOutput : raise l
+			return processor._generate_error_graph(Graph(), l.msg, uri = name)
+		except FailedSource :
+			f = sys.exc_info()[1]
+			processor.http_status = f.http_code if f.http_code != None else 400
+			if not rdfOutput : raise f
+			return processor._generate_error_graph(Graph(), f.msg, uri = name)
+		except HTTPError :
+			h = sys.exc_info()[1]
+			processor.http_status = h.http_code
+			if not rdfOutput : raise h
+			return processor._generate_error_graph(Graph(), "HTTP Error: %s (%s)" % (h.http_code,h.msg), uri = name)
+		except Exception :
+			e = sys.exc_info()[1]
+			processor.http_status = 500
+			if not rdfOutput : raise e
+			return processor._generate_error_graph(Graph(), str(e), uri = name)
+	else :
+		source = name
+
+	processes = isinstance(executor, ProcessPoolExecutor)
+	if processes and not isinstance(source, str) and not isinstance(source, bytes) :
+		# A file-like object cannot be sent to another process
+		source = source.read()
+		if isinstance(source, str) : source = source.encode('utf-8')
+
+	(http_status, result, namespaces, records) = await loop.run_in_executor(executor, _graph_from_source_worker,
+							base, processor.options, processor.fetcher, processor.result_cache, processor.metrics, source, rdfOutput, processes,
+							name if isinstance(name, str) else None, processor._vocab_cache() if processor.options.vocab_expansion else None)
+	if http_status != 200 :
+		processor.http_status = http_status
+	if processes :
+		if processor.metrics != None :
+			processor.metrics.merge(records)
+		graph = Graph()
+		graph.parse(data = result, format = "nt")
+		for (prefix, ns) in namespaces :
+			graph.bind(prefix, ns)
+		return graph
+	else :
+		return result
+
+async def graphs_from_sources(processor, names, rdfOutput = False, per_host = 4, max_connections = 32, timeout = 30, executor = None) :
+	"""
+	Extract a separate RDF graph for each source in a list, fetching the URIs concurrently.
+	@param processor: the processor whose options, base, fetcher, and result cache are used; its HTTP status is set if a source fails
+	@type processor: L{pySde}
+	@param names: list of sources, each can be a URI, a file name, or a file-like object
+	@keyword rdfOutput: whether exceptions should be turned into error triples in the graph of the failing source
+	@keyword per_host: maximum number of parallel requests to the same host
+	@keyword max_connections: maximum number of parallel requests altogether
+	@keyword timeout: timeout for each request, in seconds
+	@keyword executor: the pool used for the parsing and the extraction; if it is a C{ProcessPoolExecutor}, the results are sent back as N-Triples. If None, the default executor of the event loop is used
+	@return: list of (name, graph) pairs, in the order of C{names}
+	"""
+	fetching = _Fetching(max_connections, per_host, timeout)
+	try :
+		graphs = await asyncio.gather(*[_graph_from_source(processor, name, rdfOutput, fetching, executor) for name in names])
+	finally :
+		fetching.close()
+	return list(zip(names, graphs))
+
+async def graph_from_source(processor, name, rdfOutput = False, timeout = 30, executor = None) :
+	"""
+	Extract an RDF graph from an HTML source; the asynchronous counterpart of L{pySde.graph_from_source}.
+	@param processor: the processor whose options, base, fetcher, and result cache are used
+	@type processor: L{pySde}
+	@param name: a URI, a file name, or a file-like object
+	@keyword rdfOutput: whether exceptions should be turned into error triples
+	@keyword timeout: timeout for the request, in seconds
+	@keyword executor: the pool used for the parsing and the extraction (see L{graphs_from_sources})
+	@return: an RDF Graph
+	"""
+	((_name, graph),) = await graphs_from_sources(processor, [name], rdfOutput, timeout = timeout, executor = executor)
+	return graph
+
+async def rdf_from_sources(processor, names, outputFormat = "pretty-xml", rdfOutput = False, per_host = 4, max_connections = 32, timeout = 30, executor = None) :
+	"""
+	Extract an RDF graph from a list of sources and serialize them in one graph; the asynchronous counterpart of
+	L{pySde.rdf_from_sources}. See L{graphs_from_sources} for the parameters.
+	@keyword outputFormat: serialization format
+	@return: a serialized RDF Graph
+	@rtype: string
+	"""
+	graph = Graph()
+	if not processor.empty :
+		for (name, source_graph) in await graphs_from_sources(processor, names, rdfOutput, per_host, max_connections, timeout, executor) :
+			_merge(graph, source_graph)
+	return _serialize(graph, outputFormat)
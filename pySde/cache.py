@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Caches used by the distiller. L{DiskCache} is a simple, size bounded, on-disk cache with a least-recently-used eviction
+policy; it is used for the fetched HTML content (see L{fetch.CachingFetcher}) and as the second tier of L{ResultCache},
+the cache of the extracted triples.
+
+Each L{DiskCache} entry is stored in two files, named after the SHA-1 hash of the key: a data file (C{.data}) and a small JSON
+metadata file (C{.json}) that also stores the key itself. The modification time of the metadata file is updated at
+every access, ie, the cache index (and the LRU order) can be rebuilt from the directory when the cache is reopened.
+
+A cache directory can be shared by several processes (e.g., the workers of a process pool, each with its own
+L{DiskCache} instance): the entries stored by one are found by the others, and the size bound is global. Each store
+rebuilds the index from the directory, with a lock file held (on POSIX systems) while entries are evicted and written.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import os, json, hashlib, threading, contextlib
+from collections import OrderedDict
+
+try :
+	import fcntl
+except ImportError :
+	# No lock file (e.g., on Windows): the size bound of a directory shared by several processes is only approximate
+	fcntl = None
+
+class DiskCache :
+	"""
+	Size bounded on-disk cache with LRU eviction.
+	@ivar directory: the cache directory
+	@ivar max_size: the maximum size of the cached data, in bytes
+	@ivar size: the size of the cached data, in bytes, as last seen by this instance (other processes may share the directory)
+	"""
+	def __init__(self, directory, max_size = 100 * 1024 * 1024) :
+		"""
+		@param directory: the cache directory; created if it does not exist
+		@keyword max_size: the maximum size of the cached data, in bytes
+		"""
+		self.directory = directory
+		self.max_size  = max_size
+		if not os.path.isdir(directory) :
+			os.makedirs(directory)
+		self._lock = threading.Lock()
+		self._load_index()
+
+	def __getstate__(self) :
+		# The lock cannot be pickled (e.g., to send a cache to a worker process); the index is rebuilt on the other side
+		return { "directory" : self.directory, "max_size" : self.max_size }
+
+	def __setstate__(self, state) :
+		self.__init__(state["directory"], state["max_size"])
+
+	def _load_index(self) :
+		"""Rebuild the in-memory index, in LRU order, from the content of the cache directory"""
+		entries = []
+		for fname in os.listdir(self.directory) :
+			if fname.endswith(".json") :
+				digest = fname[:-5]
+				try :
+					mtime = os.path.getmtime(self._path(digest, ".json"))
+					size  = os.path.getsize(self._path(digest, ".data"))
+				except OSError :
+					continue
+				entries.append((mtime, digest, size))
+		entries.sort()
+		self._index = OrderedDict([(digest, size) for (mtime, digest, size) in entries])
+		self.size   = sum(self._index.values())
+
+	def _path(self, digest, suffix) :
+		return os.path.join(self.directory, digest + suffix)
+
+	@contextlib.contextmanager
+	def _locked(self) :
+		"""Hold the lock of the instance and the lock file of the directory, shared with the other processes"""
+		with self._lock :
+			if fcntl == None :
+				yield
+				return
+			with open(os.path.join(self.directory, ".lock"), "ab") as lock_file :
+				fcntl.flock(lock_file, fcntl.LOCK_EX)
+				try :
+					yield
+				finally :
+					fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+	def _write(self, path, data) :
+		"""Write a file atomically, ie, a reader never sees a half written file"""
+		tmp = "%s.%s.tmp" % (path, threading.get_ident())
+		with open(tmp, "wb") as f :
+			f.write(data)
+		os.replace(tmp, path)
+
+	def _remove(self, digest) :
+		self.size -= self._index.pop(digest, 0)
+		for suffix in [".json", ".data"] :
+			try :
+				os.remove(self._path(digest, suffix))
+			except OSError :
+				pass
+
+	def get(self, key) :
+		"""
+		Get a cache entry.
+		@param key: the key of the entry
+		@return: a tuple of the data and the metadata, or None if the key is not in the cache
+		@rtype: (bytes, dictionary)
+		"""
+		digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+		with self._lock :
+			# The entry may not be in the index, but have been stored by another process
+			try :
+				with open(self._path(digest, ".json"), "rb") as f :
+					meta = json.loads(f.read().decode("utf-8"))
+				with open(self._path(digest, ".data"), "rb") as f :
+					data = f.read()
+			except (OSError, ValueError) :
+				# the entry has been removed or damaged behind our back
+				if digest in self._index :
+					self._remove(digest)
+				return None
+			if meta.get("key") != key :
+				return None
+			if digest not in self._index :
+				self._index[digest] = len(data)
+				self.size += len(data)
+			self._index.move_to_end(digest)
+			try :
+				os.utime(self._path(digest, ".json"), None)
+			except OSError :
+				pass
+			return (data, meta)
+
+	def put(self, key, data, meta = {}) :
+		"""
+		Store a cache entry, evicting the least recently used entries if the cache gets too big. Data larger than the
+		maximal size of the cache is not stored.
+		@param key: the key of the entry
+		@param data: the data to store
+		@type data: bytes
+		@keyword meta: additional metadata for the entry; must be JSON serializable
+		@type meta: dictionary
+		"""
+		if len(data) > self.max_size :
+			return
+		digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+		full_meta = dict(meta)
+		full_meta["key"] = key
+		with self._locked() :
+			# Other processes may have stored or evicted entries meanwhile
+			self._load_index()
+			if digest in self._index :
+				self._remove(digest)
+			while len(self._index) > 0 and self.size + len(data) > self.max_size :
+				self._remove(next(iter(self._index)))
+			self._write(self._path(digest, ".data"), data)
+			self._write(self._path(digest, ".json"), json.dumps(full_meta).encode("utf-8"))
+			self._index[digest] = len(data)
+			self.size += len(data)
+
+	def clear(self) :
+		"""Remove all entries from the cache"""
+		with self._locked() :
+			self._load_index()
+			for digest in list(self._index.keys()) :
+				self._remove(digest)
+
+class ResultCache :
+	"""
+	Cache of the extraction results, keyed by a hash of the input content, the base, and the extraction options. The
+	triples are stored as N-Triples (UTF-8 encoded bytes), together with the namespace bindings of the graph. The cache
+	has an in-memory tier and, optionally, an on-disk tier (a L{DiskCache}); both are size bounded with LRU eviction. Entries
+	evicted from the memory are still available on the disk.
+
+	Only successful extractions are cached, error graphs are not.
+	@ivar max_memory: maximum size of the in-memory tier, in bytes
+	@ivar memory_size: current size of the in-memory tier, in bytes
+	@ivar disk: the on-disk tier, or None
+	@ivar hits: number of cache hits
+	@ivar misses: number of cache misses
+	@ivar bytes_saved: the number of input bytes whose parsing and extraction have been avoided by cache hits
+	"""
+	def __init__(self, max_memory = 64 * 1024 * 1024, directory = None, max_disk = 1024 * 1024 * 1024) :
+		"""
+		@keyword max_memory: maximum size of the in-memory tier, in bytes
+		@keyword directory: directory for the on-disk tier; if None, there is no on-disk tier
+		@keyword max_disk: maximum size of the on-disk tier, in bytes
+		"""
+		self.max_memory  = max_memory
+		self.memory_size = 0
+		self.disk        = DiskCache(directory, max_disk) if directory != None else None
+		self.hits        = 0
+		self.misses      = 0
+		self.bytes_saved = 0
+		self._memory     = OrderedDict()
+		self._lock       = threading.Lock()
+
+	def __getstate__(self) :
+		# Used when the cache is sent to a worker process: the lock cannot be pickled, and copying the in-memory
+		# tier would be costly; the worker starts with an empty memory tier (sharing the disk tier, though)
+		return { "max_memory" : self.max_memory, "disk" : self.disk }
+
+	def __setstate__(self, state) :
+		self.__init__(state["max_memory"])
+		self.disk = state["disk"]
+
+	def key(self, data, base, options) :
+		"""
+		Compute the cache key.
+		@param data: the input content
+		@type data: bytes or string
+		@param base: the base URI used for the extraction
+		@param options: the extraction options
+		@type options: L{SDEOptions}
+		@return: the key (a hexadecimal hash value)
+		"""
+		h = hashlib.sha256()
+		# A string and its encoded version may not parse the same way (character encoding detection), hence the type marker
+		if isinstance(data, str) :
+			h.update(b"s")
+			h.update(data.encode("utf-8"))
+		else :
+			h.update(b"b")
+			h.update(data)
+		h.update(b"\0")
+		h.update(base.encode("utf-8"))
+		h.update(b"\0")
+		h.update(options.cache_key().encode("utf-8"))
+		return h.hexdigest()
+
+	def get(self, key, input_size = 0) :
+		"""
+		Get the cached triples.
+		@param key: the cache key (see L{key})
+		@keyword input_size: the size of the input; used for the statistics
+		@return: a tuple of the N-Triples serialization and the list of namespace bindings, or None
+		"""
+		with self._lock :
+			if key in self._memory :
+				self._memory.move_to_end(key)
+				self.hits        += 1
+				self.bytes_saved += input_size
+				return self._memory[key]
+
+		entry = None
+		if self.disk != None :
+			entry = self.disk.get(key)
+
+		with self._lock :
+			if entry == None :
+				self.misses += 1
+				return None
+			(triples, meta) = entry
+			retval = (triples, [tuple(b) for b in meta.get("namespaces", [])])
+			self._store(key, retval)
+			self.hits        += 1
+			self.bytes_saved += input_size
+			return retval
+
+	def put(self, key, triples, namespaces) :
+		"""
+		Store the extracted triples.
+		@param key: the cache key (see L{key})
+		@param triples: N-Triples serialization of the extracted graph
+		@type triples: bytes
+		@param namespaces: list of (prefix, namespace) bindings
+		"""
+		namespaces = [(str(prefix), str(ns)) for (prefix, ns) in namespaces]
+		with self._lock :
+			self._store(key, (triples, namespaces))
+		if self.disk != None :
+			self.disk.put(key, triples, { "namespaces" : namespaces })
+
+	def _store(self, key, value) :
+		"""Store an entry in the memory tier, evicting old entries if necessary (the lock must be held)"""
+		if len(value[0]) > self.max_memory :
+			return
+		if key in self._memory :
+			self.memory_size -= len(self._memory.pop(key)[0])
+		while len(self._memory) > 0 and self.memory_size + len(value[0]) > self.max_memory :
+			(old_key, old_value) = self._memory.popitem(last = False)
+			self.memory_size -= len(old_value[0])
+		self._memory[key] = value
+		self.memory_size += len(value[0])
+
+	def stats(self) :
+		"""
+		Statistics of the cache usage.
+		@return: dictionary with the "hits", "misses", "bytes_saved", "memory_size", and "disk_size" keys
+		"""
+		with self._lock :
+			return {
+				"hits"        : self.hits,
+				"misses"      : self.misses,
+				"bytes_saved" : self.bytes_saved,
+				"memory_size" : self.memory_size,
+				"disk_size"   : self.disk.size if self.disk != None else 0
+			}
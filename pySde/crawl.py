@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk distillation of a site: the sources are read from a URI list file or from a sitemap, they are distilled with a
+bounded number of parallel workers (see L{pySde.graphs_from_sources}), and the graph of each source is written out as
+soon as it is ready, either into a separate file per source, or into one N-Quads stream, each source in its own named
+graph (see L{graph_name}). Nothing is kept in memory beyond the graphs of the sources in progress.
+
+A run can be resumed: the sources written out are recorded in a checkpoint file (one JSON object per line), and the
+sources already in the checkpoint are skipped by the next run, except for those that produced an error, which are tried
+again. For the N-Quads output, the checkpoint also records the size of the output when the run started, and after each
+source; when resuming, the output is first truncated to the size recorded last, ie, the partial output of an
+interrupted source is removed.
+
+Errors (e.g., an unreachable URI) do not stop the run: the source is counted as an error in the summary and, for the per
+source files, the error triples are written out instead of the graph of the source (see L{pySde.graph_from_source}).
+The error triples are not written into the N-Quads output if there is a checkpoint: the source is tried again by the
+next run, and its graph would then be mixed with the error triples.
+
+This module is used by the C{localSde.py} script (see its C{-l}, C{-S}, C{-d}, and C{-k} options).
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+
+@var extensions: file name extensions for the per source output files, per serialization format
+"""
+
+import os, re, json, gzip, time, hashlib
+import urllib.parse
+from xml.etree import ElementTree
+
+from rdflib import RDF
+
+from pySde           import ns_sde, _read_input
+from pySde.streaming import serialize_chunks
+
+extensions = {
+	"turtle"     : "ttl",
+	"n3"         : "n3",
+	"nt"         : "nt",
+	"nquads"     : "nq",
+	"xml"        : "rdf",
+	"pretty-xml" : "rdf",
+	"json-ld"    : "jsonld",
+	"json"       : "jsonld",
+}
+
+#########################################################################################################
+# Sources
+def read_uri_list(fname) :
+	"""
+	Read a URI list file: one URI (or file name) per line; empty lines and lines starting with C{#} are ignored.
+	@param fname: the file name
+	@return: list of URIs
+	"""
+	with open(fname, encoding = "utf-8") as f :
+		return [line.strip() for line in f if line.strip() != "" and not line.strip().startswith("#")]
+
+def _local_name(tag) :
+	return tag.rsplit("}", 1)[-1]
+
+def _on_host(uri, sitemap) :
+	"""
+	Whether a URI of a remote sitemap can be used: an absolute http(s) URI on the host (and port) of the sitemap.
+	@param uri: the URI in the sitemap
+	@param sitemap: the URI of the sitemap
+	"""
+	(scheme, netloc) = urllib.parse.urlparse(uri)[0:2]
+	return scheme.lower() in ["http", "https"] and netloc != "" and netloc.lower() == urllib.parse.urlparse(sitemap)[1].lower()
+
+def read_sitemap(source, fetcher = None, max_depth = 3) :
+	"""
+	Read the URIs of a sitemap (see U{sitemaps.org<https://www.sitemaps.org/protocol.html>}). A sitemap index is
+	followed to the sitemaps it refers to; gzip compressed sitemaps are accepted. The URIs of a remote sitemap (or
+	sitemap index) are kept only if they are absolute C{http} or C{https} URIs on the host of the sitemap, as required
+	by the protocol; any other value (e.g., a file name, or a C{file:} URI) is dropped, ie, a remote sitemap cannot make
+	the crawler read local files.
+	@param source: URI or file name of the sitemap
+	@keyword fetcher: the fetcher used for a URI (see L{fetch}); pyRdfa's C{URIOpener} if None
+	@keyword max_depth: maximum depth of nested sitemap indexes
+	@return: list of URIs
+	"""
+	remote = urllib.parse.urlparse(source)[0] not in ["", "file"]
+	if remote :
+		if fetcher == None :
+			from pySde.fetch import URIOpenerFetcher
+			fetcher = URIOpenerFetcher()
+		data = _read_input(fetcher.fetch(source).data)
+	else :
+		with open(source[len("file://"):] if source.startswith("file://") else source, "rb") as f :
+			data = f.read()
+	if data[:2] == b"\x1f\x8b" :
+		data = gzip.decompress(data)
+
+	root   = ElementTree.fromstring(data)
+	locs   = [e.text.strip() for e in root.iter() if _local_name(e.tag) == "loc" and e.text != None]
+	if remote :
+		locs = [loc for loc in locs if _on_host(loc, source)]
+	if _local_name(root.tag) == "sitemapindex" :
+		retval = []
+		if max_depth > 0 :
+			for loc in locs :
+				retval += read_sitemap(loc, fetcher, max_depth - 1)
+		return retval
+	return locs
+
+#########################################################################################################
+# Checkpoints
+class Checkpoint :
+	"""
+	The record of the sources already written out, in a file of JSON objects, one per line. Each object has the keys
+	C{source}, C{status} ("ok" or "error"), C{triples}, and C{output} (the output file, or the size of the N-Quads
+	output after the source); an object with the single key C{start} records the size of the N-Quads output when the
+	first run started. An incomplete last line (of an interrupted run) is ignored.
+	@ivar path: the file name
+	@ivar entries: the entries read from the file, a dictionary from sources to the JSON objects
+	@ivar last: the entry written last, or None
+	@ivar start: the size of the N-Quads output when the first run started, or None
+	"""
+	def __init__(self, path) :
+		self.path    = path
+		self.entries = {}
+		self.last    = None
+		self.start   = None
+		if os.path.exists(path) :
+			with open(path, encoding = "utf-8") as f :
+				for line in f :
+					try :
+						entry = json.loads(line)
+					except ValueError :
+						continue
+					if "start" in entry :
+						self.start = entry["start"]
+					elif "source" in entry :
+						self.entries[entry["source"]] = entry
+						self.last = entry
+		self._file = open(path, "a", encoding = "utf-8")
+
+	def __contains__(self, source) :
+		return source in self.entries
+
+	def failed(self, source) :
+		"""Whether the source is recorded as an error"""
+		return source in self.entries and self.entries[source]["status"] == "error"
+
+	def set_start(self, size) :
+		"""Record the size of the N-Quads output at the start of the first run"""
+		self._file.write(json.dumps({ "start" : size }) + "\n")
+		self._file.flush()
+		self.start = size
+
+	def add(self, source, status, triples, output) :
+		"""Record a source; the file is flushed, ie, the record survives an interruption of the run"""
+		entry = { "source" : source, "status" : status, "triples" : triples, "output" : output }
+		self._file.write(json.dumps(entry) + "\n")
+		self._file.flush()
+		self.entries[source] = entry
+		self.last = entry
+
+	def close(self) :
+		self._file.close()
+
+#########################################################################################################
+# The run
+class CrawlSummary :
+	"""
+	The summary of a run.
+	@ivar sources: number of sources distilled
+	@ivar skipped: number of sources skipped, because they are in the checkpoint
+	@ivar errors: number of sources that produced an error
+	@ivar triples: number of triples written out
+	@ivar bytes_out: number of bytes written out
+	@ivar seconds: wall time of the run
+	"""
+	def __init__(self) :
+		self.sources   = 0
+		self.skipped   = 0
+		self.errors    = 0
+		self.triples   = 0
+		self.bytes_out = 0
+		self.seconds   = 0.0
+
+	def __str__(self) :
+		rate = lambda n : n / self.seconds if self.seconds > 0 else 0
+		return "%s sources distilled (%s errors, %s skipped), %s triples, %s bytes written in %.1fs: %.2f sources/s, %.1f triples/s" % (
+			self.sources, self.errors, self.skipped, self.triples, self.bytes_out, self.seconds, rate(self.sources), rate(self.triples))
+
+def output_file_name(source, outputFormat) :
+	"""
+	The name of the output file of a source: a readable version of the URI, made unique by a hash.
+	@param source: the source
+	@param outputFormat: the serialization format
+	@rtype: string
+	"""
+	slug = re.sub(r'[^\w.-]+', '_', re.sub(r'^[a-z]+://', '', source))[:100]
+	return "%s-%s.%s" % (slug, hashlib.sha1(source.encode("utf-8")).hexdigest()[:10], extensions.get(outputFormat, outputFormat))
+
+def _is_error(graph) :
+	return (None, RDF.type, ns_sde["Error"]) in graph
+
+def crawl(processor, names, outputFormat = "nquads", directory = None, sink = None, checkpoint = None, workers = 1, processes = False, progress = None,
+		  retry_errors = True) :
+	"""
+	Distill a list of sources and write out their graphs as they are ready. Exactly one of C{directory} and C{sink}
+	must be set.
+	@param processor: the processor
+	@type processor: L{pySde}
+	@param names: list of sources (URIs or file names)
+	@keyword outputFormat: serialization format of the per source files; the C{sink} output is always N-Quads
+	@keyword directory: directory of the per source output files (see L{output_file_name})
+	@keyword sink: file name of the N-Quads output; the output is appended to the file when resuming a run
+	@keyword checkpoint: file name of the checkpoint; if None, the run cannot be resumed
+	@keyword retry_errors: whether the sources recorded as errors in the checkpoint should be tried again
+	@keyword workers: number of parallel workers (see L{pySde.graphs_from_sources})
+	@keyword processes: whether a process pool (instead of a thread pool) should be used for the workers
+	@keyword progress: function called with the source and the summary after each source
+	@return: the summary of the run
+	@rtype: L{CrawlSummary}
+	"""
+	if (directory == None) == (sink == None) :
+		raise ValueError("Exactly one of a directory and a sink should be set")
+	summary = CrawlSummary()
+	start   = time.perf_counter()
+
+	done = Checkpoint(checkpoint) if checkpoint != None else None
+	todo = [name for name in names if done == None or name not in done or (retry_errors and done.failed(name))]
+	summary.skipped = len(names) - len(todo)
+
+	if directory != None :
+		if not os.path.isdir(directory) :
+			os.makedirs(directory)
+		out = None
+	else :
+		out = open(sink, "ab")
+		out.seek(0, os.SEEK_END)
+		if done != None :
+			# Removing the partial output of an interrupted source
+			if done.last != None and isinstance(done.last["output"], int) :
+				out.truncate(done.last["output"])
+			elif done.start != None :
+				out.truncate(done.start)
+			else :
+				done.set_start(out.tell())
+			out.seek(0, os.SEEK_END)
+
+	try :
+		for (name, graph) in processor.graphs_from_sources(todo, True, workers, processes) :
+			error = _is_error(graph)
+			size  = 0
+			if directory != None :
+				output = output_file_name(name, outputFormat)
+				tmp    = os.path.join(directory, output + ".tmp")
+				with open(tmp, "wb") as f :
+					for chunk in serialize_chunks(graph, outputFormat, name = name) :
+						f.write(chunk)
+						size += len(chunk)
+				os.replace(tmp, os.path.join(directory, output))
+			else :
+				if not (error and done != None) :
+					for chunk in serialize_chunks(graph, "nquads", name = name) :
+						out.write(chunk)
+						size += len(chunk)
+					out.flush()
+				output = out.tell()
+			if done != None :
+				done.add(name, "error" if error else "ok", len(graph), output)
+
+			summary.sources   += 1
+			summary.errors    += 1 if error else 0
+			summary.triples   += len(graph)
+			summary.bytes_out += size
+			if progress != None :
+				progress(name, summary)
+	finally :
+		summary.seconds = time.perf_counter() - start
+		if out != None :
+			out.close()
+		if done != None :
+			done.close()
+	return summary
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Process pool engine for the extraction. The extraction is pure Python and CPU bound, ie, threads do not help once
+the content has been fetched; the engine therefore fetches the sources in the parent process (in a thread pool) and
+hands the raw bytes over to a pool of worker processes, which send back the triples in N-Triples. The parent merges
+these into graphs.
+
+The workers are recycled, to contain the memory growth of long running processes (RDFLib and minidom are not
+always good at giving memory back): a worker is replaced after a number of documents, or when its resident set size
+grows over a limit. A worker that crashes (e.g., killed by the operating system for using too much memory) is also
+replaced; the source it was processing gets an error graph, and the rest of the batch goes on.
+
+An engine can be shared by several processors, also used in different threads (e.g., by a multithreaded WSGI server);
+the workers are then shared among them. It is used by L{pySde.graphs_from_sources} (and hence by
+L{pySde.rdf_from_sources} and L{pySde.processURI}) if it is set for the processor::
+
+	with ProcessEngine(workers = 4, max_documents = 200, max_rss = 512) as engine :
+		processor = pySde(options = SDEOptions(), engine = engine)
+		result    = processor.rdf_from_sources(uris, "turtle")
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import sys, os
+import pickle
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED
+from concurrent.futures import wait as wait_futures
+from collections import deque
+
+from rdflib import Graph
+
+from pySde import _graph_from_source_worker, _worker_processor, _read_input, _source_label
+
+def _rss() :
+	"""
+	The current resident set size of the process, in bytes. If it cannot be read from C{/proc}, the peak value is used.
+	"""
+	try :
+		with open("/proc/self/statm") as f :
+			return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+	except Exception :
+		import resource
+		# ru_maxrss is in kilobytes on Linux, in bytes on macOS
+		rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		return rss if sys.platform == "darwin" else rss * 1024
+
+def _worker_main(conn, max_documents, max_rss) :
+	"""
+	The main loop of a worker process: receive a source, extract its graph, send back the result, until the worker
+	has to retire.
+	@param conn: the connection to the parent process
+	@param max_documents: number of documents after which the worker retires; None means no limit
+	@param max_rss: resident set size, in bytes, over which the worker retires; None means no limit
+	"""
+	documents = 0
+	while True :
+		try :
+			task = conn.recv()
+		except EOFError :
+			break
+		if task == None :
+			break
+		(base, options, result_cache, metrics, data, label, rdfOutput, vocab_cache) = task
+		try :
+			result = ("ok",) + _graph_from_source_worker(base, options, None, result_cache, metrics, data, rdfOutput, True, label, vocab_cache)
+		except Exception :
+			e = sys.exc_info()[1]
+			try :
+				pickle.loads(pickle.dumps(e))
+			except Exception :
+				# Not all exceptions can be sent back as they are
+				e = Exception(str(e))
+			result = ("error", e)
+		documents += 1
+		retire = (max_documents != None and documents >= max_documents) or (max_rss != None and _rss() > max_rss)
+		conn.send((result, retire))
+		if retire :
+			break
+	conn.close()
+
+def _open_source_worker(base, options, fetcher, metrics, name, rdfOutput) :
+	"""
+	Fetch or open a source in the parent process, in a thread of the fetching pool.
+	@return: a tuple of the HTTP status, the base (None if the source could not be opened), and the content as bytes (or the error graph)
+	"""
+	processor = _worker_processor(base, options, fetcher, None, metrics)
+	processor._source = _source_label(name)
+	processor._stages = []
+	(input, error_graph) = processor._open_source(name, Graph(), rdfOutput, name)
+	if error_graph != None :
+		return (processor.http_status, None, error_graph)
+	data = _read_input(input)
+	if isinstance(data, str) :
+		data = data.encode('utf-8')
+	return (processor.http_status, processor.base, data)
+
+class _Worker :
+	"""A worker process and the connection to it"""
+	def __init__(self, context, max_documents, max_rss) :
+		(self.conn, child) = context.Pipe()
+		self.process = context.Process(target = _worker_main, args = (child, max_documents, max_rss), daemon = True)
+		self.process.start()
+		# Only the worker keeps its end open, ie, a crash of the worker shows up as an EOF on the connection
+		child.close()
+
+	def stop(self, kill = False) :
+		"""Stop the worker; a busy worker (ie, one whose result will not be read) is killed"""
+		if kill :
+			self.process.terminate()
+		else :
+			try :
+				self.conn.send(None)
+			except Exception :
+				pass
+		self.conn.close()
+		self.process.join(5)
+		if self.process.is_alive() :
+			self.process.kill()
+			self.process.join()
+
+class ProcessEngine :
+	"""
+	Pool of worker processes for the extraction (see the module description).
+	@ivar workers: the number of worker processes
+	@ivar max_documents: the number of documents after which a worker is replaced; None means no limit
+	@ivar max_rss: the resident set size, in MB, over which a worker is replaced; None means no limit
+	"""
+	def __init__(self, workers = None, max_documents = 100, max_rss = None, fetch_threads = 8) :
+		"""
+		@keyword workers: the number of worker processes; the number of CPUs by default
+		@keyword max_documents: the number of documents after which a worker is replaced
+		@keyword max_rss: the resident set size, in MB, over which a worker is replaced
+		@keyword fetch_threads: the number of threads fetching the sources in the parent process
+		"""
+		self.workers       = workers if workers != None else (os.cpu_count() or 1)
+		self.max_documents = max_documents
+		self.max_rss       = max_rss
+		self._context      = multiprocessing.get_context()
+		self._fetching     = ThreadPoolExecutor(max_workers = fetch_threads)
+		self._idle         = []
+		self._started      = 0
+		self._condition    = threading.Condition()
+
+	def __enter__(self) :
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback) :
+		self.close()
+		return False
+
+	def close(self) :
+		"""Stop the idle workers and the fetching threads; the engine should not be used afterwards"""
+		with self._condition :
+			idle = self._idle
+			self._idle = []
+			self._started -= len(idle)
+		for worker in idle :
+			worker.stop()
+		self._fetching.shutdown(wait = True)
+
+	def _acquire(self, block) :
+		"""
+		Get an idle worker, or start a new one if there are less than L{workers}.
+		@param block: whether to wait for a worker to become available
+		@return: a worker, or None if none is available and C{block} is False
+		"""
+		with self._condition :
+			while True :
+				if len(self._idle) > 0 :
+					return self._idle.pop()
+				if self._started < self.workers :
+					self._started += 1
+					break
+				if not block :
+					return None
+				self._condition.wait()
+		try :
+			return _Worker(self._context, self.max_documents, self.max_rss * 1024 * 1024 if self.max_rss != None else None)
+		except :
+			self._release(None, True)
+			raise
+
+	def _release(self, worker, retire = False, kill = False) :
+		"""
+		Give back a worker after a source has been processed.
+		@param worker: the worker
+		@keyword retire: whether the worker has to be stopped
+		@keyword kill: whether the worker has to be killed (its result is not read)
+		"""
+		if retire or kill :
+			if worker != None :
+				worker.stop(kill)
+			with self._condition :
+				self._started -= 1
+				self._condition.notify()
+		else :
+			with self._condition :
+				self._idle.append(worker)
+				self._condition.notify()
+
+	def graphs_from_sources(self, processor, names, rdfOutput = False) :
+		"""
+		Extract a separate RDF graph for each source in a list. The graphs are returned in the order of C{names}.
+		@param processor: the processor whose options, base, fetcher, result cache, and metrics are used; its HTTP status is set if a source fails
+		@type processor: L{pySde}
+		@param names: list of sources, each can be a URI, a file name, or a file-like object
+		@keyword rdfOutput: whether exceptions should be turned into error triples in the graph of the failing source; a crash of a worker is always reported in an error graph
+		@return: an iterator of (name, graph) pairs
+		"""
+		window    = 2 * self.workers
+		sources   = enumerate(names)
+		exhausted = False
+		opening   = deque()   # (index, name, future) of the sources being fetched
+		ready     = deque()   # (index, name, base, data) of the sources waiting for a worker
+		busy      = {}        # connection -> (worker, index, name)
+		results   = {}        # index -> (name, graph or exception)
+		next_out  = 0
+		# The shared vocabulary cache (and its preloaded vocabularies) is sent explicitly, as in pySde.graphs_from_sources
+		vocab_cache = processor._vocab_cache() if processor.options.vocab_expansion else None
+		try :
+			while True :
+				# Only a limited number of sources are handled ahead of the one to be returned next
+				while not exhausted and len(opening) + len(ready) + len(busy) + len(results) < window :
+					try :
+						(index, name) = next(sources)
+					except StopIteration :
+						exhausted = True
+						break
+					future = self._fetching.submit(_open_source_worker, processor.base, processor.options, processor.fetcher, processor.metrics, name, rdfOutput)
+					opening.append((index, name, future))
+
+				for item in [item for item in opening if item[2].done()] :
+					opening.remove(item)
+					(index, name, future) = item
+					try :
+						(http_status, base, content) = future.result()
+					except Exception :
+						results[index] = (name, sys.exc_info()[1])
+						continue
+					if http_status != 200 :
+						processor.http_status = http_status
+					if base == None :
+						results[index] = (name, content)
+					else :
+						ready.append((index, name, base, content))
+
+				while len(ready) > 0 :
+					worker = self._acquire(block = len(busy) == 0)
+					if worker == None :
+						break
+					(index, name, base, data) = ready.popleft()
+					try :
+						worker.conn.send((base, processor.options, processor.result_cache, processor.metrics, data, name if isinstance(name, str) else None, rdfOutput,
+										  vocab_cache))
+					except Exception :
+						# The worker is gone; the source gets another one
+						self._release(worker, kill = True)
+						ready.appendleft((index, name, base, data))
+						continue
+					busy[worker.conn] = (worker, index, name)
+
+				while next_out in results :
+					(name, result) = results.pop(next_out)
+					next_out += 1
+					if isinstance(result, Exception) :
+						raise result
+					yield (name, result)
+
+				if exhausted and len(opening) + len(ready) + len(busy) + len(results) == 0 :
+					break
+
+				if len(busy) > 0 :
+					for conn in wait(list(busy.keys()), 0.01 if len(opening) > 0 else None) :
+						(worker, index, name) = busy.pop(conn)
+						results[index] = (name, self._receive(processor, worker, name))
+				elif len(opening) > 0 :
+					wait_futures([future for (index, name, future) in opening], return_when = FIRST_COMPLETED)
+		finally :
+			for (index, name, future) in opening :
+				future.cancel()
+			for (worker, index, name) in busy.values() :
+				self._release(worker, kill = True)
+
+	def _receive(self, processor, worker, name) :
+		"""
+		Receive the result of a worker, and give the worker back.
+		@return: the graph, or the exception raised by the worker
+		"""
+		try :
+			(result, retire) = worker.conn.recv()
+		except (EOFError, OSError) :
+			worker.process.join(5)
+			exitcode = worker.process.exitcode
+			self._release(worker, kill = True)
+			processor.http_status = 500
+			msg = "The worker process has crashed (exit code %s)" % exitcode
+			return processor._generate_error_graph(Graph(), msg, uri = name if isinstance(name, str) else None)
+
+		self._release(worker, retire)
+		if result[0] == "error" :
+			return result[1]
+		(status, http_status, triples, namespaces, records) = result
+		if http_status != 200 :
+			processor.http_status = http_status
+		if processor.metrics != None :
+			processor.metrics.merge(records)
+		graph = Graph()
+		graph.parse(data = triples, format = "nt")
+		for (prefix, ns) in namespaces :
+			graph.bind(prefix, ns)
+		return graph
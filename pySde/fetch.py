@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+Fetchers: the objects used by L{pySde} to retrieve the content of a URI. A fetcher has a single C{fetch} method,
+returning a L{FetchResult} or raising the usual C{HTTPError} or C{FailedSource} exceptions of pyRdfa; any object with
+such a method can be used (e.g., a stand-in for testing).
+
+The default fetcher (L{URIOpenerFetcher}) relies on pyRdfa's C{URIOpener}. L{HTTPFetcher} uses the standard library
+directly, and gives access to the HTTP status; this is necessary for conditional requests, used by L{CachingFetcher}
+to keep a persistent cache of the fetched pages. L{PooledHTTPFetcher} keeps the connections open between requests
+(per host), and negotiates compressed responses; it is meant for many fetches from the same sites, e.g., in a crawl.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import sys
+import urllib.parse
+from abc import ABC, abstractmethod
+
+# pyRdfa and urllib.request are imported only when a fetcher is really used, ie, they are not loaded by pySde if only
+# local files are processed
+from pySde.cache  import DiskCache
+from pySde.limits import LimitExceeded, read_limited
+
+# Same preference as for pyRdfa's URIOpener
+_accept = 'text/html, application/xhtml+xml'
+
+class FetchResult :
+	"""
+	The result of a fetch.
+	@ivar data: the content
+	@type data: bytes
+	@ivar location: the final location of the content (ie, after possible redirections); to be used as a base
+	@ivar etag: the value of the C{ETag} response header, or None
+	@ivar last_modified: the value of the C{Last-Modified} response header, or None
+	@ivar status: the HTTP status of the response
+	"""
+	def __init__(self, data, location, etag = None, last_modified = None, status = 200) :
+		self.data          = data
+		self.location      = location
+		self.etag          = etag
+		self.last_modified = last_modified
+		self.status        = status
+
+class Fetcher(ABC) :
+	"""Interface for the fetchers; a subclass must implement L{fetch}"""
+	@abstractmethod
+	def fetch(self, uri, headers = None, max_bytes = None) :
+		"""
+		Fetch the content of a URI.
+		@param uri: the URI to fetch
+		@keyword headers: additional HTTP request headers
+		@type headers: dictionary
+		@keyword max_bytes: maximum size of the content; the fetch should stop as soon as possible if the content is larger
+		@return: the fetched content
+		@rtype: L{FetchResult}
+		@raise HTTPError: an HTTP error occurred
+		@raise FailedSource: the content could not be retrieved
+		@raise LimitExceeded: the content is larger than C{max_bytes}
+		"""
+		pass
+
+def fetch_limited(fetcher, uri, max_bytes = None) :
+	"""
+	Fetch the content of a URI with a size limit. The size of the result is checked again, in case the fetcher
+	could not stop earlier.
+	@param fetcher: the fetcher
+	@param uri: the URI to fetch
+	@keyword max_bytes: maximum size of the content; None means no limit
+	@rtype: L{FetchResult}
+	@raise LimitExceeded: the content is larger than C{max_bytes}
+	"""
+	if max_bytes == None :
+		return fetcher.fetch(uri)
+	result = fetcher.fetch(uri, max_bytes = max_bytes)
+	read_limited(result.data, max_bytes)
+	return result
+
+class URIOpenerFetcher(Fetcher) :
+	"""
+	Fetcher relying on pyRdfa's C{URIOpener}; this is the default. C{URIOpener} reads the full content, ie, the
+	size limit can only be checked afterwards.
+	"""
+	def fetch(self, uri, headers = None, max_bytes = None) :
+		if headers == None :
+			headers = {}
+		from pyRdfa.utils import URIOpener
+		url_request = URIOpener(uri, dict(headers))
+		read_limited(url_request.data, max_bytes)
+		return FetchResult(url_request.data, url_request.location,
+						   etag          = url_request.headers.get("ETag"),
+						   last_modified = url_request.headers.get("Last-Modified"))
+
+class HTTPFetcher(Fetcher) :
+	"""
+	Fetcher using the standard library's C{urllib}. A response with a 304 (Not Modified) status is returned (with
+	an empty content) and not raised as an error, ie, conditional requests can be used.
+	@ivar timeout: timeout for the requests, in seconds (None means the global default)
+	@ivar opener: the urllib opener director used for the requests
+	"""
+	def __init__(self, timeout = None, opener = None) :
+		"""
+		@keyword timeout: timeout for the requests, in seconds
+		@keyword opener: urllib opener director to use; if None, a default one is built
+		"""
+		import urllib.request
+		self.timeout = timeout
+		self.opener  = opener if opener != None else urllib.request.build_opener()
+
+	def fetch(self, uri, headers = None, max_bytes = None) :
+		import urllib.request, urllib.error
+		from pyRdfa import HTTPError, FailedSource
+		# Note the removal of the fragment ID. This is necessary, per the HTTP spec
+		url = uri.split('#')[0]
+		request_headers = { "Accept" : _accept }
+		if headers != None :
+			request_headers.update(headers)
+		request = urllib.request.Request(url, headers = request_headers)
+		try :
+			if self.timeout == None :
+				response = self.opener.open(request)
+			else :
+				response = self.opener.open(request, timeout = self.timeout)
+			with response :
+				headers  = response.headers
+				length   = headers.get("Content-Length")
+				if max_bytes != None and length != None and length.isdigit() and int(length) > max_bytes :
+					raise LimitExceeded("The content of %s is larger than the limit of %s bytes" % (uri, max_bytes))
+				data     = read_limited(response, max_bytes)
+				location = response.geturl()
+		except LimitExceeded :
+			raise
+		except urllib.error.HTTPError :
+			e = sys.exc_info()[1]
+			if e.code == 304 :
+				return FetchResult(b"", uri, etag = e.headers.get("ETag"), last_modified = e.headers.get("Last-Modified"), status = 304)
+			raise HTTPError('%s' % e.reason, e.code)
+		except Exception :
+			e = sys.exc_info()[1]
+			raise FailedSource('%s' % e)
+
+		if "Content-Location" in headers :
+			location = urllib.parse.urljoin(location, headers["Content-Location"])
+		return FetchResult(data, location, etag = headers.get("ETag"), last_modified = headers.get("Last-Modified"))
+
+class CachingFetcher(Fetcher) :
+	"""
+	Fetcher keeping a persistent, size bounded, cache of the fetched pages (see L{cache.DiskCache}), keyed by the URI.
+	Pages are stored with their final location and their C{ETag} and C{Last-Modified} validators; when a cached page
+	is requested again, it is revalidated with C{If-None-Match} and C{If-Modified-Since}, and a 304 response is
+	served from the cache. Pages without any validator are not cached.
+	@ivar cache: the disk cache
+	@ivar fetcher: the fetcher used to access the network; it must return the 304 responses (see L{HTTPFetcher})
+	"""
+	def __init__(self, directory, max_size = 100 * 1024 * 1024, fetcher = None) :
+		"""
+		@param directory: the cache directory
+		@keyword max_size: the maximum size of the cache, in bytes
+		@keyword fetcher: the fetcher used to access the network; if None, an L{HTTPFetcher} is used
+		"""
+		self.cache   = DiskCache(directory, max_size)
+		self.fetcher = fetcher if fetcher != None else HTTPFetcher()
+
+	def fetch(self, uri, headers = None, max_bytes = None) :
+		key = uri.split('#')[0]
+		request_headers = {}
+		if headers != None :
+			request_headers.update(headers)
+
+		entry = self.cache.get(key)
+		if entry != None :
+			(data, meta) = entry
+			if meta.get("etag") :
+				request_headers["If-None-Match"] = meta["etag"]
+			if meta.get("last_modified") :
+				request_headers["If-Modified-Since"] = meta["last_modified"]
+
+		if max_bytes == None :
+			result = self.fetcher.fetch(uri, request_headers)
+		else :
+			result = self.fetcher.fetch(uri, request_headers, max_bytes = max_bytes)
+		if result.status == 304 and entry != None :
+			read_limited(data, max_bytes)
+			return FetchResult(data, meta["location"], etag = meta.get("etag"), last_modified = meta.get("last_modified"))
+
+		if result.etag or result.last_modified :
+			self.cache.put(key, result.data, {
+				"location"      : result.location,
+				"etag"          : result.etag,
+				"last_modified" : result.last_modified
+			})
+		return result
+
+class _Decoder :
+	"""
+	Streaming decoder of a C{Content-Encoding}: the content is decompressed chunk by chunk, as it is read.
+	"""
+	def __init__(self, encoding) :
+		import zlib
+		self.encoding = encoding
+		if encoding == "gzip" or encoding == "x-gzip" :
+			self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+		elif encoding == "deflate" :
+			# Some servers send a raw deflate stream instead of the zlib format; this is found out on the first chunk
+			self._decompressor = None
+		elif encoding == "br" :
+			import brotli
+			self._decompressor = brotli.Decompressor()
+		else :
+			self._decompressor = None
+
+	def decode(self, chunk) :
+		import zlib
+		if self.encoding == "deflate" and self._decompressor == None :
+			self._decompressor = zlib.decompressobj()
+			try :
+				return self._decompressor.decompress(chunk)
+			except zlib.error :
+				self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+				return self._decompressor.decompress(chunk)
+		elif self.encoding == "br" :
+			return self._decompressor.process(chunk)
+		elif self._decompressor != None :
+			return self._decompressor.decompress(chunk)
+		else :
+			return chunk
+
+	def flush(self) :
+		if self._decompressor != None and self.encoding != "br" :
+			return self._decompressor.flush()
+		return b""
+
+def _accept_encoding() :
+	"""The content codings the fetcher can decode; brotli only if the C{brotli} package is available"""
+	try :
+		import brotli
+		return "gzip, deflate, br"
+	except ImportError :
+		return "gzip, deflate"
+
+class PooledHTTPFetcher(Fetcher) :
+	"""
+	Fetcher using the standard library's C{http.client} directly, with a pool of persistent (keep-alive) connections
+	per host: when many URIs of the same site are fetched, the TCP (and TLS) connections are reused instead of being
+	opened for each URI. The fetcher should therefore be kept for the lifetime of the processor (or shared among
+	processors); it can be used by several threads at the same time, each request having a connection of its own.
+
+	Compressed responses are negotiated (gzip and deflate, and brotli if the C{brotli} package is available), and they
+	are decompressed as they are read; the C{max_bytes} limit applies to the decompressed content. As for
+	L{HTTPFetcher}, a 304 response is returned and not raised as an error. Redirections are followed; proxies are not
+	supported.
+
+	@ivar timeout: timeout for the connections, in seconds (None means the global default)
+	@ivar max_idle: maximum number of idle connections kept per host
+	@ivar compression: whether compressed responses are requested
+	@ivar connections_opened: number of connections opened so far
+	@ivar bytes_received: number of (possibly compressed) content bytes received so far
+	"""
+	_max_redirects = 10
+
+	def __init__(self, timeout = None, max_idle = 4, compression = True, ssl_context = None) :
+		"""
+		@keyword timeout: timeout for the connections, in seconds
+		@keyword max_idle: maximum number of idle connections kept per host
+		@keyword compression: whether compressed responses are requested
+		@keyword ssl_context: SSL context for the HTTPS connections; the default context if None
+		"""
+		self.timeout            = timeout
+		self.max_idle           = max_idle
+		self.compression        = compression
+		self.ssl_context        = ssl_context
+		self.connections_opened = 0
+		self.bytes_received     = 0
+		self._init_pool()
+
+	def _init_pool(self) :
+		import threading
+		self._idle = {}
+		self._lock = threading.Lock()
+
+	def __getstate__(self) :
+		# Connections cannot be sent to another process; a copy starts with an empty pool
+		state = dict(self.__dict__)
+		del state["_idle"]
+		del state["_lock"]
+		return state
+
+	def __setstate__(self, state) :
+		self.__dict__.update(state)
+		self._init_pool()
+
+	def _connection(self, key) :
+		"""An idle connection to the host, or a new one; the flag tells whether the connection is reused"""
+		with self._lock :
+			idle = self._idle.get(key, [])
+			if len(idle) > 0 :
+				return (idle.pop(), True)
+			self.connections_opened += 1
+		import http.client
+		(scheme, host, port) = key
+		kwargs = {} if self.timeout == None else { "timeout" : self.timeout }
+		if scheme == "https" :
+			return (http.client.HTTPSConnection(host, port, context = self.ssl_context, **kwargs), False)
+		return (http.client.HTTPConnection(host, port, **kwargs), False)
+
+	def _release(self, key, connection, response) :
+		"""Put the connection back to the pool, if the response has been fully read and the server keeps it open"""
+		if response.will_close or not response.isclosed() :
+			connection.close()
+			return
+		with self._lock :
+			idle = self._idle.setdefault(key, [])
+			if len(idle) < self.max_idle :
+				idle.append(connection)
+				return
+		connection.close()
+
+	def close(self) :
+		"""Close all idle connections."""
+		with self._lock :
+			for connections in self._idle.values() :
+				for connection in connections :
+					connection.close()
+			self._idle = {}
+
+	def _request(self, url, headers) :
+		"""
+		Send a request on a pooled connection; a reused connection may have been closed by the server meanwhile, in
+		which case the request is sent again on a new one.
+		@return: a tuple of the pool key, the connection, and the response
+		"""
+		import http.client
+		parsed = urllib.parse.urlsplit(url)
+		if parsed.scheme not in ["http", "https"] :
+			raise ValueError("Unsupported URI scheme: %s" % parsed.scheme)
+		key  = (parsed.scheme, parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+		path = parsed.path or "/"
+		if parsed.query :
+			path += "?" + parsed.query
+		while True :
+			(connection, reused) = self._connection(key)
+			try :
+				connection.request("GET", path, headers = headers)
+				return (key, connection, connection.getresponse())
+			except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) :
+				connection.close()
+				if not reused :
+					raise
+			except Exception :
+				connection.close()
+				raise
+
+	def _read(self, response, uri, max_bytes) :
+		"""Read the content of a response, decompressing it on the fly, and checking the size limit"""
+		encoding = response.getheader("Content-Encoding", "identity").strip().lower()
+		length   = response.getheader("Content-Length")
+		if max_bytes != None and encoding == "identity" and length != None and length.isdigit() and int(length) > max_bytes :
+			raise LimitExceeded("The content of %s is larger than the limit of %s bytes" % (uri, max_bytes))
+		decoder  = _Decoder(encoding)
+		chunks   = []
+		size     = 0
+		received = 0
+		try :
+			while True :
+				chunk = response.read(64 * 1024)
+				if not chunk :
+					break
+				received += len(chunk)
+				data  = decoder.decode(chunk)
+				size += len(data)
+				if max_bytes != None and size > max_bytes :
+					raise LimitExceeded("The content of %s is larger than the limit of %s bytes" % (uri, max_bytes))
+				chunks.append(data)
+			chunks.append(decoder.flush())
+		finally :
+			with self._lock :
+				self.bytes_received += received
+		return b"".join(chunks)
+
+	def fetch(self, uri, headers = None, max_bytes = None) :
+		from pyRdfa import HTTPError, FailedSource
+		# Note the removal of the fragment ID. This is necessary, per the HTTP spec
+		url = uri.split('#')[0]
+		request_headers = { "Accept" : _accept, "User-Agent" : "pySde" }
+		if self.compression :
+			request_headers["Accept-Encoding"] = _accept_encoding()
+		if headers != None :
+			request_headers.update(headers)
+
+		for _ in range(self._max_redirects + 1) :
+			try :
+				(key, connection, response) = self._request(url, request_headers)
+			except Exception :
+				e = sys.exc_info()[1]
+				raise FailedSource('%s' % e)
+			try :
+				if response.status in [301, 302, 303, 307, 308] and response.getheader("Location") :
+					response.read()
+					url = urllib.parse.urljoin(url, response.getheader("Location"))
+					continue
+				if response.status == 304 :
+					response.read()
+					return FetchResult(b"", uri, etag = response.getheader("ETag"), last_modified = response.getheader("Last-Modified"), status = 304)
+				if response.status >= 400 :
+					response.read()
+					raise HTTPError('%s' % response.reason, response.status)
+				data = self._read(response, uri, max_bytes)
+			except (LimitExceeded, HTTPError) :
+				raise
+			except Exception :
+				e = sys.exc_info()[1]
+				raise FailedSource('%s' % e)
+			finally :
+				self._release(key, connection, response)
+
+			location = url
+			if response.getheader("Content-Location") :
+				location = urllib.parse.urljoin(location, response.getheader("Content-Location"))
+			return FetchResult(data, location, etag = response.getheader("ETag"), last_modified = response.getheader("Last-Modified"))
+		raise FailedSource("Too many redirections for %s" % uri)
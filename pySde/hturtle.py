@@ -20,29 +20,52 @@ else :
 
 import re
 
-def handle_embeddedRDF(node, graph, base) :
-	"""
-	"""
-	def _get_literal(Pnode):
-		"""
-		Get the full text
-		@param Pnode: DOM Node
-		@return: string
-		"""
-		rc = ""
-		for node in Pnode.childNodes:
-			if node.nodeType in [node.TEXT_NODE, node.CDATA_SECTION_NODE] :
-				rc = rc + node.data
-		# Sigh... the HTML5 parser does not recognize the CDATA escapes, ie, it just passes on the <![CDATA[ and ]]> strings:-(
-		return rc.replace("<![CDATA[","").replace("]]>","")
+def is_turtle_script(node) :
+	"""
+	Check whether the node is a C{script} element with embedded Turtle.
+	@param node: DOM element Node
+	@return: Boolean
+	"""
+	return node.nodeName.lower() == "script" and node.getAttribute("type") == "text/turtle"
 
-	if node.nodeName.lower() == "script" :
-		if node.hasAttribute("type") and node.getAttribute("type") == "text/turtle" :
-			content  = _get_literal(node)
-			rdf = StringIO(content)
-			graph.parse(rdf, format="n3", publicID = base)
-	else :
-		for child in node.childNodes :
-			if node.nodeType == node.ELEMENT_NODE :
-				handle_embeddedRDF(child, graph, base)
+def find_turtle_scripts(node) :
+	"""
+	Collect the C{script} elements with embedded Turtle. The tree is walked with an explicit stack, ie, the search
+	is not limited by the depth of the tree.
+	@param node: DOM element Node to start the search from
+	@return: list of the script elements, in document order
+	"""
+	retval = []
+	stack  = [node]
+	while len(stack) > 0 :
+		node = stack.pop()
+		if is_turtle_script(node) :
+			retval.append(node)
+		else :
+			for child in reversed(node.childNodes) :
+				if child.nodeType == child.ELEMENT_NODE :
+					stack.append(child)
+	return retval
 
+def _get_literal(Pnode):
+	"""
+	Get the full text
+	@param Pnode: DOM Node
+	@return: string
+	"""
+	rc = "".join([node.data for node in Pnode.childNodes if node.nodeType in [node.TEXT_NODE, node.CDATA_SECTION_NODE]])
+	# Sigh... the HTML5 parser does not recognize the CDATA escapes, ie, it just passes on the <![CDATA[ and ]]> strings:-(
+	return rc.replace("<![CDATA[","").replace("]]>","")
+
+def handle_embeddedRDF(node, graph, base, scripts = None) :
+	"""
+	Parse the content of the C{script} elements with embedded Turtle into the graph, block by block.
+	@param node: DOM Node to start the search for the script elements from
+	@param graph: the RDF graph to add the triples to
+	@param base: the base URI for the Turtle parsing
+	@keyword scripts: list of the relevant script elements, if they have been collected already (see L{scan.scan_DOM}); in this case C{node} is not searched
+	"""
+	if scripts == None :
+		scripts = find_turtle_scripts(node)
+	for script in scripts :
+		graph.parse(StringIO(_get_literal(script)), format="n3", publicID = base)
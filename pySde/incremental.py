@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental distillation. A L{Manifest} keeps, for each source, the hash of its content, the options and the base it
+was processed with, and the triples it produced. When the sources are processed again (see L{changes_from_sources}),
+the sources whose content, base, and options have not changed are not parsed at all; for the others only the
+difference (the triples added and removed) is returned. The differences can be written in the
+U{RDF Patch<https://afs.github.io/rdf-patch/>} format (see L{write_patch}), to be applied to a triple store instead of
+reloading everything.
+
+The blank nodes of a graph are relabelled in a canonical way (see C{rdflib.compare.to_canonical_graph}), ie, the
+labels do not change from one run to the other as long as the triples around the blank nodes do not change. The labels
+are prefixed by a hash of the name of the source (see L{graph_name}), ie, the blank nodes of two sources never share a
+label in a patch, even if the sources have the same structure. Note that a triple store applying a patch must keep the
+blank node labels for the deletions to work. Metrics provenance
+(see L{metrics}) includes dates and timings, ie, it differs from one run to the other.
+
+The manifest is not changed while the sources are processed: the new entries are staged, and they replace the previous
+ones only when L{Manifest.commit} is called, ie, once the changes have been applied (L{write_patch} does it after the end
+of the transaction). An interrupted run leaves the manifest as it was, and the next run reports the same changes again.
+A source that cannot be fetched or distilled keeps its previous entry and triples; it is reported with the "error"
+status, without any triples added or removed.
+
+Typical usage, e.g., for a nightly job::
+
+	manifest  = Manifest("/var/cache/sde-manifest")
+	processor = pySde(options = SDEOptions())
+	with open("changes.rdfp", "w") as sink :
+		write_patch(changes_from_sources(processor, uris, manifest, rdfOutput = True, prune = True), sink, manifest = manifest)
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import os, json, hashlib, threading
+
+from rdflib import Graph, BNode
+from rdflib.compare import to_canonical_graph
+
+from rdflib import RDF
+
+from pySde import ns_sde, graph_name, _source_label, _read_input, _write
+
+class ManifestEntry :
+	"""
+	The manifest entry of a source.
+	@ivar uri: the source (a URI or a file name)
+	@ivar hash: SHA-256 hash of the content of the source
+	@ivar base: the base the source was processed with
+	@ivar options: the key of the options the source was processed with (see L{SDEOptions.cache_key})
+	@ivar triples: the (canonical) triples produced, as a set of N-Triples lines
+	@type triples: set of bytes
+	"""
+	def __init__(self, uri, hash, base, options, triples) :
+		self.uri     = uri
+		self.hash    = hash
+		self.base    = base
+		self.options = options
+		self.triples = triples
+
+class Manifest :
+	"""
+	The manifest, stored in a directory. Each entry is stored in two files, named after the SHA-1 hash of the source:
+	a small JSON file with the URI, the hash, the base, and the options, and an N-Triples file with the triples.
+
+	The changes are staged (see L{stage} and L{stage_removal}) and applied together by L{commit}; the staged entries
+	are written into separate (C{.pending}) files in the meantime, ie, they are not kept in memory.
+	@ivar directory: the manifest directory
+	"""
+	def __init__(self, directory) :
+		"""
+		@param directory: the manifest directory; created if it does not exist
+		"""
+		self.directory = directory
+		if not os.path.isdir(directory) :
+			os.makedirs(directory)
+		self._staged   = []
+		self._removals = []
+
+	def _path(self, uri, suffix) :
+		return os.path.join(self.directory, hashlib.sha1(uri.encode("utf-8")).hexdigest() + suffix)
+
+	def _write(self, path, data) :
+		"""Write a file atomically, ie, an interrupted run does not leave a half written entry behind"""
+		tmp = "%s.%s.tmp" % (path, threading.get_ident())
+		with open(tmp, "wb") as f :
+			f.write(data)
+		os.replace(tmp, path)
+
+	def get(self, uri) :
+		"""
+		Get the entry of a source.
+		@param uri: the source
+		@return: the entry, or None if there is none
+		@rtype: L{ManifestEntry}
+		"""
+		try :
+			with open(self._path(uri, ".json"), "rb") as f :
+				meta = json.loads(f.read().decode("utf-8"))
+			with open(self._path(uri, ".nt"), "rb") as f :
+				triples = set([line for line in f.read().split(b"\n") if len(line) > 0])
+		except (OSError, ValueError) :
+			return None
+		if meta.get("uri") != uri :
+			return None
+		return ManifestEntry(uri, meta["hash"], meta["base"], meta["options"], triples)
+
+	def put(self, entry) :
+		"""
+		Store the entry of a source.
+		@param entry: the entry
+		@type entry: L{ManifestEntry}
+		"""
+		# The triples are written first: the entry is valid only once its JSON file is written
+		self._write(self._path(entry.uri, ".nt"), b"".join([line + b"\n" for line in sorted(entry.triples)]))
+		self._write(self._path(entry.uri, ".json"), json.dumps({
+			"uri"     : entry.uri,
+			"hash"    : entry.hash,
+			"base"    : entry.base,
+			"options" : entry.options
+		}).encode("utf-8"))
+
+	def remove(self, uri) :
+		"""Remove the entry of a source"""
+		for suffix in [".json", ".nt"] :
+			try :
+				os.remove(self._path(uri, suffix))
+			except OSError :
+				pass
+
+	def stage(self, entry) :
+		"""
+		Stage the new entry of a source; it replaces the current one at the next L{commit}.
+		@param entry: the entry
+		@type entry: L{ManifestEntry}
+		"""
+		self._write(self._path(entry.uri, ".nt.pending"), b"".join([line + b"\n" for line in sorted(entry.triples)]))
+		self._write(self._path(entry.uri, ".json.pending"), json.dumps({
+			"uri"     : entry.uri,
+			"hash"    : entry.hash,
+			"base"    : entry.base,
+			"options" : entry.options
+		}).encode("utf-8"))
+		self._staged.append(entry.uri)
+
+	def stage_removal(self, uri) :
+		"""Stage the removal of the entry of a source; it is removed at the next L{commit}"""
+		self._removals.append(uri)
+
+	def commit(self) :
+		"""Apply the staged entries and removals"""
+		for uri in self._staged :
+			# The triples are moved first: the entry is valid only once its JSON file is there
+			for suffix in [".nt", ".json"] :
+				os.replace(self._path(uri, suffix + ".pending"), self._path(uri, suffix))
+		for uri in self._removals :
+			self.remove(uri)
+		(self._staged, self._removals) = ([], [])
+
+	def uris(self) :
+		"""
+		The sources in the manifest.
+		@rtype: list of strings
+		"""
+		retval = []
+		for fname in os.listdir(self.directory) :
+			if fname.endswith(".json") :
+				try :
+					with open(os.path.join(self.directory, fname), "rb") as f :
+						retval.append(json.loads(f.read().decode("utf-8"))["uri"])
+				except (OSError, ValueError, KeyError) :
+					continue
+		return sorted(retval)
+
+class Change :
+	"""
+	The change of a source.
+	@ivar name: the source
+	@ivar status: one of "new", "changed", "unchanged", "error" (the source could not be fetched or distilled; its previous triples are kept), or "removed" (for a source in the manifest that has not been processed, see the C{prune} argument of L{changes_from_sources})
+	@ivar added: the triples added, as N-Triples lines
+	@type added: list of bytes
+	@ivar removed: the triples removed, as N-Triples lines
+	@type removed: list of bytes
+	"""
+	def __init__(self, name, status, added = [], removed = []) :
+		self.name    = name
+		self.status  = status
+		self.added   = added
+		self.removed = removed
+
+	def graphs(self) :
+		"""
+		The added and removed triples as graphs.
+		@return: a tuple of the graph of added triples and the graph of removed triples
+		"""
+		(added, removed) = (Graph(), Graph())
+		if len(self.added) > 0 :
+			added.parse(data = b"\n".join(self.added), format = "nt")
+		if len(self.removed) > 0 :
+			removed.parse(data = b"\n".join(self.removed), format = "nt")
+		return (added, removed)
+
+def canonical_triples(graph, name = None) :
+	"""
+	The triples of a graph as N-Triples lines, with the blank nodes relabelled in a canonical way.
+	@param graph: the graph
+	@keyword name: the source of the graph; if not None, the blank node labels are prefixed by a hash of its graph name (see L{graph_name}), ie, they are specific to the source
+	@rtype: set of bytes
+	"""
+	canonical = to_canonical_graph(graph)
+	if name != None :
+		prefix = "s" + hashlib.sha1(str(graph_name(name)).encode("utf-8")).hexdigest()[:16]
+		def relabel(term) :
+			return BNode(prefix + term) if isinstance(term, BNode) else term
+		scoped = Graph()
+		for (s, p, o) in canonical :
+			scoped.add((relabel(s), p, relabel(o)))
+		canonical = scoped
+	return set([line for line in canonical.serialize(format = "nt", encoding = "utf-8").split(b"\n") if len(line) > 0])
+
+def changes_from_sources(processor, names, manifest, rdfOutput = False, prune = False) :
+	"""
+	Process a list of sources incrementally, and stage the changes of the manifest; the changes should be committed
+	(see L{Manifest.commit}) once they have been applied. The sources are fetched (or read), but only the ones that have
+	changed since the last run, or that have been processed with another base or other options, are parsed and
+	extracted.
+	@param processor: the processor
+	@type processor: L{pySde}
+	@param names: list of sources; each can be a URI or a file name
+	@param manifest: the manifest
+	@type manifest: L{Manifest}
+	@keyword rdfOutput: whether exceptions should be turned into a change with the "error" status, instead of being raised
+	@keyword prune: whether the sources in the manifest that are not in C{names} should be removed (their triples are then reported as removed)
+	@return: an iterator of L{Change} instances, one per source
+	"""
+	options = processor.options.cache_key()
+	seen    = set()
+	for name in names :
+		seen.add(name)
+		previous = manifest.get(name)
+
+		processor._source = _source_label(name)
+		processor._stages = []
+		(input, error_graph) = processor._open_source(name, Graph(), rdfOutput, name)
+		if error_graph != None :
+			# A transient error (e.g., a network failure) should not wipe out the triples of the source
+			yield Change(name, "error")
+			continue
+		data = _read_input(input)
+		if isinstance(data, str) :
+			data = data.encode("utf-8")
+		hash = hashlib.sha256(data).hexdigest()
+		if previous != None and previous.hash == hash and previous.base == processor.base and previous.options == options :
+			yield Change(name, "unchanged")
+			continue
+		graph = processor.graph_from_source(data, Graph(), rdfOutput, label = name)
+		if (None, RDF.type, ns_sde["Error"]) in graph :
+			yield Change(name, "error")
+			continue
+
+		triples = canonical_triples(graph, name)
+		manifest.stage(ManifestEntry(name, hash, processor.base, options, triples))
+		if previous == None :
+			yield Change(name, "new", sorted(triples), [])
+		else :
+			yield Change(name, "changed", sorted(triples - previous.triples), sorted(previous.triples - triples))
+
+	if prune :
+		for uri in manifest.uris() :
+			if uri not in seen :
+				previous = manifest.get(uri)
+				manifest.stage_removal(uri)
+				if previous != None :
+					yield Change(uri, "removed", [], sorted(previous.triples))
+
+def write_patch(changes, sink, named_graphs = False, manifest = None) :
+	"""
+	Write changes in the RDF Patch format, in one transaction: the deletions (C{D} lines) and additions (C{A} lines)
+	of each source, in the order of the sources.
+	@param changes: iterator of L{Change} instances (see L{changes_from_sources})
+	@param sink: a file-like object, in text or binary mode
+	@keyword named_graphs: whether each source is in its own named graph (see L{graph_name}), as for the N-Quads output
+	@keyword manifest: the manifest the changes are staged in; committed once the end of the transaction is written
+	@type manifest: L{Manifest}
+	"""
+	_write(sink, b"TX .\n")
+	for change in changes :
+		label = (" %s ." % graph_name(change.name).n3()).encode("utf-8") if named_graphs else b" ."
+		lines = [b"D " + line[:-2] + label for line in change.removed if line.endswith(b" .")] + \
+				[b"A " + line[:-2] + label for line in change.added if line.endswith(b" .")]
+		if len(lines) > 0 :
+			_write(sink, b"\n".join(lines) + b"\n")
+	_write(sink, b"TC .\n")
+	if manifest != None :
+		if hasattr(sink, "flush") :
+			sink.flush()
+		manifest.commit()
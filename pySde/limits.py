@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Resource limits of the distiller. The limits themselves are set in L{SDEOptions} (C{max_bytes}, C{max_nodes},
+C{max_stage_time}, C{max_triples}); when one of them is hit, a L{LimitExceeded} exception is raised, which
+L{pySde.graph_from_source} turns into an error graph (or re-raises) like any other error, with the HTTP status of
+the exception.
+
+The time limit of a stage (fetching, parsing, or one of the extractors) is enforced with a C{SIGALRM} timer when
+running in the main thread of a process on a POSIX system, ie, a stage that runs too long is interrupted. This is
+the case for the workers of a process pool, too. Signals cannot be used in other threads; there a stage is only
+checked when it finishes, ie, the result is discarded but the thread is not freed earlier.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import signal
+import threading
+import time
+
+_chunk_size = 64 * 1024
+
+class LimitExceeded(Exception) :
+	"""
+	Raised when a resource limit is hit.
+	@ivar msg: the reason
+	@ivar http_code: the HTTP status to report
+	"""
+	def __init__(self, msg, http_code = 413) :
+		Exception.__init__(self, msg)
+		self.msg       = msg
+		self.http_code = http_code
+
+	def __reduce__(self) :
+		# The exception may be sent back from a worker process; the HTTP code must be kept
+		return (LimitExceeded, (self.msg, self.http_code))
+
+def read_limited(input, max_bytes) :
+	"""
+	Read the full content of an input, stopping as soon as the limit is exceeded.
+	@param input: a file-like object, or the content itself
+	@param max_bytes: maximum number of bytes (or characters, for a text input); None means no limit
+	@return: the content
+	@rtype: bytes or string, depending on the input
+	@raise LimitExceeded: the input is longer than the limit
+	"""
+	if isinstance(input, bytes) or isinstance(input, str) :
+		if max_bytes != None and len(input) > max_bytes :
+			raise _too_large(max_bytes)
+		return input
+	if max_bytes == None :
+		return input.read()
+
+	# Read in chunks, so that a (possibly endless) stream is not read further than the limit
+	chunks = []
+	size   = 0
+	while True :
+		chunk = input.read(_chunk_size)
+		chunks.append(chunk)
+		if not chunk :
+			break
+		size += len(chunk)
+		if size > max_bytes :
+			raise _too_large(max_bytes)
+	return chunks[0][:0].join(chunks)
+
+def _too_large(max_bytes) :
+	return LimitExceeded("The input is larger than the limit of %s bytes" % max_bytes)
+
+class StageTimer :
+	"""
+	Context manager enforcing the time limit of a stage (see the module description).
+	@ivar stage: the name of the stage
+	@ivar seconds: the time limit; None means no limit
+	"""
+	def __init__(self, stage, seconds) :
+		self.stage       = stage
+		self.seconds     = seconds
+		self._start      = None
+		self._armed      = False
+		self._handler    = None
+		self._old_timer  = None
+
+	def _alarm(self, signum, frame) :
+		raise LimitExceeded(self._message(), 504)
+
+	def _message(self) :
+		return "The %s stage took longer than the limit of %s seconds" % (self.stage, self.seconds)
+
+	def __enter__(self) :
+		if self.seconds == None :
+			return self
+		self._start = time.perf_counter()
+		if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread() :
+			self._handler   = signal.signal(signal.SIGALRM, self._alarm)
+			self._old_timer = signal.setitimer(signal.ITIMER_REAL, self.seconds)
+			self._armed     = True
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback) :
+		if self.seconds == None :
+			return False
+		elapsed = time.perf_counter() - self._start
+		if self._armed :
+			signal.setitimer(signal.ITIMER_REAL, 0)
+			signal.signal(signal.SIGALRM, self._handler)
+			# An alarm set by someone else is set again, for its remaining time
+			(delay, interval) = self._old_timer
+			if delay > 0 :
+				signal.setitimer(signal.ITIMER_REAL, max(delay - elapsed, 0.001), interval)
+			self._armed = False
+		if exc_type == None and elapsed > self.seconds :
+			raise LimitExceeded(self._message(), 504)
+		return False
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation of the distiller. A L{Metrics} instance, handed over to a L{pySde} processor, records, for each source
+and for each processing stage, the wall time, the number of bytes processed, the number of DOM nodes, and the number of
+triples produced. The stages are:
+
+ - "fetch": retrieval of a URI (see the L{fetch} module)
+ - "prefilter": the byte level check of the content (see L{prefilter})
+ - "parse": parsing of the HTML content
+ - "scan": the pre-scan of the DOM tree (see L{scan}); this is where the DOM nodes are counted
+ - "rdfa", "microdata", "hturtle": the extractors
+ - "cache": a hit in the result cache (see L{cache.ResultCache})
+ - "serialize": serialization of the output
+ - "store": adding the graph of a source to a target (see L{target})
+
+Aggregated counters are kept for each stage, and can be exported in the Prometheus text format (see L{Metrics.prometheus}).
+The individual records can be received through a callback function, and the most recent ones are also kept in the
+L{Metrics.history}.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import threading
+from collections import deque
+
+class StageRecord :
+	"""
+	Measurement of one stage, for one source.
+	@ivar source: the source (a URI or a file name; "-" for other sources)
+	@ivar stage: the name of the stage
+	@ivar seconds: wall time spent in the stage
+	@ivar bytes_in: number of bytes processed (or produced, for serialization)
+	@ivar nodes: number of DOM nodes
+	@ivar triples: number of triples produced
+	"""
+	def __init__(self, source, stage, seconds, bytes_in = 0, nodes = 0, triples = 0) :
+		self.source   = source
+		self.stage    = stage
+		self.seconds  = seconds
+		self.bytes_in = bytes_in
+		self.nodes    = nodes
+		self.triples  = triples
+
+	def __repr__(self) :
+		return "StageRecord(%r, %r, %.6f, bytes_in=%s, nodes=%s, triples=%s)" % (self.source, self.stage, self.seconds, self.bytes_in, self.nodes, self.triples)
+
+class Metrics :
+	"""
+	Collector of the processing metrics. The instance can be shared among threads.
+	@ivar callback: function called with each new L{StageRecord}, or None
+	@ivar provenance: whether the records of a source should also be added to its graph as provenance triples (see L{pySde._generate_metrics_graph})
+	@ivar history: the most recent records
+	@type history: deque of L{StageRecord}
+	"""
+	_counters = [
+		("calls",   "sde_stage_calls_total",   "Number of times a stage has been executed"),
+		("seconds", "sde_stage_seconds_total", "Wall time spent in a stage, in seconds"),
+		("bytes",   "sde_stage_bytes_total",   "Bytes processed by a stage"),
+		("nodes",   "sde_stage_nodes_total",   "DOM nodes handled by a stage"),
+		("triples", "sde_stage_triples_total", "Triples produced by a stage"),
+	]
+
+	def __init__(self, callback = None, provenance = False, history = 1000) :
+		"""
+		@keyword callback: function called with each new L{StageRecord}
+		@keyword provenance: whether the records should also be added as provenance triples to the graphs
+		@keyword history: the number of most recent records to keep
+		"""
+		self.callback   = callback
+		self.provenance = provenance
+		self.history    = deque(maxlen = history)
+		self._totals    = {}
+		self._lock      = threading.Lock()
+
+	def __getstate__(self) :
+		# Used when sent to a worker process: the worker starts with empty counters, and the records it collects are
+		# sent back and merged (see L{drain} and L{merge}); the callback stays with the original instance
+		return { "provenance" : self.provenance, "history" : self.history.maxlen }
+
+	def __setstate__(self, state) :
+		self.__init__(provenance = state["provenance"], history = state["history"])
+
+	def record(self, source, stage, seconds, bytes_in = 0, nodes = 0, triples = 0) :
+		"""
+		Record the measurement of a stage.
+		@param source: the source
+		@param stage: the name of the stage
+		@param seconds: wall time
+		@keyword bytes_in: number of bytes
+		@keyword nodes: number of DOM nodes
+		@keyword triples: number of triples
+		@return: the new record
+		@rtype: L{StageRecord}
+		"""
+		return self.add(StageRecord(source, stage, seconds, bytes_in, nodes, triples))
+
+	def add(self, record) :
+		"""
+		Add a record.
+		@param record: the record
+		@type record: L{StageRecord}
+		@return: the record
+		"""
+		with self._lock :
+			if record.stage not in self._totals :
+				self._totals[record.stage] = { "calls" : 0, "seconds" : 0.0, "bytes" : 0, "nodes" : 0, "triples" : 0 }
+			totals = self._totals[record.stage]
+			totals["calls"]   += 1
+			totals["seconds"] += record.seconds
+			totals["bytes"]   += record.bytes_in
+			totals["nodes"]   += record.nodes
+			totals["triples"] += record.triples
+			self.history.append(record)
+		if self.callback != None :
+			self.callback(record)
+		return record
+
+	def drain(self) :
+		"""
+		Remove and return the records of the history; used by the worker processes to send back their records.
+		@return: list of L{StageRecord}
+		"""
+		with self._lock :
+			retval = list(self.history)
+			self.history.clear()
+		return retval
+
+	def merge(self, records) :
+		"""
+		Add records collected elsewhere (e.g., in a worker process).
+		@param records: list of L{StageRecord}
+		"""
+		for record in records :
+			self.add(record)
+
+	def totals(self) :
+		"""
+		The aggregated counters.
+		@return: dictionary, keyed by the stage names, of dictionaries with the "calls", "seconds", "bytes", "nodes", and "triples" keys
+		"""
+		with self._lock :
+			return dict([(stage, dict(values)) for (stage, values) in self._totals.items()])
+
+	def prometheus(self) :
+		"""
+		Export the aggregated counters in the Prometheus text format.
+		@rtype: string
+		"""
+		totals = self.totals()
+		lines  = []
+		for (key, name, description) in self._counters :
+			lines.append("# HELP %s %s" % (name, description))
+			lines.append("# TYPE %s counter" % name)
+			for stage in sorted(totals.keys()) :
+				lines.append('%s{stage="%s"} %s' % (name, stage, totals[stage][key]))
+		return "\n".join(lines) + "\n"
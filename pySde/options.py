@@ -16,24 +16,12 @@ $Id: options.py,v 1.2 2012/08/22 12:47:06 ivan Exp $ $Date: 2012/08/22 12:47:06
 
 import sys, datetime
 
-import rdflib
-from rdflib	import URIRef
-from rdflib	import Literal
-from rdflib	import BNode
-from rdflib	import Namespace
-if rdflib.__version__ >= "3.0.0" :
-	from rdflib	import Graph
-	from rdflib	import RDF  as ns_rdf
-	from rdflib	import RDFS as ns_rdfs
-else :
-	from rdflib.Graph	import Graph
-	from rdflib.RDFS	import RDFSNS as ns_rdfs
-	from rdflib.RDF		import RDFNS  as ns_rdf
-
 class SDEOptions :
 	"""Settable options. 
 	"""
-	def __init__(self, hturtle = True, rdfa = True, microdata = True, vocab_expansion = False) :
+	def __init__(self, hturtle = True, rdfa = True, microdata = True, vocab_expansion = False, parser = "html5lib",
+				 max_bytes = None, max_nodes = None, max_stage_time = None, max_triples = None, region = None,
+				 prefilter = True, parallel_extractors = False) :
 		"""
 		@keyword space_preserve: whether plain literals should preserve spaces at output or not
 		@type space_preserve: Boolean
@@ -43,20 +31,57 @@ class SDEOptions :
 		@type output_processor_graph: Boolean
 		@keyword transformers: extra transformers
 		@type transformers: list
+		@keyword parser: the HTML parser backend: "html5lib", "html5-parser", or "lxml" (see L{parsers}); html5lib is used if the backend is not available
+		@type parser: string
+		@keyword max_bytes: maximum size of a source, in bytes; None means no limit (see L{limits})
+		@keyword max_nodes: maximum number of elements in the DOM tree of a source; None means no limit
+		@keyword max_stage_time: maximum wall time of each stage (fetching, parsing, each extractor) for a source, in seconds; None means no limit
+		@keyword max_triples: maximum number of triples extracted from a source; None means no limit
+		@keyword region: CSS selector (e.g., "#product" for an element id, or "head"); if set, the extraction is restricted to the subtrees of the matching elements (see L{region})
+		@type region: string
+		@keyword prefilter: whether the raw content should be checked for possible structured data first, skipping the parsing of the pages that have none (see L{prefilter})
+		@type prefilter: Boolean
+		@keyword parallel_extractors: whether the extractors should run in parallel, in separate processes, on a source (see L{parallel})
+		@type parallel_extractors: Boolean
 		"""
 		self.hturtle         = hturtle
 		self.rdfa	         = rdfa
 		self.microdata       = microdata
 		self.vocab_expansion = vocab_expansion
+		self.parser          = parser
+		self.max_bytes       = max_bytes
+		self.max_nodes       = max_nodes
+		self.max_stage_time  = max_stage_time
+		self.max_triples     = max_triples
+		self.region          = region
+		self.prefilter       = prefilter
+		self.parallel_extractors = parallel_extractors
 
 			
+	def cache_key(self) :
+		"""
+		A string representation of all the option values, to be used as part of cache keys (see L{cache.ResultCache}).
+		@rtype: string
+		"""
+		return repr(sorted(vars(self).items()))
+
 	def __str__(self) :
 		retval = """Current options:
 		extract turtle            : %s
 		extract rdfa              : %s
 		extract microdata         : %s
 		expand rdfa vocabularies  : %s
+		html parser               : %s
+		maximum bytes             : %s
+		maximum DOM nodes         : %s
+		maximum time per stage    : %s
+		maximum triples           : %s
+		region                    : %s
+		byte level prefilter      : %s
+		parallel extractors       : %s
 
 		"""
-		return retval % (self.hturtle, self.rdfa, self.microdata, self.vocab_expansion)
+		return retval % (self.hturtle, self.rdfa, self.microdata, self.vocab_expansion, self.parser,
+						 self.max_bytes, self.max_nodes, self.max_stage_time, self.max_triples, self.region, self.prefilter,
+						 self.parallel_extractors)
 		
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel execution of the extractors on a single source. By default, the RDFa, microdata, and Turtle extractors run one
+after the other on the same DOM tree; for a large page, the latency is the sum of their times. If the
+C{parallel_extractors} option is set (see L{SDEOptions}), each extractor that may have something to do (see L{prefilter})
+runs in a separate worker process instead, with its own graph, and the graphs are merged at the end, in the order of the
+sequential run (RDFa, microdata, Turtle). The latency is then the time of the slowest extractor, plus the time of parsing.
+
+The extractors are pure Python code, ie, threads would not run them in parallel; and the DOM tree cannot be shared by
+processes (the RDFa extractor may even modify it). Each worker therefore parses the raw content again. This is a win
+for large pages with several kinds of structured data, ie, for interactive requests on big documents; for batches,
+running several sources in parallel (see L{pySde.graphs_from_sources}) makes a better use of the processors.
+
+The worker processes are shared by all the processors of the interpreter; they are created at the first use, and shut
+down when the interpreter exits. In a process that is itself a worker of a process pool (see L{engine}), and if the
+process may run on a single processor only, the extractors run sequentially.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+
+@var extractors: the extractors, in the order their graphs are merged
+"""
+
+import os, copy, atexit, threading, multiprocessing
+
+from rdflib import Graph
+
+from pySde           import _graph_from_source_worker
+from pySde.prefilter import may_contain_structured_data
+
+extractors = ["rdfa", "microdata", "hturtle"]
+
+_executor      = None
+_executor_lock = threading.Lock()
+
+def _get_executor() :
+	"""The process pool shared by all processors, created at the first call"""
+	global _executor
+	with _executor_lock :
+		if _executor == None :
+			from concurrent.futures import ProcessPoolExecutor
+			_executor = ProcessPoolExecutor(max_workers = len(extractors))
+			# Left to the garbage collection at exit, the pool complains about its already finalized internals
+			atexit.register(_shutdown)
+		return _executor
+
+def _shutdown() :
+	"""Shut the process pool down, if it has been created"""
+	global _executor
+	with _executor_lock :
+		if _executor != None :
+			_executor.shutdown(wait = True)
+			_executor = None
+
+def _processors() :
+	"""The number of processors the process may run on"""
+	if hasattr(os, "sched_getaffinity") :
+		return len(os.sched_getaffinity(0))
+	return os.cpu_count() or 1
+
+def _single_options(options, extractor) :
+	"""A copy of the options with only one extractor switched on (and run sequentially, of course)"""
+	retval = copy.copy(options)
+	for name in extractors :
+		setattr(retval, name, name == extractor)
+	retval.parallel_extractors = False
+	return retval
+
+def selected_extractors(data, options) :
+	"""
+	The extractors switched on in the options for which the content may contain structured data.
+	@param data: the raw content
+	@param options: the extraction options
+	@type options: L{SDEOptions}
+	@return: list of extractor names
+	"""
+	return [name for name in extractors if getattr(options, name) and may_contain_structured_data(data, _single_options(options, name))]
+
+def graph_from_data(processor, data, label = None, force = False) :
+	"""
+	Extract the graph from the content of a source, running the extractors in parallel. Exceptions raised in the
+	workers (including the L{limits.LimitExceeded} exceptions) are raised again here.
+	@param processor: the processor; its base, options, and metrics are used
+	@type processor: L{pySde}
+	@param data: the raw content
+	@type data: bytes or string
+	@keyword label: the URI or file name of the source, for the error messages and the metrics
+	@keyword force: whether the extractors should run in the worker processes even if that is pointless (on a single processor, or with a single extractor to run); used for testing
+	@return: the merged graph, or None if running the extractors in parallel is pointless (at most one extractor has anything to do) or impossible; the caller should then run them sequentially
+	"""
+	if multiprocessing.current_process().daemon :
+		# Daemon processes cannot have children
+		return None
+	if not force and _processors() < 2 :
+		# With one processor the workers would only add the cost of parsing
+		return None
+	if isinstance(data, str) :
+		data = data.encode("utf-8")
+	selection = selected_extractors(data, processor.options)
+	if len(selection) == 0 or (not force and len(selection) < 2) :
+		return None
+
+	from pySde.metrics import Metrics
+	# The workers collect the metrics in a fresh collector, whose records are sent back
+	metrics = Metrics() if processor.metrics != None else None
+	# The shared vocabulary cache (and its preloaded vocabularies) is sent explicitly, too
+	vocab_cache = processor._vocab_cache() if processor.options.vocab_expansion else None
+	futures = [_get_executor().submit(_graph_from_source_worker, processor.base, _single_options(processor.options, name),
+									   None, None, metrics, data, False, True, label, vocab_cache) for name in selection]
+	try :
+		results = [future.result() for future in futures]
+	finally :
+		for future in futures :
+			future.cancel()
+
+	graph = Graph()
+	for (http_status, triples, namespaces, records) in results :
+		if processor.metrics != None :
+			processor._stages += [processor.metrics.add(record) for record in records]
+		graph.parse(data = triples, format = "nt")
+		for (prefix, ns) in namespaces :
+			graph.bind(prefix, ns, override = False)
+	processor._check_triples(graph, 0)
+	return graph
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+HTML parser backends. Each backend turns the HTML input into a (minidom) DOM tree, the form the extractors consume.
+The backend is chosen through the C{parser} option of L{SDEOptions}:
+
+ - "html5lib": the pure Python html5lib parser; this is the default, and the fallback if another backend is not available
+ - "html5-parser": the U{html5-parser<https://html5-parser.readthedocs.io>} package, a C implementation of the HTML5 parsing algorithm, building the DOM tree directly
+ - "lxml": lxml's (libxml2 based) HTML parser; its tree is converted into a DOM tree. Note that this parser does not implement the HTML5 parsing algorithm, ie, the tree may differ on malformed content
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+
+@var backends: the names of the available backends, mapped to the functions creating the parsers
+"""
+
+from xml.dom import minidom
+
+_xhtml_ns = "http://www.w3.org/1999/xhtml"
+
+def _read(input) :
+	"""Read the full content of the input, if it is a file-like object"""
+	if isinstance(input, bytes) or isinstance(input, str) :
+		return input
+	return input.read()
+
+def _html5lib_parser() :
+	import warnings
+	warnings.filterwarnings("ignore", category=DeprecationWarning)
+	import html5lib
+	parser = html5lib.HTMLParser(tree=html5lib.treebuilders.getTreeBuilder("dom"))
+	return parser.parse
+
+def _html5_parser_parser() :
+	import html5_parser
+	def parse(input) :
+		return html5_parser.parse(_read(input), treebuilder = "dom")
+	return parse
+
+def _lxml_to_DOM(root) :
+	"""
+	Convert an lxml element tree into a minidom tree. The conversion uses an explicit stack, ie, it is not limited by
+	the depth of the tree. Comments and processing instructions are dropped.
+	@param root: the root element of the lxml tree
+	@return: DOM Document
+	"""
+	doc = minidom.getDOMImplementation().createDocument(None, None, None)
+	stack = [(root, doc)]
+	while len(stack) > 0 :
+		(element, parent) = stack.pop()
+		if not isinstance(element.tag, str) :
+			# comment, processing instruction, or entity
+			if element.tail and parent != doc :
+				parent.appendChild(doc.createTextNode(element.tail))
+			continue
+		node = doc.createElementNS(_xhtml_ns, element.tag.lower())
+		for (name, value) in element.attrib.items() :
+			node.setAttribute(name.lower(), value)
+		if element.text :
+			node.appendChild(doc.createTextNode(element.text))
+		parent.appendChild(node)
+		# The tail text follows the element, ie, it must be added after all the children
+		if element.tail and parent != doc :
+			stack.append((_Tail(element.tail), parent))
+		for child in reversed(element) :
+			stack.append((child, node))
+	return doc
+
+class _Tail :
+	"""Placeholder on the conversion stack for the tail text of an lxml element"""
+	tag = None
+	def __init__(self, tail) :
+		self.tail = tail
+
+def _lxml_parser() :
+	import lxml.html
+	def parse(input) :
+		data = _read(input)
+		return _lxml_to_DOM(lxml.html.document_fromstring(data))
+	return parse
+
+backends = {
+	"html5lib"     : _html5lib_parser,
+	"html5-parser" : _html5_parser_parser,
+	"lxml"         : _lxml_parser
+}
+
+def get_parser(name) :
+	"""
+	Create a parser function for a backend. If the backend is unknown or its package cannot be loaded, the html5lib parser is used.
+	@param name: name of the backend (see L{backends})
+	@return: a function turning the HTML input (a file-like object, a string, or bytes) into a DOM tree
+	"""
+	if name != "html5lib" and name in backends :
+		try :
+			return backends[name]()
+		except Exception :
+			# Missing package, or one that refuses to load (html5-parser, e.g., checks its libxml2 version against lxml's)
+			pass
+	return _html5lib_parser()
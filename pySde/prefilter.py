@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Byte level prefilter: a cheap scan of the raw content, run before the (expensive) HTML parsing, to find out whether a
+page may contain structured data at all. If it cannot, the page is not parsed, and an empty graph is returned.
+
+The prefilter follows the rules of the DOM pre-scan (see L{scan}), and it errs on the safe side: it may find
+structured data where there is none (e.g., in a comment, or in the text of the page), but it should not miss any.
+Only the extractors switched on in the options are looked for:
+
+ - RDFa: any of the L{scan.rdfa_attributes} used as an attribute, or a C{rel}/C{rev} attribute whose value may be a CURIE, an absolute URI, or one of the L{scan.rdfa_terms}
+ - microdata: an C{itemscope} attribute
+ - Turtle: the string C{turtle} (the type of the script elements being C{text/turtle})
+
+Attribute names are case insensitive in HTML; the content is lower cased for the search. The content should be in an
+ASCII compatible encoding; if it looks like UTF-16 or UTF-32, the prefilter gives up (ie, the page is parsed).
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import re
+
+from pySde.scan import rdfa_attributes, rdfa_terms
+
+# An attribute name is preceded by a space, by the closing quote of the previous attribute value, or by a '/'; it is
+# followed by the '=' of the value, by a space, or by the end of the tag
+_before = rb'[\s"\'/]'
+_after  = rb'(?=[\s=/>]|$)'
+
+_rdfa_attribute = re.compile(_before + rb'(?:' + b"|".join([a.encode("ascii") for a in rdfa_attributes]) + rb')' + _after)
+_rdfa_rel       = re.compile(_before + rb're[lv]\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]*)')
+_itemscope      = re.compile(_before + rb'itemscope' + _after)
+
+_terms = [t.encode("ascii") for t in rdfa_terms]
+
+def _rel_value(value) :
+	"""
+	Check whether a C{rel} or C{rev} value may generate triples (see L{scan._rdfa_rel}); a character reference
+	may hide a ':', ie, it is accepted, too.
+	"""
+	if b':' in value or b'&' in value :
+		return True
+	return any([v.strip(b"\"'") in _terms for v in value.split()])
+
+def may_contain_structured_data(data, options) :
+	"""
+	Check whether the content may contain structured data for any of the extractors switched on in the options.
+	@param data: the raw content of the page
+	@type data: bytes or string
+	@param options: the extraction options
+	@type options: L{SDEOptions}
+	@return: False if the content surely contains no structured data, True otherwise
+	@rtype: Boolean
+	"""
+	if isinstance(data, str) :
+		data = data.encode("utf-8")
+	if data[:2] in [b'\xff\xfe', b'\xfe\xff'] or b'\x00' in data[:1024] :
+		# UTF-16 or UTF-32; the ASCII patterns cannot be used
+		return True
+
+	if options.hturtle and b"turtle" in data :
+		return True
+
+	if options.rdfa or options.microdata :
+		lower = data.lower()
+		if options.microdata and _itemscope.search(lower) :
+			return True
+		if options.rdfa :
+			if _rdfa_attribute.search(lower) :
+				return True
+			for m in _rdfa_rel.finditer(lower) :
+				if _rel_value(m.group(1)) :
+					return True
+	return False
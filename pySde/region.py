@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Restriction of the extraction to regions of a page. The regions are the subtrees of the elements matched by a CSS
+selector (set in the C{region} option of L{SDEOptions}); the extractors get a new DOM tree containing copies of these
+subtrees only, ie, the rest of the (possibly large) page is not walked through at all.
+
+Only a subset of CSS selectors is supported: type selectors (C{div}, C{*}), id selectors (C{#product}), class
+selectors (C{.item}), attribute selectors (C{[itemscope]}, C{[typeof=schema:Product]}, C{[rel~=license]}), the
+descendant and child (C{>}) combinators, and groups of selectors separated by commas. An element inside a region is
+not a region in its own right, ie, its content is not extracted twice.
+
+The new tree keeps the context that the extractors need from outside the regions: the attributes setting prefixes,
+vocabularies, and languages on the ancestors of a region are copied onto a wrapper element, and the C{base} element
+of the page is copied, too. Other context is lost, though: e.g., an RDFa subject set on an ancestor, or a microdata
+C{itemref} to an element outside the regions.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+
+@var context_attributes: attributes of the ancestors that are copied onto the wrapper of a region
+"""
+
+import re
+from xml.dom import minidom
+
+_xhtml_ns = "http://www.w3.org/1999/xhtml"
+
+context_attributes = ["prefix", "vocab", "lang", "xml:lang"]
+
+_name      = re.compile(r'[\w-]+|\*')
+_simple    = re.compile(r'([#.])([\w-]+)')
+_attribute = re.compile(r'\[\s*([\w:-]+)\s*(?:([~]?=)\s*("[^"]*"|\'[^\']*\'|[^\]\s]+)\s*)?\]')
+
+class _Compound :
+	"""A compound selector: a type, and a number of id, class, and attribute conditions"""
+	def __init__(self) :
+		self.tag        = None
+		self.ids        = []
+		self.classes    = []
+		self.attributes = []
+
+	def matches(self, element) :
+		if self.tag != None and element.tagName.lower() != self.tag :
+			return False
+		for id in self.ids :
+			if element.getAttribute("id") != id :
+				return False
+		if len(self.classes) > 0 :
+			classes = element.getAttribute("class").split()
+			for c in self.classes :
+				if c not in classes :
+					return False
+		for (name, operator, value) in self.attributes :
+			if not element.hasAttribute(name) :
+				return False
+			if operator == "=" and element.getAttribute(name) != value :
+				return False
+			if operator == "~=" and value not in element.getAttribute(name).split() :
+				return False
+		return True
+
+def parse_selector(selector) :
+	"""
+	Parse a selector.
+	@param selector: the selector
+	@return: list of the alternatives of the group; each is a list of (combinator, compound selector) pairs, the combinator being the one before the compound (None for the first)
+	@raise ValueError: the selector is not supported
+	"""
+	retval      = []
+	current     = []
+	combinator  = None
+	i           = 0
+	selector    = selector.strip()
+	while i < len(selector) :
+		c = selector[i]
+		if c.isspace() or c == '>' :
+			j = i
+			while j < len(selector) and selector[j].isspace() :
+				j += 1
+			if j < len(selector) and selector[j] == '>' :
+				combinator = '>'
+				j += 1
+				while j < len(selector) and selector[j].isspace() :
+					j += 1
+			elif combinator == None :
+				combinator = ' '
+			i = j
+			continue
+		if c == ',' :
+			if len(current) == 0 :
+				raise ValueError("Unsupported selector: %s" % selector)
+			retval.append(current)
+			(current, combinator) = ([], None)
+			i += 1
+			continue
+
+		compound = _Compound()
+		start    = i
+		m = _name.match(selector, i)
+		if m :
+			if m.group(0) != '*' :
+				compound.tag = m.group(0).lower()
+			i = m.end()
+		while i < len(selector) :
+			m = _simple.match(selector, i)
+			if m :
+				if m.group(1) == '#' :
+					compound.ids.append(m.group(2))
+				else :
+					compound.classes.append(m.group(2))
+				i = m.end()
+				continue
+			m = _attribute.match(selector, i)
+			if m :
+				value = m.group(3)
+				if value != None and value[0] in "\"'" :
+					value = value[1:-1]
+				compound.attributes.append((m.group(1), m.group(2), value))
+				i = m.end()
+				continue
+			break
+		if i == start or (len(current) > 0 and combinator == None) or (len(current) == 0 and combinator == '>') :
+			raise ValueError("Unsupported selector: %s" % selector)
+		current.append((combinator if len(current) > 0 else None, compound))
+		combinator = None
+	if len(current) == 0 or combinator != None :
+		# An empty selector, or one ending with a comma or a combinator
+		raise ValueError("Unsupported selector: %s" % selector)
+	retval.append(current)
+	return retval
+
+def _matches(element, chain, i) :
+	"""Check whether an element matches the chain of compound selectors, up to (and including) the i-th"""
+	(combinator, compound) = chain[i]
+	if not compound.matches(element) :
+		return False
+	if i == 0 :
+		return True
+	parent = element.parentNode
+	if combinator == '>' :
+		return parent != None and parent.nodeType == parent.ELEMENT_NODE and _matches(parent, chain, i - 1)
+	while parent != None and parent.nodeType == parent.ELEMENT_NODE :
+		if _matches(parent, chain, i - 1) :
+			return True
+		parent = parent.parentNode
+	return False
+
+def select_regions(dom, selector) :
+	"""
+	Find the regions of a tree, in document order. The walk does not go into the regions themselves.
+	@param dom: a DOM Node element, the top level entry node for the whole tree
+	@param selector: the CSS selector
+	@return: list of elements
+	@raise ValueError: the selector is not supported
+	"""
+	group  = parse_selector(selector)
+	retval = []
+	stack  = [dom.documentElement]
+	while len(stack) > 0 :
+		node = stack.pop()
+		if any([_matches(node, chain, len(chain) - 1) for chain in group]) :
+			retval.append(node)
+			continue
+		for child in reversed(node.childNodes) :
+			if child.nodeType == child.ELEMENT_NODE :
+				stack.append(child)
+	return retval
+
+def _copy(doc, node) :
+	"""
+	Deep copy of a node into another document. An explicit stack is used, ie, the copy is not limited by the depth of the tree.
+	"""
+	def shallow(node) :
+		if node.nodeType == node.ELEMENT_NODE :
+			copy = doc.createElementNS(node.namespaceURI, node.tagName)
+			for (name, value) in node.attributes.items() :
+				copy.setAttribute(name, value)
+			return copy
+		elif node.nodeType == node.TEXT_NODE :
+			return doc.createTextNode(node.data)
+		elif node.nodeType == node.CDATA_SECTION_NODE :
+			return doc.createCDATASection(node.data)
+		else :
+			return None
+
+	root  = shallow(node)
+	stack = [(node, root)]
+	while len(stack) > 0 :
+		(original, copy) = stack.pop()
+		for child in original.childNodes :
+			child_copy = shallow(child)
+			if child_copy != None :
+				copy.appendChild(child_copy)
+				if child.nodeType == child.ELEMENT_NODE :
+					stack.append((child, child_copy))
+	return root
+
+def _context(region) :
+	"""
+	The context attributes of the ancestors of a region. The closest ancestor wins, except for C{prefix}: the
+	prefix definitions of all ancestors are in scope, so their values are concatenated.
+	"""
+	retval   = {}
+	prefixes = []
+	parent   = region.parentNode
+	while parent != None and parent.nodeType == parent.ELEMENT_NODE :
+		for name in context_attributes :
+			if name == "prefix" and parent.hasAttribute(name) :
+				prefixes.insert(0, parent.getAttribute(name))
+			elif name not in retval and parent.hasAttribute(name) :
+				retval[name] = parent.getAttribute(name)
+		for (name, value) in parent.attributes.items() :
+			if name.startswith("xmlns:") and name not in retval :
+				retval[name] = value
+		parent = parent.parentNode
+	if len(prefixes) > 0 :
+		retval["prefix"] = " ".join(prefixes)
+	return retval
+
+def restrict_DOM(dom, selector) :
+	"""
+	Create a new tree with the regions of a tree only (see the module description).
+	@param dom: a DOM Node element, the top level entry node for the whole tree
+	@param selector: the CSS selector
+	@return: the new tree (or the original one, if the root element itself is selected), or None if there is no region at all
+	@raise ValueError: the selector is not supported
+	"""
+	regions = select_regions(dom, selector)
+	if len(regions) == 0 :
+		return None
+	if dom.documentElement in regions :
+		return dom
+
+	doc  = minidom.getDOMImplementation().createDocument(None, None, None)
+	html = doc.createElementNS(_xhtml_ns, "html")
+	head = doc.createElementNS(_xhtml_ns, "head")
+	body = doc.createElementNS(_xhtml_ns, "body")
+	doc.appendChild(html)
+	html.appendChild(head)
+	html.appendChild(body)
+
+	# The base element of the head sets the base for the whole page
+	if not any([region.tagName.lower() == "head" for region in regions]) :
+		for child in dom.documentElement.childNodes :
+			if child.nodeType == child.ELEMENT_NODE and child.tagName.lower() == "head" :
+				for base in [e for e in child.childNodes if e.nodeType == e.ELEMENT_NODE and e.tagName.lower() == "base"][:1] :
+					head.appendChild(_copy(doc, base))
+
+	for region in regions :
+		name = region.tagName.lower()
+		if name == "head" or name == "body" :
+			copy = _copy(doc, region)
+			for (attribute, value) in _context(region).items() :
+				if not copy.hasAttribute(attribute) :
+					copy.setAttribute(attribute, value)
+			if name == "head" :
+				html.replaceChild(copy, head)
+				head = copy
+			else :
+				html.replaceChild(copy, body)
+				body = copy
+		else :
+			wrapper = doc.createElementNS(_xhtml_ns, "div")
+			for (attribute, value) in _context(region).items() :
+				wrapper.setAttribute(attribute, value)
+			wrapper.appendChild(_copy(doc, region))
+			body.appendChild(wrapper)
+	return doc
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Single pass pre-scan of the DOM tree. The tree is walked once to find out which of the extractors (RDFa, microdata,
+embedded Turtle) have anything to do at all; the extractors that have nothing to do can be skipped, avoiding
+their own walk through the (possibly large) tree. The C{script} elements with embedded Turtle are collected
+along the way, so that they do not have to be searched for again.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+
+@var rdfa_attributes: attributes whose presence on any element means that the RDFa processor may generate triples
+@var rdfa_terms: terms of the RDFa initial context that generate triples when used in C{@rel} or C{@rev}
+"""
+
+from pySde.hturtle import is_turtle_script
+from pySde.limits  import LimitExceeded
+
+rdfa_attributes = ["about", "property", "typeof", "resource", "vocab", "prefix", "role"]
+rdfa_terms      = ["describedby", "license", "role"]
+
+class DOMScan :
+	"""
+	Result of the scan of a DOM tree.
+	@ivar rdfa: whether the tree includes any RDFa attributes
+	@ivar microdata: whether the tree includes any C{@itemscope} attributes
+	@ivar turtle_scripts: list of the C{script} elements with C{type="text/turtle"}, in document order
+	@ivar nodes: number of elements visited; this is the number of elements in the tree only if the scan was asked to count them
+	"""
+	def __init__(self) :
+		self.rdfa           = False
+		self.microdata      = False
+		self.turtle_scripts = []
+		self.nodes          = 0
+
+def _rdfa_rel(value) :
+	"""
+	Check whether a C{@rel} or C{@rev} value generates triples. In HTML5 only CURIEs, absolute URIs and the few
+	terms in the RDFa initial context do; usual values like "stylesheet" or "icon" are ignored by the RDFa processor
+	(a C{@vocab}, that would change this, is checked for separately).
+	"""
+	for v in value.split() :
+		if ':' in v or v.lower() in rdfa_terms :
+			return True
+	return False
+
+def scan_DOM(dom, options, count = False) :
+	"""
+	Walk the DOM tree once, and collect the information on the structured data it contains. Only the
+	extractors switched on in the options are looked for. The walk uses an explicit stack, ie, it is not
+	limited by the depth of the tree.
+	@param dom: a DOM Node element, the top level entry node for the whole tree
+	@param options: the extraction options
+	@type options: L{SDEOptions}
+	@keyword count: whether all the elements should be counted; if not, the walk stops as soon as everything has been found
+	@return: the result of the scan
+	@rtype: L{DOMScan}
+	@raise LimitExceeded: the tree has more elements than the C{max_nodes} option allows; all elements are counted if this option is set
+	"""
+	retval = DOMScan()
+	look_for_rdfa      = options.rdfa
+	look_for_microdata = options.microdata
+	look_for_turtle    = options.hturtle
+	max_nodes          = options.max_nodes
+	count              = count or max_nodes != None
+
+	stack = [dom.documentElement]
+	while len(stack) > 0 :
+		if not (count or look_for_rdfa or look_for_microdata or look_for_turtle) :
+			# everything has been found already
+			break
+		node = stack.pop()
+		retval.nodes += 1
+		if max_nodes != None and retval.nodes > max_nodes :
+			raise LimitExceeded("The document has more than the limit of %s elements" % max_nodes)
+		if node.hasAttributes() and (look_for_rdfa or look_for_microdata) :
+			for name in node.attributes.keys() :
+				if look_for_rdfa :
+					if name in rdfa_attributes or ((name == "rel" or name == "rev") and _rdfa_rel(node.getAttribute(name))) :
+						retval.rdfa   = True
+						look_for_rdfa = False
+				if look_for_microdata and name == "itemscope" :
+					retval.microdata   = True
+					look_for_microdata = False
+
+		if node.nodeName.lower() == "script" :
+			if look_for_turtle and is_turtle_script(node) :
+				retval.turtle_scripts.append(node)
+			# The content of a script element is text only, nothing to look for there
+			continue
+
+		# Children are pushed in reverse order to keep the document order of the walk
+		for child in reversed(node.childNodes) :
+			if child.nodeType == child.ELEMENT_NODE :
+				stack.append(child)
+
+	return retval
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Chunked serialization of a graph: the serialization is returned as an iterator of UTF-8 encoded chunks, instead of one
+string, so that a (WSGI or CGI) response can be sent while the serialization goes on. The whole output is never held in
+memory, and the client receives the first bytes as soon as the first chunk is ready.
+
+The line based formats ("nt" and "nquads") are chunked triple by triple. Turtle (and N3) is chunked subject by subject:
+the Turtle serializer of rdflib is driven step by step, and the output written so far is sent whenever it is larger than
+the chunk size. For all other formats (e.g., RDF/XML or JSON-LD) the serialization is done in one go, and the result is
+cut into chunks.
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import io
+
+from rdflib import Literal
+from rdflib.plugin import get as get_plugin
+from rdflib.serializer import Serializer
+from rdflib.plugins.serializers.turtle import TurtleSerializer
+
+from pySde import graph_name
+
+def nt_term(term) :
+	"""
+	The N-Triples form of a term. This is the C{n3} form of the term, except for the literals with a line break: C{n3}
+	returns a (Turtle) multi-line string for those, which is not valid in N-Triples, ie, the line breaks are escaped.
+	@param term: an rdflib term
+	@rtype: string
+	"""
+	if isinstance(term, Literal) and ("\n" in term or "\r" in term) :
+		quoted = '"%s"' % term.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+		if term.language :
+			return "%s@%s" % (quoted, term.language)
+		elif term.datatype :
+			return "%s^^%s" % (quoted, term.datatype.n3())
+		return quoted
+	return term.n3()
+
+def _line_chunks(graph, chunk_size, context = None) :
+	"""The N-Triples (or, with a graph name, N-Quads) serialization of the graph, cut into chunks"""
+	label = " %s .\n" % context.n3() if context != None else " .\n"
+	lines = []
+	size  = 0
+	for (s, p, o) in graph :
+		line = "%s %s %s%s" % (s.n3(), p.n3(), nt_term(o), label)
+		lines.append(line)
+		size += len(line)
+		if size >= chunk_size :
+			yield "".join(lines).encode("utf-8")
+			(lines, size) = ([], 0)
+	if len(lines) > 0 :
+		yield "".join(lines).encode("utf-8")
+
+def _turtle_chunks(serializer, chunk_size) :
+	"""
+	The serialization of a Turtle (or N3) serializer, cut into chunks at the end of the subjects. This follows the
+	C{serialize} method of rdflib's Turtle serializer, with the output written into a buffer that is emptied after each
+	subject, if it is large enough.
+	"""
+	stream = io.BytesIO()
+	serializer.reset()
+	serializer.stream = stream
+	if serializer.store.base != None :
+		serializer.base = serializer.store.base
+
+	serializer.preprocess()
+	subjects = serializer.orderSubjects()
+	serializer.startDocument()
+	first = True
+	for subject in subjects :
+		if serializer.isDone(subject) :
+			continue
+		if first :
+			first = False
+		if serializer.statement(subject) and not first :
+			serializer.write("\n")
+		if stream.tell() >= chunk_size :
+			yield stream.getvalue()
+			stream.seek(0)
+			stream.truncate()
+	serializer.endDocument()
+	stream.write(b"\n")
+	serializer.base = None
+	yield stream.getvalue()
+
+def serialize_chunks(graph, outputFormat, chunk_size = 65536, name = None) :
+	"""
+	Serialize a graph into chunks.
+	@param graph: the graph
+	@param outputFormat: the serialization format
+	@keyword chunk_size: the (approximate) size of the chunks, in bytes
+	@keyword name: the source of the graph; used for the name of the graph (see L{graph_name}) in the "nquads" format
+	@return: an iterator of UTF-8 encoded chunks
+	"""
+	if outputFormat in ["nt", "nquads"] :
+		context = graph_name(name) if outputFormat == "nquads" else None
+		for chunk in _line_chunks(graph, chunk_size, context) :
+			yield chunk
+		return
+
+	serializer = get_plugin(outputFormat, Serializer)(graph)
+	if isinstance(serializer, TurtleSerializer) :
+		for chunk in _turtle_chunks(serializer, chunk_size) :
+			yield chunk
+		return
+
+	data = graph.serialize(format = outputFormat, encoding = "utf-8")
+	for i in range(0, len(data), chunk_size) :
+		yield data[i:i + chunk_size]
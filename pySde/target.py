@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Targets for the output of large batches. By default, the graphs of all the sources are merged into one in-memory
+graph (see L{pySde.rdf_from_sources}), ie, the memory needed grows with the size of the corpus. With a target, the
+graph of each source is handed over to the target as soon as that source is processed, and then dropped; the memory
+ceiling then depends on the target only (see L{pySde.store_from_sources}).
+
+The triples are added to the target in batches, through the C{addN} method of rdflib, instead of one at a time:
+stores backed by a database (e.g., rdflib's C{BerkeleyDB} store, or SQL based plugin stores) can use one bulk
+operation per batch.
+
+A target is an instance of a subclass of L{Target}; the L{GraphTarget} class stores the triples in any rdflib graph,
+ie, in any rdflib store. Other targets (e.g., a bulk loader of a triple store) can be plugged in by subclassing L{Target}.
+
+Typical usage, with a persistent store::
+
+	graph = Graph("BerkeleyDB")
+	graph.open("/var/data/sde", create = True)
+	with GraphTarget(graph) as target :
+		processor.store_from_sources(uris, target, rdfOutput = True)
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from pySde import graph_name
+
+def add_graph(graph, source_graph, batch_size = 10000, context = None) :
+	"""
+	Add the triples and the namespace bindings of a graph to another one, in batches.
+	@param graph: the target graph
+	@param source_graph: the graph to add
+	@keyword batch_size: number of triples added in one C{addN} call
+	@keyword context: the graph the triples are added to, if C{graph} is a dataset (ie, a named graph of C{graph}); C{graph} itself otherwise
+	@return: the number of triples added
+	"""
+	if context == None :
+		context = graph
+	# The quads must refer to the very same graph object, see rdflib's Graph.addN
+	quads = ((s, p, o, context) for (s, p, o) in source_graph)
+	count = 0
+	while True :
+		batch = list(islice(quads, batch_size))
+		if len(batch) == 0 :
+			break
+		graph.addN(batch)
+		count += len(batch)
+	for (prefix, ns) in source_graph.namespaces() :
+		graph.bind(prefix, ns, override = False)
+	return count
+
+class Target(ABC) :
+	"""
+	Target of the graphs of a batch. Subclasses must implement the L{add} method; the target can be used as a context
+	manager, that calls L{close} at the end.
+	"""
+	@abstractmethod
+	def add(self, name, graph) :
+		"""
+		Add the graph of a source to the target.
+		@param name: the source; a URI, a file name, or a file-like object
+		@param graph: the graph of the source
+		@return: the number of triples added
+		"""
+		pass
+
+	def close(self) :
+		"""Flush and release the target. The default implementation does nothing."""
+		pass
+
+	def __enter__(self) :
+		return self
+
+	def __exit__(self, *args) :
+		self.close()
+
+class GraphTarget(Target) :
+	"""
+	Target adding the triples to an rdflib graph, ie, to the store of that graph. If the store is transaction aware,
+	a commit is done after each source.
+	@ivar graph: the graph
+	@ivar batch_size: number of triples added in one C{addN} call
+	@ivar named_graphs: whether each source is put into a separate named graph (see L{graph_name}); C{graph} must be a C{Dataset} or a C{ConjunctiveGraph} in this case
+	@ivar triples: number of triples added so far
+	"""
+	def __init__(self, graph, batch_size = 10000, named_graphs = False) :
+		"""
+		@param graph: the graph
+		@keyword batch_size: number of triples added in one C{addN} call
+		@keyword named_graphs: whether each source is put into a separate named graph
+		"""
+		self.graph        = graph
+		self.batch_size   = batch_size
+		self.named_graphs = named_graphs
+		self.triples      = 0
+
+	def add(self, name, graph) :
+		context = self.graph.get_context(graph_name(name)) if self.named_graphs else None
+		count = add_graph(self.graph, graph, self.batch_size, context)
+		if self.graph.store.transaction_aware :
+			self.graph.commit()
+		self.triples += count
+		return count
+
+	def close(self) :
+		"""Commit the pending changes, if the store is transaction aware; the graph itself is not closed."""
+		if self.graph.store.transaction_aware :
+			self.graph.commit()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Vocabulary expansion of the RDFa triples (see the C{vocab_expansion} option of L{SDEOptions}), with a vocabulary cache
+shared by the processors. pyRdfa, left to itself, retrieves and parses each vocabulary referred to by C{@vocab} for every
+document, and computes the RDFS/OWL closure of the vocabularies again, before expanding the graph of the document. The
+expansion is done here instead, following the same steps (see C{pyRdfa.rdfs.process.process_rdfa_sem}), but:
+
+ - the vocabularies are kept in memory and, optionally, on the disk (see L{cache.DiskCache}), as N-Triples; an entry
+ expires after a time-to-live, and is then retrieved again;
+ - the closure of each combination of vocabularies is computed only once, while its vocabularies are valid;
+ - vocabularies can be preloaded from local files, eg, to avoid network access altogether for the well known ones;
+ preloaded vocabularies never expire;
+ - a vocabulary that cannot be retrieved is not asked for again for a (shorter) time-to-live; if an expired copy is
+ available, it is used for that time instead.
+
+The retrieval and the parsing of the vocabularies, and the closure itself, are those of pyRdfa (C{return_graph} and
+C{MiniOWL}); the result of the expansion is the same.
+
+By default, all the processors of the interpreter share the same, memory only, cache (see L{default_cache}); a
+processor can be given its own cache, though (see L{pySde}).
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import time, uuid, threading
+
+from rdflib import Graph
+from rdflib.util import guess_format
+
+from pySde.cache import DiskCache
+
+_default_cache = None
+# The caches restored in a worker process, so that a cache sent along with each task is restored (and its vocabularies
+# preloaded) only once per process
+_instances     = {}
+_lock          = threading.Lock()
+
+def default_cache() :
+	"""
+	The cache shared by the processors without a cache of their own, created at the first call.
+	@rtype: L{VocabCache}
+	"""
+	global _default_cache
+	with _lock :
+		if _default_cache == None :
+			_default_cache = VocabCache()
+		return _default_cache
+
+def _restore(token, state) :
+	"""Unpickle a cache (see L{VocabCache.__reduce__}); a cache already restored in this process is reused"""
+	with _lock :
+		if token not in _instances :
+			cache = VocabCache(state["directory"], state["ttl"], state["failure_ttl"], state["max_disk"])
+			for (uri, fname, format) in state["preloaded"] :
+				cache.preload(uri, fname, format)
+			cache._token = token
+			_instances[token] = cache
+		return _instances[token]
+
+def _expired(expires, now) :
+	return expires != None and expires <= now
+
+class VocabCache :
+	"""
+	Cache of the vocabularies and of their closures.
+
+	A cache can be sent to worker processes (see L{pySde.graphs_from_sources}): the preloaded vocabularies are loaded
+	again, from their files, in each process, and the on-disk tier is shared; the vocabularies should therefore be
+	preloaded before the cache is used.
+	@ivar ttl: time-to-live of a retrieved vocabulary, in seconds
+	@ivar failure_ttl: time-to-live of a failed retrieval, in seconds
+	@ivar disk: the on-disk tier, or None
+	@ivar hits: number of vocabularies found in the cache
+	@ivar misses: number of vocabularies retrieved
+	"""
+	def __init__(self, directory = None, ttl = 24 * 3600, failure_ttl = 600, max_disk = 100 * 1024 * 1024) :
+		"""
+		@keyword directory: directory for the on-disk tier; if None, there is no on-disk tier
+		@keyword ttl: time-to-live of a retrieved vocabulary, in seconds
+		@keyword failure_ttl: time-to-live of a failed retrieval, in seconds
+		@keyword max_disk: maximum size of the on-disk tier, in bytes
+		"""
+		self.directory   = directory
+		self.ttl         = ttl
+		self.failure_ttl = failure_ttl
+		self.max_disk    = max_disk
+		self.disk        = DiskCache(directory, max_disk) if directory != None else None
+		self.hits        = 0
+		self.misses      = 0
+		# vocabulary URI -> (graph or None, expiration time or None)
+		self._vocabs     = {}
+		# sorted tuple of vocabulary URIs -> (the vocabulary graphs used, the closure)
+		self._closures   = {}
+		self._preloaded  = []
+		self._lock       = threading.Lock()
+		self._token      = uuid.uuid4().hex
+
+	def __reduce__(self) :
+		# The lock cannot be pickled, and the vocabularies may be large: the preloaded files are read again on the other
+		# side, once per process
+		state = {
+			"directory"   : self.directory,
+			"ttl"         : self.ttl,
+			"failure_ttl" : self.failure_ttl,
+			"max_disk"    : self.max_disk,
+			"preloaded"   : list(self._preloaded),
+		}
+		return (_restore, (self._token, state))
+
+	def preload(self, uri, fname, format = None) :
+		"""
+		Load a vocabulary from a local file; the vocabulary is used whenever C{uri} is referred to, and never expires.
+		@param uri: the URI of the vocabulary, as used in C{@vocab}
+		@param fname: the file name
+		@keyword format: the format of the file; guessed from the file name extension if None
+		"""
+		graph = Graph()
+		graph.parse(fname, format = format if format != None else guess_format(fname))
+		with self._lock :
+			self._vocabs[uri] = (graph, None)
+			self._preloaded.append((uri, fname, format))
+
+	def _fetch(self, uri) :
+		"""Retrieve and parse a vocabulary, with pyRdfa; the warnings are ignored"""
+		from pyRdfa.options      import Options
+		from pyRdfa.rdfs.process import return_graph
+		(graph, expiration_date) = return_graph(uri, Options())
+		return graph
+
+	def vocabulary(self, uri) :
+		"""
+		Get a vocabulary: from memory, from the disk or, if it is not in the cache (or has expired), from the Web.
+		@param uri: the URI of the vocabulary
+		@return: the vocabulary graph, or None if it cannot be retrieved; the graph should not be modified
+		"""
+		now = time.time()
+		with self._lock :
+			entry = self._vocabs.get(uri)
+			if entry != None and not _expired(entry[1], now) :
+				self.hits += 1
+				return entry[0]
+		stale = entry[0] if entry != None else None
+
+		if self.disk != None :
+			disk_entry = self.disk.get(uri)
+			if disk_entry != None :
+				(data, meta) = disk_entry
+				graph = Graph()
+				graph.parse(data = data, format = "nt")
+				if not _expired(meta.get("expires"), now) :
+					with self._lock :
+						self._vocabs[uri] = (graph, meta.get("expires"))
+						self.hits += 1
+					return graph
+				stale = graph
+
+		graph = self._fetch(uri)
+		if graph != None :
+			expires = now + self.ttl
+			if self.disk != None :
+				self.disk.put(uri, graph.serialize(format = "nt", encoding = "utf-8"), { "expires" : expires })
+		else :
+			(graph, expires) = (stale, now + self.failure_ttl)
+		with self._lock :
+			self._vocabs[uri] = (graph, expires)
+			self.misses += 1
+		return graph
+
+	def closure(self, uris) :
+		"""
+		Get the merge of vocabularies, expanded through the RDFS and OWL rules of RDFa; the result is cached as long as
+		the vocabularies are the same.
+		@param uris: the URIs of the vocabularies
+		@return: the closure graph; it should not be modified
+		"""
+		from pyRdfa.rdfs.process import MiniOWL
+		key    = tuple(sorted(set(uris)))
+		graphs = [self.vocabulary(uri) for uri in key]
+		with self._lock :
+			entry = self._closures.get(key)
+			if entry != None and all([old is new for (old, new) in zip(entry[0], graphs)]) :
+				return entry[1]
+
+		retval = Graph()
+		for graph in graphs :
+			if graph != None :
+				retval += graph
+		MiniOWL(retval, schema_semantics = True).closure()
+		with self._lock :
+			self._closures[key] = (graphs, retval)
+		return retval
+
+	def expand(self, graph) :
+		"""
+		Expand a graph of RDFa triples with the vocabularies it uses (ie, the objects of its C{rdfa:usesVocabulary}
+		triples), the same way as pyRdfa does: the closure of the vocabularies is added to the graph, the graph is
+		expanded, and the triples of the closure are removed.
+		@param graph: the graph, expanded in place
+		@return: the graph
+		"""
+		from pyRdfa              import RDFA_VOCAB
+		from pyRdfa.rdfs.process import MiniOWL
+		vocab_graph = self.closure([str(v) for v in graph.objects(None, RDFA_VOCAB)])
+		graph += vocab_graph
+		MiniOWL(graph).closure()
+		for t in vocab_graph :
+			graph.remove(t)
+		return graph
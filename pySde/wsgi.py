@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+WSGI entry point for the SDE package: a long running alternative to the CGI script (C{scripts/CGI_sde.py}).
+
+All the modules (RDFLib, html5lib, pyRdfa, pyMicrodata) are imported, and the JSON-LD serializer is registered, only
+once, when this module is loaded; each request is then handled by L{pySde.processURI_chunks}, with the same form parameters
+as for the CGI script (C{uri}, C{text}, C{uploaded}, C{source}, C{format}, C{vocab_expansion}, C{region}, C{parallel_extractors}, C{forceRDFOutput}). A
+new processor is created for each request, ie, requests can be handled concurrently by a multithreaded server; the
+processors share a fetcher, by default a L{fetch.PooledHTTPFetcher}, ie, the connections to the hosts are reused from
+one request to the other. The serialization is streamed to the client, in chunks, as it goes on (see L{streaming}).
+
+The module level C{application} object can be used by any WSGI server; running the module itself starts a (threaded)
+server for local use::
+
+	python -m pySde.wsgi 8000
+
+@author: U{Ivan Herman<a href="http://www.w3.org/People/Ivan/">}
+@license: This software is available for use under the
+U{W3C® SOFTWARE NOTICE AND LICENSE<href="http://www.w3.org/Consortium/Legal/2002/copyright-software-20021231">}
+@contact: Ivan Herman, ivan@w3.org
+"""
+
+import sys, os, itertools
+import urllib.parse
+from io import BytesIO
+
+# Everything is imported here, once for the lifetime of the service, instead of at the first request
+import rdflib
+import html5lib
+import pyRdfa
+import pyRdfa.options
+import pyRdfa.host
+import pyMicrodata
+import pySde.hturtle
+import pySde.scan
+import pySde.fetch
+
+from pySde import processURI_chunks
+
+# Register the JSON-LD serializer under the 'json' name, too; older setups rely on the separate rdflib_jsonld package,
+# newer versions of RDFLib include it
+from rdflib.plugin import register, Serializer
+try :
+	import rdflib_jsonld
+	register('json', Serializer, 'rdflib_jsonld.serializer', 'JsonLDSerializer')
+except ImportError :
+	register('json', Serializer, 'rdflib.plugins.serializers.jsonld', 'JsonLDSerializer')
+
+#########################################################################################################
+class FormField :
+	"""
+	A form field, mimicking the relevant part of the C{cgi.FieldStorage} interface.
+	@ivar value: the value of the field (a string, or bytes for an uploaded file)
+	@ivar file: file-like object for an uploaded file, None otherwise
+	@ivar filename: the name of the uploaded file, None otherwise
+	"""
+	def __init__(self, value, filename = None) :
+		self.value    = value
+		self.filename = filename
+		self.file     = BytesIO(value) if filename != None else None
+
+class Form :
+	"""
+	The parameters of a request, mimicking the C{cgi.FieldStorage} methods used by L{pySde.processURI}. The
+	parameters are collected from the query string and from the body of a POST request (either URL encoded or
+	C{multipart/form-data}).
+	"""
+	def __init__(self, environ) :
+		"""
+		@param environ: the WSGI environment of the request
+		"""
+		self._fields = {}
+		for (name, value) in urllib.parse.parse_qsl(environ.get("QUERY_STRING", ""), keep_blank_values = True) :
+			self._add(name, FormField(value))
+
+		if environ.get("REQUEST_METHOD", "GET").upper() == "POST" :
+			try :
+				length = int(environ.get("CONTENT_LENGTH") or 0)
+			except ValueError :
+				length = 0
+			body = environ["wsgi.input"].read(length) if length > 0 else b""
+			content_type = environ.get("CONTENT_TYPE", "")
+			if content_type.startswith("multipart/form-data") :
+				self._parse_multipart(content_type, body)
+			else :
+				for (name, value) in urllib.parse.parse_qsl(body.decode("utf-8", "replace"), keep_blank_values = True) :
+					self._add(name, FormField(value))
+
+	def _add(self, name, field) :
+		self._fields.setdefault(name, []).append(field)
+
+	def _parse_multipart(self, content_type, body) :
+		from email.parser import BytesParser
+		from email.policy import HTTP
+		message = BytesParser(policy = HTTP).parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+		for part in message.iter_parts() :
+			name = part.get_param("name", header = "content-disposition")
+			if name == None :
+				continue
+			payload  = part.get_payload(decode = True) or b""
+			filename = part.get_filename()
+			if filename != None :
+				self._add(name, FormField(payload, filename))
+			else :
+				charset = part.get_content_charset() or "utf-8"
+				self._add(name, FormField(payload.decode(charset, "replace")))
+
+	def keys(self) :
+		return list(self._fields.keys())
+
+	def __contains__(self, name) :
+		return name in self._fields
+
+	def __getitem__(self, name) :
+		return self._fields[name][0]
+
+	def getfirst(self, name, default = None) :
+		if name in self._fields :
+			return self._fields[name][0].value
+		return default
+
+	def getlist(self, name) :
+		return [field.value for field in self._fields.get(name, [])]
+
+#########################################################################################################
+def _split_response(response) :
+	"""
+	Split the CGI style output of L{pySde.processURI} into a status line, a list of headers, and the body.
+	@param response: the full CGI output
+	@return: a (status, headers, body) tuple
+	"""
+	from http.server import BaseHTTPRequestHandler
+	(head, _sep, body) = response.partition("\n\n")
+	status  = 200
+	headers = []
+	for line in head.split("\n") :
+		(name, _sep, value) = line.partition(":")
+		if name.strip().lower() == "status" :
+			status = int(value.strip().split()[0])
+		elif name.strip() != "" :
+			headers.append((name.strip(), value.strip()))
+	reason = BaseHTTPRequestHandler.responses.get(status, ("",))[0]
+	return ("%s %s" % (status, reason), headers, body)
+
+def _error(start_response, status, msg) :
+	body = ("<html>\n<head>\n<title>Error in SDE processing</title>\n</head><body>\n<h1>Error in distilling structured data</h1>\n<p>%s</p>\n</body>\n</html>\n" % msg).encode("utf-8")
+	start_response(status, [("Content-Type", "text/html; charset=utf-8"), ("Content-Length", str(len(body)))])
+	return [body]
+
+def make_application(result_cache = None, metrics = None, engine = None, fetcher = None) :
+	"""
+	Create a WSGI application.
+	@keyword result_cache: cache of the extraction results, shared by all requests (see L{cache.ResultCache})
+	@keyword metrics: collector of the processing metrics, shared by all requests (see L{metrics.Metrics}); if set, the aggregated metrics are served, in the Prometheus text format, on the C{/metrics} path
+	@keyword engine: process pool for the extraction, shared by all requests (see L{engine.ProcessEngine})
+	@keyword fetcher: the fetcher used to retrieve the URIs, shared by all requests; if None, a new L{fetch.PooledHTTPFetcher} is used (a L{fetch.URIOpenerFetcher} should be used instead if the requests must go through a proxy)
+	@return: a WSGI application
+	"""
+	if fetcher == None :
+		fetcher = pySde.fetch.PooledHTTPFetcher()
+
+	def application(environ, start_response) :
+		if metrics != None and environ.get("PATH_INFO", "") == "/metrics" :
+			body = metrics.prometheus().encode("utf-8")
+			start_response("200 OK", [("Content-Type", "text/plain; version=0.0.4; charset=utf-8"), ("Content-Length", str(len(body)))])
+			return [body]
+
+		form = Form(environ)
+
+		# This follows the logic of the CGI script
+		if "uploaded" in form and form["uploaded"].file != None :
+			uri = "uploaded:"
+		elif "text" in form and form["text"].value != None and len(form["text"].value.strip()) != 0 :
+			uri = "text:"
+		elif form.getfirst("uri") :
+			uri = form.getfirst("uri")
+		else :
+			return _error(start_response, "400 Bad Request", "No URI has been specified")
+
+		if uri == "referer" :
+			referer = environ.get("HTTP_REFERER")
+			if referer == None :
+				return _error(start_response, "400 Bad Request", "No referer has been provided")
+			start_response("307 Temporary Redirect", [("Location", "?uri=" + urllib.parse.quote(referer, safe = ""))])
+			return [b""]
+
+		# Local file names should not be reachable through the service
+		if uri not in ["text:", "uploaded:"] and urllib.parse.urlparse(uri)[0] not in ["http", "https"] :
+			return _error(start_response, "400 Bad Request", "Only http and https URIs can be processed")
+
+		outputFormat = form.getfirst("format", "turtle")
+		chunks = processURI_chunks(uri, outputFormat, form, result_cache = result_cache, metrics = metrics, engine = engine,
+								   fetcher = fetcher)
+		# The first chunk is the CGI header block; the rest is streamed, without a Content-Length
+		(status, headers, body) = _split_response(next(chunks).decode("utf-8"))
+		start_response(status, headers)
+		return itertools.chain([body.encode("utf-8")] if len(body) > 0 else [], chunks)
+
+	return application
+
+application = make_application()
+
+def serve(host = "", port = 8000, app = None) :
+	"""
+	Run the application with a multithreaded version of the standard library's reference WSGI server.
+	@keyword host: host name to bind to
+	@keyword port: port to listen on
+	@keyword app: the WSGI application; the module level C{application} by default
+	"""
+	import socketserver
+	from wsgiref.simple_server import make_server, WSGIServer
+
+	class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer) :
+		daemon_threads = True
+
+	httpd = make_server(host, port, app if app != None else application, server_class = ThreadingWSGIServer)
+	httpd.serve_forever()
+
+if __name__ == "__main__" :
+	serve(port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
@@ -35,7 +35,7 @@ else :
 	sys.path.insert(0,'/home/ivan/lib/python')
 	cgitb.enable(display=0, logdir="/home/nobody/tracebacks/")
 
-from pySde import processURI
+from pySde import processURI_chunks
 
 # Register the RDFa JSON-LD serializer; for some reasons installing via pip did not work
 from rdflib.plugin import register, Serializer
@@ -139,5 +139,7 @@ else :
 		format = form.getfirst("format")
 	else :
 		format = "turtle"
-	retval = processURI(uri, format, form)
-	print(retval)
+	# The response is written as the serialization goes on
+	for chunk in processURI_chunks(uri, format, form) :
+		sys.stdout.buffer.write(chunk)
+		sys.stdout.buffer.flush()
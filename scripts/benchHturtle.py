@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark the extraction of embedded Turtle: pages with a growing number of script blocks (and, optionally, deeply
+nested markup) are generated, parsed, and the time spent in the hturtle extraction is measured, split into the search
+of the script blocks (see L{hturtle.find_turtle_scripts}) and the parsing of their content. The parsing of the blocks
+in one step was tried, too, and dropped: the Turtle parser itself dominates, and it gave a gain of 10% at most.
+"""
+
+import sys, getopt, time
+
+import html5lib
+
+from rdflib import Graph
+from pySde.hturtle import handle_embeddedRDF, find_turtle_scripts
+
+###########################################
+
+usageText="""Usage: %s -[d:r:b:]
+where:
+  -b: comma separated list of the number of script blocks per page (default: 1,10,100,1000)
+  -d: nesting depth of the markup around each block (default: 10)
+  -r: number of repetitions for each measurement; the best time is reported (default: 5)
+"""
+
+def usage() :
+	print(usageText % sys.argv[0])
+
+def generate_page(blocks, depth) :
+	"""Generate an HTML page with the given number of Turtle blocks, each within C{depth} nested div elements"""
+	page = ["<!DOCTYPE html>\n<html><head><title>hturtle benchmark</title></head><body>\n"]
+	for i in range(blocks) :
+		page.append("<div>" * depth)
+		page.append('<script type="text/turtle">\n')
+		page.append("@prefix ex: <http://www.example.org/terms/> .\n")
+		page.append('<http://www.example.org/item/%s> a ex:Item ; ex:index %s ; ex:label "Item %s" .\n' % (i, i, i))
+		page.append("</script>")
+		page.append("</div>" * depth)
+		page.append("\n")
+	page.append("</body></html>\n")
+	return "".join(page)
+
+def measure(function, repeat) :
+	"""Return the best time of the function"""
+	best = None
+	for _ in range(repeat) :
+		start = time.perf_counter()
+		function()
+		elapsed = time.perf_counter() - start
+		if best == None or elapsed < best :
+			best = elapsed
+	return best
+
+blocks = [1, 10, 100, 1000]
+depth  = 10
+repeat = 5
+
+try :
+	opts, value = getopt.getopt(sys.argv[1:],"b:d:r:")
+	for o,a in opts:
+		if o == "-b" :
+			blocks = [int(b) for b in a.split(",")]
+		elif o == "-d" :
+			depth = int(a)
+		elif o == "-r" :
+			repeat = int(a)
+		else :
+			usage()
+			sys.exit(1)
+except :
+	usage()
+	sys.exit(1)
+
+parser = html5lib.HTMLParser(tree=html5lib.treebuilders.getTreeBuilder("dom"))
+print("%8s %8s %14s %14s %14s" % ("blocks", "triples", "search (s)", "extraction (s)", "search share"))
+for n in blocks :
+	dom     = parser.parse(generate_page(n, depth))
+	search  = measure(lambda : find_turtle_scripts(dom.documentElement), repeat)
+	total   = measure(lambda : handle_embeddedRDF(dom.documentElement, Graph(), "http://www.example.org/"), repeat)
+	graph   = Graph()
+	handle_embeddedRDF(dom.documentElement, graph, "http://www.example.org/")
+	print("%8d %8d %14.4f %14.4f %13.1f%%" % (n, len(graph), search, total, 100 * search / total))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the per-document overhead on small pages: the same small page is distilled many times, either with
+a new processor for each document (ie, with the HTML parser and the RDFa/microdata processors rebuilt every time) or with
+one processor reused for all documents.
+"""
+
+import sys, getopt, time
+
+from pySde.options import SDEOptions
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s -[n:r:]
+where:
+  -n: number of documents per measurement (default: 500)
+  -r: number of repetitions for each measurement; the best time is reported (default: 3)
+"""
+
+def usage() :
+	print(usageText % sys.argv[0])
+
+page = b"""<!DOCTYPE html>
+<html prefix="ex: http://www.example.org/terms/">
+  <head><title>small page</title>
+    <script type="text/turtle">
+      @prefix ex: <http://www.example.org/terms/> .
+      <http://www.example.org/> ex:test "ABCD" .
+    </script>
+  </head>
+  <body>
+    <div about="http://www.example.org/item" typeof="ex:Item"><span property="ex:label">An item</span></div>
+    <div itemscope itemtype="http://schema.org/Thing"><span itemprop="name">A thing</span></div>
+  </body>
+</html>
+"""
+
+def measure(documents, reuse, repeat) :
+	"""Return the best time per document, in milliseconds"""
+	best = None
+	for _ in range(repeat) :
+		processor = pySde(options = SDEOptions())
+		start = time.perf_counter()
+		for _ in range(documents) :
+			if not reuse :
+				processor = pySde(options = SDEOptions())
+			processor.graph_from_source(page)
+		elapsed = (time.perf_counter() - start) * 1000 / documents
+		if best == None or elapsed < best :
+			best = elapsed
+	return best
+
+documents = 500
+repeat    = 3
+
+try :
+	opts, value = getopt.getopt(sys.argv[1:],"n:r:")
+	for o,a in opts:
+		if o == "-n" :
+			documents = int(a)
+		elif o == "-r" :
+			repeat = int(a)
+		else :
+			usage()
+			sys.exit(1)
+except :
+	usage()
+	sys.exit(1)
+
+fresh  = measure(documents, False, repeat)
+reused = measure(documents, True, repeat)
+print("new processor per document : %.3f ms/document" % fresh)
+print("reused processor           : %.3f ms/document" % reused)
+print("overhead saved             : %.3f ms/document (%.1f%%)" % (fresh - reused, 100 * (fresh - reused) / fresh))
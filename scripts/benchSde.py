@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the distiller. A corpus of HTML pages is generated (or read from a directory), varying the page
+size, the nesting depth, the mix of RDFa, microdata, and embedded Turtle, and the number of script blocks. The harness
+times the full distillation (L{pySde.graph_from_source}), the HTML parsing, each extractor separately (on a parsed
+DOM), and each serializer. The results (pages per second, triples per second, and the peak RSS of the process) are
+printed as JSON, so that runs can be stored and compared over time.
+
+In memory mode (C{-M}), the memory needed to accumulate the triples of a large corpus (with distinct subjects on each
+page) is measured instead, with C{tracemalloc}: merged into one rdflib graph, and in a L{accumulator.TripleAccumulator}.
+"""
+
+import sys, os, getopt, time, json, platform, resource, datetime, itertools, glob, tracemalloc
+
+import rdflib
+from rdflib import Graph
+
+from pySde.options import SDEOptions
+from pySde import pySde
+from pySde.target import GraphTarget
+from pySde.accumulator import TripleAccumulator
+
+###########################################
+
+usageText="""Usage: %s -[s:d:m:b:r:c:o:M:]
+where:
+  -s: comma separated list of page sizes, in number of items (default: 10,100,1000)
+  -d: comma separated list of nesting depths around each item (default: 2,20)
+  -m: comma separated list of structured data mixes; each mix is a combination of the letters r (RDFa), m (microdata), and t (Turtle) (default: r,m,t,rmt,-), '-' meaning no structured data
+  -b: number of Turtle script blocks per page, if Turtle is in the mix (default: 5)
+  -r: number of repetitions for each measurement; the best time is reported (default: 3)
+  -c: directory of HTML files to use as a corpus instead of the generated one
+  -o: directory to write the generated corpus to (the benchmark is not run)
+  -M: memory mode: number of pages of the corpus (e.g., 10000); the first page size, depth, and mix are used
+"""
+
+def usage() :
+	print(usageText % sys.argv[0])
+
+#########################################################################################################
+# Corpus generation
+def _nest(depth, content) :
+	return "<div>" * depth + content + "</div>" * depth
+
+def _rdfa_item(i) :
+	return ('<div about="http://www.example.org/rdfa/%s" typeof="ex:Item"><span property="ex:label">Item %s</span>'
+			'<a rel="ex:next" href="http://www.example.org/rdfa/%s">next</a></div>' % (i, i, i + 1))
+
+def _microdata_item(i) :
+	return ('<div itemscope itemtype="http://schema.org/Product"><span itemprop="name">Product %s</span>'
+			'<span itemprop="sku">%s</span></div>' % (i, i))
+
+def _turtle_block(i, items) :
+	triples = "".join(['<http://www.example.org/ttl/%s-%s> a ex:Item ; ex:index %s .\n' % (i, j, j) for j in range(items)])
+	return '<script type="text/turtle">\n@prefix ex: <http://www.example.org/terms/> .\n%s</script>' % triples
+
+def _plain_item(i) :
+	return '<p class="item">Some plain text for item %s, <a href="/page/%s">with a link</a>.</p>' % (i, i)
+
+def generate_page(size, depth, mix, blocks) :
+	"""
+	Generate a page.
+	@param size: number of items on the page
+	@param depth: the nesting depth of each item
+	@param mix: combination of 'r', 'm', 't' for the structured data to include
+	@param blocks: number of Turtle script blocks (if 't' is in the mix); the items are distributed among them
+	@return: the page
+	@rtype: string
+	"""
+	body = []
+	for i in range(size) :
+		if 'r' in mix :
+			body.append(_nest(depth, _rdfa_item(i)))
+		if 'm' in mix :
+			body.append(_nest(depth, _microdata_item(i)))
+		body.append(_nest(depth, _plain_item(i)))
+	if 't' in mix :
+		for b in range(blocks) :
+			body.append(_nest(depth, _turtle_block(b, max(1, size // blocks))))
+	head = '<head><title>benchmark page</title></head>'
+	# The prefix attribute is RDFa markup, too: without it, a page without RDFa has no attribute the extractors look at
+	html = '<html prefix="ex: http://www.example.org/terms/">' if 'r' in mix else '<html>'
+	return '<!DOCTYPE html>\n%s%s<body>\n%s\n</body></html>\n' % (html, head, "\n".join(body))
+
+def generate_corpus(sizes, depths, mixes, blocks) :
+	"""
+	Generate the corpus.
+	@return: list of (name, content) pairs, the content being UTF-8 encoded
+	"""
+	retval = []
+	for (size, depth, mix) in itertools.product(sizes, depths, mixes) :
+		name = "page-s%s-d%s-%s.html" % (size, depth, mix if mix != "" else "none")
+		retval.append((name, generate_page(size, depth, mix, blocks).encode("utf-8")))
+	return retval
+
+def generate_memory_corpus(pages, size, depth, mix, blocks) :
+	"""
+	Generate the corpus for the memory mode: the same page, with distinct subjects on each page (as on a site with
+	one product per page), and the same predicates and types everywhere.
+	@return: iterator of (name, content) pairs, the content being UTF-8 encoded
+	"""
+	page = generate_page(size, depth, mix, blocks)
+	for n in range(pages) :
+		content = page.replace("http://www.example.org/rdfa/", "http://www.example.org/%s/rdfa/" % n)
+		content = content.replace("http://www.example.org/ttl/", "http://www.example.org/%s/ttl/" % n)
+		content = content.replace("Product ", "Product %s-" % n)
+		yield ("memory-%s.html" % n, content.encode("utf-8"))
+
+def read_corpus(directory) :
+	retval = []
+	for fname in sorted(glob.glob(os.path.join(directory, "*.html"))) :
+		with open(fname, "rb") as f :
+			retval.append((os.path.basename(fname), f.read()))
+	return retval
+
+#########################################################################################################
+# Measurements
+def best_of(repeat, function) :
+	"""Run the function C{repeat} times, and return the best time and the last result"""
+	best = None
+	for _ in range(repeat) :
+		start  = time.perf_counter()
+		result = function()
+		elapsed = time.perf_counter() - start
+		if best == None or elapsed < best :
+			best = elapsed
+	return (best, result)
+
+def record(results, stage, pages, nbytes, triples, seconds) :
+	results.append({
+		"stage"             : stage,
+		"pages"             : pages,
+		"bytes"             : nbytes,
+		"triples"           : triples,
+		"seconds"           : round(seconds, 6),
+		"pages_per_second"  : round(pages / seconds, 3) if seconds > 0 else None,
+		"triples_per_second": round(triples / seconds, 3) if seconds > 0 else None
+	})
+
+def run(corpus, repeat) :
+	results = []
+	nbytes  = sum([len(content) for (name, content) in corpus])
+	pages   = len(corpus)
+
+	# Full distillation, page by page
+	def distill() :
+		processor = pySde(options = SDEOptions())
+		return [processor.graph_from_source(content) for (name, content) in corpus]
+	(seconds, graphs) = best_of(repeat, distill)
+	total_triples = sum([len(g) for g in graphs])
+	record(results, "graph_from_source", pages, nbytes, total_triples, seconds)
+
+	# HTML parsing only
+	parser = pySde(options = SDEOptions())
+	(seconds, _doms) = best_of(repeat, lambda : [parser._parse(content) for (name, content) in corpus])
+	record(results, "parse", pages, nbytes, 0, seconds)
+
+	# Each extractor separately, on freshly parsed trees (the RDFa processor may modify the tree)
+	for (extractor, options) in [
+			("graph_from_DOM:rdfa",      SDEOptions(rdfa = True,  microdata = False, hturtle = False)),
+			("graph_from_DOM:microdata", SDEOptions(rdfa = False, microdata = True,  hturtle = False)),
+			("graph_from_DOM:hturtle",   SDEOptions(rdfa = False, microdata = False, hturtle = True))] :
+		processor = pySde(options = options)
+		best      = None
+		for _ in range(repeat) :
+			doms    = [parser._parse(content) for (name, content) in corpus]
+			start   = time.perf_counter()
+			triples = sum([len(processor.graph_from_DOM(dom, Graph())) for dom in doms])
+			elapsed = time.perf_counter() - start
+			if best == None or elapsed < best :
+				best = elapsed
+		record(results, extractor, pages, nbytes, triples, best)
+
+	# Serializers, on the merged graph of the whole corpus
+	merged = Graph()
+	for g in graphs :
+		merged += g
+	for fmt in ["nt", "turtle", "pretty-xml", "json-ld"] :
+		(seconds, output) = best_of(repeat, lambda : merged.serialize(format = fmt, encoding = "utf-8"))
+		record(results, "serialize:%s" % fmt, pages, len(output), len(merged), seconds)
+
+	return results
+
+def run_memory(corpus) :
+	"""
+	Accumulate the triples of the corpus into an rdflib graph and into a triple accumulator, and measure the memory
+	allocated for each once all the pages are processed (the graphs of the individual pages are dropped).
+	"""
+	results   = []
+	processor = pySde(options = SDEOptions())
+	for (stage, target) in [("graph", lambda : GraphTarget(Graph())), ("accumulator", lambda : TripleAccumulator())] :
+		tracemalloc.start()
+		start    = time.perf_counter()
+		t        = target()
+		triples  = processor.store_from_sources([content for (name, content) in corpus], t)
+		elapsed  = time.perf_counter() - start
+		(current, peak) = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		results.append({
+			"stage"           : stage,
+			"pages"           : len(corpus),
+			"triples"         : triples,
+			"seconds"         : round(elapsed, 6),
+			"memory_bytes"    : current,
+			"peak_bytes"      : peak,
+			"bytes_per_triple": round(current / triples, 3) if triples > 0 else None
+		})
+		del t
+	return results
+
+#########################################################################################################
+sizes    = [10, 100, 1000]
+depths   = [2, 20]
+mixes    = ["r", "m", "t", "rmt", ""]
+blocks   = 5
+repeat   = 3
+corpus   = None
+output   = None
+memory   = None
+
+try :
+	opts, value = getopt.getopt(sys.argv[1:],"s:d:m:b:r:c:o:M:")
+	for o,a in opts:
+		if o == "-s" :
+			sizes = [int(x) for x in a.split(",")]
+		elif o == "-d" :
+			depths = [int(x) for x in a.split(",")]
+		elif o == "-m" :
+			mixes = [x.replace("-", "") for x in a.split(",")]
+		elif o == "-b" :
+			blocks = int(a)
+		elif o == "-r" :
+			repeat = int(a)
+		elif o == "-c" :
+			corpus = a
+		elif o == "-o" :
+			output = a
+		elif o == "-M" :
+			memory = int(a)
+		else :
+			usage()
+			sys.exit(1)
+except :
+	usage()
+	sys.exit(1)
+
+if memory != None :
+	pages = list(generate_memory_corpus(memory, sizes[0], depths[0], mixes[0], blocks))
+elif corpus != None :
+	pages = read_corpus(corpus)
+else :
+	pages = generate_corpus(sizes, depths, mixes, blocks)
+
+if output != None :
+	if not os.path.isdir(output) :
+		os.makedirs(output)
+	for (name, content) in pages :
+		with open(os.path.join(output, name), "wb") as f :
+			f.write(content)
+	sys.exit(0)
+
+report = {
+	"date"        : datetime.datetime.utcnow().isoformat(),
+	"python"      : platform.python_version(),
+	"platform"    : platform.platform(),
+	"rdflib"      : rdflib.__version__,
+	"corpus"      : corpus if corpus != None else { "sizes" : sizes, "depths" : depths, "mixes" : mixes, "blocks" : blocks },
+	"pages"       : len(pages),
+	"repeat"      : repeat,
+	"results"     : run_memory(pages) if memory != None else run(pages, repeat),
+	# ru_maxrss is in kilobytes on Linux, in bytes on macOS
+	"peak_rss_kb" : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+}
+print(json.dumps(report, indent = 2))
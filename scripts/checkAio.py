@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Check of the asynchronous interface (see L{aio}) against a local stand-in server, reachable under two host names, that
+delays its responses and records the number of requests in progress per host. Generated pages are distilled
+concurrently; the number of parallel requests to a host must never exceed the C{per_host} limit, the results must be in
+the order of the sources (the responses are delayed so that they arrive in the reverse order), and each graph must be
+the one of its page. A request that times out must give an error graph with the 504 status; the request keeps running
+in its thread, and must still count for the per host limit until it finishes. The exit code is 1 if any of the checks
+fails.
+"""
+
+import sys, time, asyncio, threading, urllib.parse
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from rdflib import Literal, URIRef, RDF
+
+from pySde.options import SDEOptions
+from pySde.fetch   import PooledHTTPFetcher
+from pySde.aio     import graphs_from_sources
+from pySde import pySde, ns_sde
+
+###########################################
+
+usageText="""Usage: %s [number of pages]
+"""
+
+if len(sys.argv) > 2 or (len(sys.argv) > 1 and not sys.argv[1].isdigit()) :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+pages    = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+per_host = 2
+slow     = 1.5
+
+def generate_page(i) :
+	return ("""<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Page %s</title></head><body>
+<div about="#item" typeof="ex:Item"><span property="ex:name">Item %s</span></div>
+</body></html>
+""" % (i, i)).encode("utf-8")
+
+class Counter :
+	"""The requests in progress per host, and their maximum"""
+	current = {}
+	maximum = {}
+	lock    = threading.Lock()
+
+	@classmethod
+	def reset(cls) :
+		with cls.lock :
+			(cls.current, cls.maximum) = ({}, {})
+
+class Handler(BaseHTTPRequestHandler) :
+	"""/slow is answered after a long delay; /page<i>?delay=<seconds> after the given delay"""
+	def do_GET(self) :
+		host = self.headers.get("Host")
+		with Counter.lock :
+			Counter.current[host] = Counter.current.get(host, 0) + 1
+			Counter.maximum[host] = max(Counter.maximum.get(host, 0), Counter.current[host])
+		try :
+			parsed = urllib.parse.urlsplit(self.path)
+			if parsed.path == "/slow" :
+				time.sleep(slow)
+				body = generate_page("slow")
+			else :
+				time.sleep(float(urllib.parse.parse_qs(parsed.query).get("delay", ["0"])[0]))
+				body = generate_page(parsed.path[len("/page"):])
+		finally :
+			with Counter.lock :
+				Counter.current[host] -= 1
+		self.send_response(200)
+		self.send_header("Content-Type", "text/html; charset=utf-8")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args) :
+		pass
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+def status(graph) :
+	"""The HTTP status of an error graph, or None"""
+	for code in graph.objects(None, URIRef("http://www.w3.org/2006/http#responseCode")) :
+		return int(str(code).split("#")[-1])
+	return None
+
+def processor() :
+	return pySde(options = SDEOptions(microdata = False, hturtle = False), fetcher = PooledHTTPFetcher(max_idle = 0))
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+threading.Thread(target = server.serve_forever, daemon = True).start()
+port  = server.server_address[1]
+hosts = ["127.0.0.1:%s" % port, "localhost:%s" % port]
+
+try :
+	# Concurrent fetches; the later pages are answered first
+	uris = ["http://%s/page%s?delay=%.2f" % (hosts[i % 2], i, 0.05 * (pages - i)) for i in range(pages)]
+	start  = time.perf_counter()
+	result = asyncio.run(graphs_from_sources(processor(), uris, rdfOutput = True, per_host = per_host, timeout = 10))
+	print("%s pages in %.2fs, at most %s requests in parallel per host" % (pages, time.perf_counter() - start, max(Counter.maximum.values())))
+	check("per host limit", all([Counter.maximum.get(host, 0) <= per_host for host in hosts]))
+	check("requests in parallel", all([Counter.maximum.get(host, 0) == per_host for host in hosts]))
+	check("results in the order of the sources", [name for (name, graph) in result] == uris)
+	check("each graph is the one of its page", all([(None, None, Literal("Item %s" % i)) in graph and len(graph) == 2 for (i, (name, graph)) in enumerate(result)]))
+
+	# Timeouts: the slow requests are still running when the next request to the host could start
+	Counter.reset()
+	uris   = ["http://%s/slow" % hosts[0]] * per_host + ["http://%s/page0" % hosts[0]]
+	result = asyncio.run(graphs_from_sources(processor(), uris, rdfOutput = True, per_host = per_host, timeout = 0.3))
+	check("timeout: 504 error graphs", all([(None, RDF.type, ns_sde["Error"]) in graph and status(graph) == 504 for (name, graph) in result[:per_host]]))
+	check("timeout: the next request distilled", (None, None, Literal("Item 0")) in result[-1][1])
+	check("timeout: per host limit kept", Counter.maximum.get(hosts[0], 0) <= per_host)
+finally :
+	server.shutdown()
+
+sys.exit(1 if failures > 0 else 0)
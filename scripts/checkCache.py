@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Check of the fetch cache (see L{fetch.CachingFetcher} and L{cache.DiskCache}). A local stand-in server serves pages with
+an C{ETag}, with a C{Last-Modified} date, or without any validator, and answers the conditional requests with 304 when
+a page has not changed; it counts the full (200) and the 304 responses. The cached pages must be revalidated and served
+from the cache, and fetched again once they have changed; pages without a validator must not be cached. The LRU eviction
+of the disk cache is checked, also when the cache is reopened, and the size bound is checked with several processes
+storing into the same directory. The exit code is 1 if any of the checks fails.
+"""
+
+import sys, os, time, shutil, tempfile, threading
+from concurrent.futures import ProcessPoolExecutor
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from email.utils import formatdate
+
+from pySde.cache import DiskCache
+from pySde.fetch import CachingFetcher, HTTPFetcher, Fetcher
+
+###########################################
+
+usageText="""Usage: %s
+"""
+
+class Counter :
+	full         = 0
+	not_modified = 0
+	lock         = threading.Lock()
+
+# path -> [content, validator kind]
+pages = {
+	"/etag.html"          : [b"<html><body>etag, first version</body></html>", "etag"],
+	"/last-modified.html" : [b"<html><body>last modified, first version</body></html>", "last-modified"],
+	"/none.html"          : [b"<html><body>no validator</body></html>", None],
+}
+modified = formatdate(time.time() - 3600, usegmt = True)
+
+class Handler(BaseHTTPRequestHandler) :
+	def do_GET(self) :
+		if self.path not in pages :
+			self.send_error(404)
+			return
+		(body, kind) = pages[self.path]
+		etag = '"%s"' % abs(hash(body))
+		if (kind == "etag" and self.headers.get("If-None-Match") == etag) or \
+		   (kind == "last-modified" and self.headers.get("If-Modified-Since") == modified) :
+			with Counter.lock :
+				Counter.not_modified += 1
+			self.send_response(304)
+			self.end_headers()
+			return
+		with Counter.lock :
+			Counter.full += 1
+		self.send_response(200)
+		self.send_header("Content-Type", "text/html")
+		self.send_header("Content-Length", str(len(body)))
+		if kind == "etag" :
+			self.send_header("ETag", etag)
+		elif kind == "last-modified" :
+			self.send_header("Last-Modified", modified)
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args) :
+		pass
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+def counted(fetcher, uri) :
+	"""Fetch a URI; return the result, and the number of full and 304 responses of the server for it"""
+	(full, not_modified) = (Counter.full, Counter.not_modified)
+	result = fetcher.fetch(uri)
+	return (result, Counter.full - full, Counter.not_modified - not_modified)
+
+def store(directory, max_size, worker) :
+	"""Store entries from a worker process"""
+	cache = DiskCache(directory, max_size)
+	for i in range(20) :
+		cache.put("worker %s, entry %s" % (worker, i), b"x" * 1000)
+	return cache.size
+
+def revalidation(root, directory) :
+	fetcher = CachingFetcher(directory, fetcher = HTTPFetcher(timeout = 10))
+	for (path, kind) in [("/etag.html", "ETag"), ("/last-modified.html", "Last-Modified")] :
+		(result, full, not_modified) = counted(fetcher, root + path)
+		check("%s: first fetch, 200" % kind, full == 1 and not_modified == 0 and result.data == pages[path][0])
+		(result, full, not_modified) = counted(fetcher, root + path)
+		check("%s: revalidated, 304, served from the cache" % kind, full == 0 and not_modified == 1 and result.data == pages[path][0] and result.status == 200)
+		check("%s: location kept" % kind, result.location == root + path)
+
+	pages["/etag.html"][0] = b"<html><body>etag, second version</body></html>"
+	(result, full, not_modified) = counted(fetcher, root + "/etag.html")
+	check("ETag: changed page fetched again", full == 1 and result.data == pages["/etag.html"][0])
+	(result, full, not_modified) = counted(CachingFetcher(directory, fetcher = HTTPFetcher(timeout = 10)), root + "/etag.html")
+	check("ETag: new version cached, also after reopening", not_modified == 1 and result.data == pages["/etag.html"][0])
+
+	counted(fetcher, root + "/none.html")
+	(result, full, not_modified) = counted(fetcher, root + "/none.html")
+	check("no validator: not cached", full == 1 and not_modified == 0)
+
+def eviction(directory) :
+	cache = DiskCache(directory, max_size = 300)
+	for key in ["a", "b", "c"] :
+		cache.put(key, key.encode("utf-8") * 100)
+		time.sleep(0.01)
+	cache.get("a")
+	time.sleep(0.01)
+	cache.put("d", b"d" * 100)
+	check("LRU: least recently used entry evicted", cache.get("b") == None and all([cache.get(k) != None for k in ["a", "d"]]))
+	check("LRU: size bound", cache.size == 300)
+	time.sleep(0.01)
+
+	# The LRU order is kept on the disk: c, a, d
+	cache = DiskCache(directory, max_size = 300)
+	cache.put("e", b"e" * 100)
+	check("LRU: order kept when reopened", cache.get("c") == None and all([cache.get(k) != None for k in ["a", "d", "e"]]))
+	cache.put("f", b"f" * 1000)
+	check("LRU: entry larger than the cache not stored", cache.get("f") == None and cache.size == 300)
+
+	# An entry stored by another instance is found
+	DiskCache(directory, max_size = 300).put("g", b"g" * 100)
+	check("shared directory: entry of another instance found", cache.get("g") != None)
+
+def processes(directory) :
+	max_size = 10000
+	with ProcessPoolExecutor(max_workers = 4) as executor :
+		list(executor.map(store, [directory] * 4, [max_size] * 4, range(4)))
+	size = sum([os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory) if f.endswith(".data")])
+	print("%s bytes stored by 4 processes, %s bytes in the cache (at most %s)" % (4 * 20 * 1000, size, max_size))
+	check("processes: global size bound", 0 < size <= max_size)
+	check("processes: index rebuilt from the directory", DiskCache(directory, max_size).size == size)
+
+class Incomplete(Fetcher) :
+	pass
+
+if __name__ == "__main__" :
+	if len(sys.argv) > 1 :
+		print(usageText % sys.argv[0])
+		sys.exit(1)
+
+	server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+	threading.Thread(target = server.serve_forever, daemon = True).start()
+	work = tempfile.mkdtemp()
+	try :
+		revalidation("http://127.0.0.1:%s" % server.server_address[1], os.path.join(work, "fetch"))
+		eviction(os.path.join(work, "lru"))
+		processes(os.path.join(work, "processes"))
+		try :
+			Incomplete()
+			check("fetcher without a fetch method refused", False)
+		except TypeError :
+			check("fetcher without a fetch method refused", True)
+	finally :
+		server.shutdown()
+		shutil.rmtree(work)
+
+	sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Check of the batch mode (see L{crawl}) against a local stand-in site: the HTML files of a directory (or, by default, a
+set of generated pages) are served by a local HTTP server, with a generated sitemap. The site is crawled into an N-Quads
+file with a checkpoint; the run is interrupted in the middle of a source (the fetcher fails, and the partial output of
+the source is simulated by a truncated line at the end of the output), and resumed. The same is done with a run
+interrupted during its very first source. The named graph of each page is then compared (modulo blank node renaming)
+with the direct distillation of the page, and each page must appear exactly once. A page missing at the first run must
+be distilled when resuming, once it is there. The same is checked for the per source output files. A remote sitemap
+(or sitemap index) must only give the absolute http(s) URIs on its own host. The exit code is 1 if any of the checks
+fails.
+
+A corpus can be generated with C{benchSde.py -o directory}.
+"""
+
+import sys, os, glob, shutil, tempfile, threading, functools
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from rdflib import Graph, Dataset, URIRef
+from rdflib.compare import isomorphic
+
+from pySde.options import SDEOptions
+from pySde.crawl   import read_sitemap, crawl, output_file_name, Checkpoint
+from pySde.fetch   import PooledHTTPFetcher
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s [directory]
+
+A set of generated pages is used if no directory is given.
+"""
+
+if len(sys.argv) > 2 or (len(sys.argv) > 1 and sys.argv[1].startswith("-")) :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+def generate_page(i) :
+	return """<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Page %s</title></head><body>
+<div about="#item%s" typeof="ex:Item"><span property="ex:name">Item %s</span><span property="ex:rank">%s</span></div>
+<div itemscope itemtype="http://schema.org/Thing"><span itemprop="name">Thing %s</span></div>
+</body></html>
+""" % (i, i, i, i, i)
+
+class QuietHandler(SimpleHTTPRequestHandler) :
+	def log_message(self, *args) :
+		pass
+
+class Interrupted(BaseException) :
+	"""Not an Exception, ie, it is not turned into error triples, as a KeyboardInterrupt"""
+	pass
+
+class InterruptingFetcher(PooledHTTPFetcher) :
+	"""A fetcher that fails at the n-th fetch, as if the run was interrupted in the middle of that source"""
+	def __init__(self, n) :
+		PooledHTTPFetcher.__init__(self)
+		self.n    = n
+		self.lock = threading.Lock()
+
+	def fetch(self, uri, headers = None, max_bytes = None) :
+		with self.lock :
+			self.n -= 1
+			if self.n == 0 :
+				raise Interrupted()
+		return PooledHTTPFetcher.fetch(self, uri, headers, max_bytes)
+
+work = tempfile.mkdtemp()
+site = os.path.join(work, "site")
+if len(sys.argv) > 1 :
+	shutil.copytree(sys.argv[1], site)
+else :
+	os.makedirs(site)
+	for i in range(8) :
+		with open(os.path.join(site, "page%s.html" % i), "w") as f :
+			f.write(generate_page(i))
+files = sorted([os.path.basename(f) for f in glob.glob(os.path.join(site, "*.html"))])
+# This one is missing at the first run
+late  = "late.html"
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory = site))
+threading.Thread(target = server.serve_forever, daemon = True).start()
+root = "http://127.0.0.1:%s/" % server.server_address[1]
+
+with open(os.path.join(site, "sitemap.xml"), "w") as f :
+	f.write('<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+	for fname in files + [late] :
+		f.write("<url><loc>%s%s</loc></url>\n" % (root, fname))
+	f.write("</urlset>\n")
+# Sitemaps with values that must be dropped: relative URIs, file names, other schemes or hosts
+unsafe = ["page0.html", "/etc/passwd", "file:///etc/passwd", "ftp://127.0.0.1/page0.html", "http://example.org/page0.html", root.replace("127.0.0.1", "localhost") + "page0.html"]
+with open(os.path.join(site, "unsafe.xml"), "w") as f :
+	f.write('<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+	for loc in unsafe + [root + files[0]] :
+		f.write("<url><loc>%s</loc></url>\n" % loc)
+	f.write("</urlset>\n")
+with open(os.path.join(site, "index.xml"), "w") as f :
+	f.write('<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+	for loc in [os.path.join(site, "sitemap.xml"), "file://" + os.path.join(site, "sitemap.xml"), root + "unsafe.xml"] :
+		f.write("<sitemap><loc>%s</loc></sitemap>\n" % loc)
+	f.write("</sitemapindex>\n")
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+def processor(fetcher = None) :
+	return pySde(options = SDEOptions(), fetcher = fetcher if fetcher != None else PooledHTTPFetcher())
+
+def interrupted_run(uris, sink, checkpoint, n) :
+	"""A run interrupted at the n-th source, leaving a partial line at the end of the output"""
+	try :
+		crawl(processor(InterruptingFetcher(n)), uris, sink = sink, checkpoint = checkpoint)
+		return False
+	except Interrupted :
+		with open(sink, "ab") as f :
+			f.write(b"<http://example.org/partial> <http://example.org/p")
+		return True
+
+def check_nquads(label, sink, uris, expected) :
+	dataset = Dataset()
+	try :
+		dataset.parse(sink, format = "nquads")
+	except Exception :
+		check("%s: n-quads output parsed" % label, False)
+		return
+	check("%s: every source once" % label, all([isomorphic(dataset.graph(URIRef(uri)), expected[uri]) for uri in uris]))
+
+try :
+	uris = read_sitemap(root + "sitemap.xml")
+	check("sitemap: %s URIs" % len(uris), len(uris) == len(files) + 1)
+	check("remote sitemap: unsafe URIs dropped", read_sitemap(root + "unsafe.xml") == [root + files[0]])
+	check("remote sitemap index: local sitemaps dropped", read_sitemap(root + "index.xml") == [root + files[0]])
+	check("local sitemap: URIs kept", read_sitemap(os.path.join(site, "unsafe.xml")) == unsafe + [root + files[0]])
+	late_uri = root + late
+
+	# Interrupted in the middle of the run; the late page is missing, ie, an error
+	(sink, checkpoint) = (os.path.join(work, "out.nq"), os.path.join(work, "checkpoint"))
+	half = len(uris) // 2 + 1
+	check("first run interrupted", interrupted_run(uris, sink, checkpoint, half))
+	recorded = len(Checkpoint(checkpoint).entries)
+	check("checkpoint: %s sources before the interruption" % recorded, recorded == half - 1)
+
+	with open(os.path.join(site, late), "w") as f :
+		f.write(generate_page(len(files)))
+	expected = dict([(uri, processor().graph_from_source(uri)) for uri in uris])
+
+	summary = crawl(processor(), uris, sink = sink, checkpoint = checkpoint)
+	print(summary)
+	check("resumed run: %s skipped" % summary.skipped, summary.skipped == recorded and summary.sources == len(uris) - recorded)
+	check("checkpoint: every source once, no errors", sorted(Checkpoint(checkpoint).entries.keys()) == sorted(uris) and
+		  all([entry["status"] == "ok" for entry in Checkpoint(checkpoint).entries.values()]))
+	check_nquads("resumed run", sink, uris, expected)
+
+	# A source missing, ie, an error, is tried again by the next run
+	os.remove(os.path.join(site, late))
+	(sink, checkpoint) = (os.path.join(work, "errors.nq"), os.path.join(work, "errors.checkpoint"))
+	summary = crawl(processor(), uris, sink = sink, checkpoint = checkpoint)
+	check("missing source: an error", summary.errors == 1 and Checkpoint(checkpoint).failed(late_uri))
+	with open(os.path.join(site, late), "w") as f :
+		f.write(generate_page(len(files)))
+	summary = crawl(processor(), uris, sink = sink, checkpoint = checkpoint)
+	check("missing source: tried again", summary.sources == 1 and summary.errors == 0 and not Checkpoint(checkpoint).failed(late_uri))
+	check_nquads("missing source", sink, uris, expected)
+
+	# Interrupted during the very first source, with an output that is not empty to begin with
+	(sink, checkpoint) = (os.path.join(work, "first.nq"), os.path.join(work, "first.checkpoint"))
+	with open(sink, "wb") as f :
+		f.write(b"<http://example.org/s> <http://example.org/p> <http://example.org/o> <http://example.org/g> .\n")
+	check("first source interrupted", interrupted_run(uris, sink, checkpoint, 1))
+	summary = crawl(processor(), uris, sink = sink, checkpoint = checkpoint)
+	check("resumed run: nothing skipped", summary.skipped == 0 and summary.sources == len(uris))
+	check_nquads("first source interrupted", sink, uris, expected)
+	dataset = Dataset()
+	dataset.parse(sink, format = "nquads")
+	check("first source interrupted: previous content kept", len(dataset.graph(URIRef("http://example.org/g"))) == 1)
+
+	# Per source files
+	directory = os.path.join(work, "out")
+	crawl(processor(), uris, outputFormat = "turtle", directory = directory, workers = 4)
+	for uri in uris :
+		graph = Graph().parse(os.path.join(directory, output_file_name(uri, "turtle")), format = "turtle")
+		check("turtle file: %s" % uri[len(root):], isomorphic(graph, expected[uri]))
+finally :
+	server.shutdown()
+	shutil.rmtree(work)
+
+sys.exit(1 if failures > 0 else 0)
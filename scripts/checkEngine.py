@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Check of the process pool engine (see L{engine.ProcessEngine}): generated pages are distilled through the engine, and
+the graphs are compared (modulo blank node renaming) with the direct distillation, in the order of the sources. The
+workers must be replaced after the given number of documents, and when their resident set size is over the limit. A
+worker killed in the middle of a source must give an error graph (with the 500 status) for that source only, and the
+rest of the batch must go on with a new worker. The exit code is 1 if any of the checks fails.
+"""
+
+import sys, os, io, time, signal
+
+from rdflib import URIRef, RDF
+from rdflib.compare import isomorphic
+
+import pySde.engine as engine_module
+from pySde.options import SDEOptions
+from pySde.engine  import ProcessEngine, _Worker
+from pySde import pySde, ns_sde
+
+###########################################
+
+usageText="""Usage: %s
+"""
+
+def generate_page(i, size = 10) :
+	items = "\n".join(['<div about="#item%s" typeof="ex:Item"><span property="ex:name">Item %s of page %s</span></div>' % (j, j, i) for j in range(size)])
+	return ("""<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Page %s</title></head><body>
+%s
+</body></html>
+""" % (i, items)).encode("utf-8")
+
+class CountingWorker(_Worker) :
+	"""A worker recording the process ids, to count the workers started"""
+	pids = []
+	def __init__(self, *args) :
+		_Worker.__init__(self, *args)
+		CountingWorker.pids.append(self.process.pid)
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+def status(graph) :
+	"""The HTTP status of an error graph, or None"""
+	for code in graph.objects(None, URIRef("http://www.w3.org/2006/http#responseCode")) :
+		return int(str(code).split("#")[-1])
+	return None
+
+def processor(engine) :
+	return pySde(base = "http://example.org/page", options = SDEOptions(microdata = False), engine = engine)
+
+def run(label, data, workers = 2, max_documents = None, max_rss = None) :
+	"""Distill the pages through an engine; return the number of workers started"""
+	del CountingWorker.pids[:]
+	with ProcessEngine(workers = workers, max_documents = max_documents, max_rss = max_rss) as engine :
+		sources = [io.BytesIO(d) for d in data]
+		result  = list(processor(engine).graphs_from_sources(sources))
+	check("%s: order of the sources" % label, [name for (name, graph) in result] == sources)
+	check("%s: same graphs" % label, all([isomorphic(graph, e) for ((name, graph), e) in zip(result, expected)]))
+	return len(CountingWorker.pids)
+
+if __name__ == "__main__" :
+	if len(sys.argv) > 1 :
+		print(usageText % sys.argv[0])
+		sys.exit(1)
+
+	engine_module._Worker = CountingWorker
+	data     = [generate_page(i) for i in range(12)]
+	direct   = processor(None)
+	expected = [direct.graph_from_source(io.BytesIO(d)) for d in data]
+
+	started = run("no recycling", data)
+	check("no recycling: %s workers" % started, started == 2)
+	started = run("recycled after 3 documents", data, workers = 1, max_documents = 3)
+	check("recycled after 3 documents: %s workers" % started, started == 4)
+	started = run("recycled over 1 MB", data, workers = 1, max_rss = 1)
+	check("recycled over 1 MB: %s workers" % started, started == len(data))
+
+	# A worker killed while it distills a large page
+	data     = [generate_page(0), generate_page(1, 3000), generate_page(2), generate_page(3)]
+	expected = [direct.graph_from_source(io.BytesIO(d)) for d in data]
+	del CountingWorker.pids[:]
+	with ProcessEngine(workers = 1, max_documents = None) as engine :
+		p      = processor(engine)
+		result = []
+		for (name, graph) in p.graphs_from_sources([io.BytesIO(d) for d in data]) :
+			result.append(graph)
+			if len(result) == 1 :
+				# The worker is busy with the large page by now
+				time.sleep(0.3)
+				os.kill(CountingWorker.pids[-1], signal.SIGKILL)
+	check("crash: error graph, 500", (None, RDF.type, ns_sde["Error"]) in result[1] and status(result[1]) == 500 and p.http_status == 500)
+	check("crash: the other sources distilled", all([isomorphic(result[i], expected[i]) for i in [0, 2, 3]]))
+	check("crash: a new worker started", len(CountingWorker.pids) == 2)
+
+	sys.exit(1 if failures > 0 else 0)
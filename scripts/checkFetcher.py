@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Check of the pooled fetcher (see L{fetch.PooledHTTPFetcher}) against a local stand-in server that counts the
+connections it accepts and the bytes it sends. The HTML files of a directory are fetched several times through the
+same processor, with and without compression; the content must be the same as on disk, and the pages of the site must
+all be fetched on a single connection. The number of connections and of bytes sent is printed for each fetcher
+(including the default one, for comparison). The exit code is 1 if any of the checks fails.
+
+A corpus can be generated with C{benchSde.py -o directory}.
+"""
+
+import sys, os, io, glob, gzip, threading
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from rdflib.compare import isomorphic
+
+from pySde.options import SDEOptions
+from pySde.fetch   import PooledHTTPFetcher, URIOpenerFetcher
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s [directory]
+
+The files of the tests directory are used if no directory is given.
+"""
+
+if len(sys.argv) > 2 or (len(sys.argv) > 1 and sys.argv[1].startswith("-")) :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+pages  = {}
+for fname in sorted(glob.glob(os.path.join(source, "*.html"))) :
+	with open(fname, "rb") as f :
+		pages["/" + os.path.basename(fname)] = f.read()
+
+class Counter :
+	connections = 0
+	bytes_sent  = 0
+	lock        = threading.Lock()
+
+class Handler(BaseHTTPRequestHandler) :
+	"""Serves the pages with keep-alive, gzip compressed if the client accepts it"""
+	protocol_version = "HTTP/1.1"
+
+	def setup(self) :
+		BaseHTTPRequestHandler.setup(self)
+		with Counter.lock :
+			Counter.connections += 1
+
+	def do_GET(self) :
+		if self.path not in pages :
+			self.send_error(404)
+			return
+		body = pages[self.path]
+		self.send_response(200)
+		self.send_header("Content-Type", "text/html; charset=utf-8")
+		if "gzip" in self.headers.get("Accept-Encoding", "") :
+			body = gzip.compress(body)
+			self.send_header("Content-Encoding", "gzip")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+		with Counter.lock :
+			Counter.bytes_sent += len(body)
+
+	def log_message(self, *args) :
+		pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+threading.Thread(target = server.serve_forever, daemon = True).start()
+uris = ["http://127.0.0.1:%s%s" % (server.server_address[1], path) for path in pages]
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-70s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+try :
+	# The same content, with the URI as base
+	reference = [pySde(base = uri, options = SDEOptions()).graph_from_source(io.BytesIO(pages[path])) for (uri, path) in zip(uris, pages)]
+	for (label, fetcher, rounds) in [
+			("default fetcher",             URIOpenerFetcher(),                         2),
+			("pooled fetcher",              PooledHTTPFetcher(compression = False),     2),
+			("pooled fetcher, compression", PooledHTTPFetcher(),                        2)] :
+		(Counter.connections, Counter.bytes_sent) = (0, 0)
+		processor = pySde(options = SDEOptions(), fetcher = fetcher)
+		same = True
+		for _ in range(rounds) :
+			for (uri, path) in zip(uris, pages) :
+				same = same and fetcher.fetch(uri).data == pages[path]
+			graphs = [processor.graph_from_source(uri) for uri in uris]
+			same   = same and all([isomorphic(g, r) for (g, r) in zip(graphs, reference)])
+		fetches = 2 * rounds * len(uris)
+		print("%s: %s fetches, %s connections, %s bytes sent" % (label, fetches, Counter.connections, Counter.bytes_sent))
+		check("%s: same content" % label, same)
+		if isinstance(fetcher, PooledHTTPFetcher) :
+			check("%s: one connection" % label, Counter.connections == 1 and fetcher.connections_opened == 1)
+			fetcher.close()
+
+	fetcher = PooledHTTPFetcher()
+	try :
+		fetcher.fetch(uris[0] + ".missing")
+		check("pooled fetcher: HTTP error raised", False)
+	except Exception :
+		e = sys.exc_info()[1]
+		check("pooled fetcher: HTTP error raised", getattr(e, "http_code", None) == 404)
+	fetcher.close()
+finally :
+	server.shutdown()
+
+sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Check of the incremental distillation (see L{incremental}): a set of generated pages, all with the same structure
+(blank nodes included), is distilled into an RDF Patch with a manifest. The patch is applied to a simple store (a set of
+N-Triples lines, as a store keeping the blank node labels would do), and the result is compared (modulo blank node
+renaming) with the direct distillation of the pages after each run: the first run, a run with one page changed, an
+interrupted run (the manifest must not change, and the next run must report the changes again), a run with a page
+missing (its triples must be kept), and a run with a page removed from the list (pruned). The exit code is 1 if any of
+the checks fails.
+"""
+
+import sys, os, io, shutil, tempfile
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from pySde.options     import SDEOptions
+from pySde.incremental import Manifest, changes_from_sources, write_patch
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s
+"""
+
+if len(sys.argv) > 1 :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+def generate_page(name, version = 0) :
+	return """<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Page</title></head><body>
+<div typeof="ex:Thing"><span property="ex:name">%s</span><span property="ex:version">%s</span></div>
+</body></html>
+""" % (name, version)
+
+class Interrupted(BaseException) :
+	pass
+
+def interrupted(changes, n) :
+	"""The changes, interrupted after the n-th one"""
+	for change in changes :
+		if n == 0 :
+			raise Interrupted()
+		n -= 1
+		yield change
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+store = set()
+def apply_patch(patch) :
+	"""Apply a patch to the store; return the number of additions and of deletions"""
+	(added, removed) = (0, 0)
+	for line in patch.split(b"\n") :
+		if line.startswith(b"A ") :
+			store.add(line[2:])
+			added += 1
+		elif line.startswith(b"D ") :
+			store.discard(line[2:])
+			removed += 1
+	return (added, removed)
+
+def run(names, manifest, prune = False, n = None) :
+	"""A run; the patch is applied to the store unless the run is interrupted (after the n-th source)"""
+	processor = pySde(options = SDEOptions(microdata = False, hturtle = False))
+	manifest  = Manifest(manifest)
+	changes   = changes_from_sources(processor, names, manifest, rdfOutput = True, prune = prune)
+	sink      = io.BytesIO()
+	try :
+		write_patch(changes if n == None else interrupted(changes, n), sink, manifest = manifest)
+	except Interrupted :
+		return None
+	return apply_patch(sink.getvalue())
+
+def expected(names) :
+	retval = Graph()
+	processor = pySde(options = SDEOptions(microdata = False, hturtle = False))
+	for name in names :
+		retval += processor.graph_from_source(name)
+	return retval
+
+def store_is(label, names) :
+	graph = Graph().parse(data = b"\n".join(store), format = "nt") if len(store) > 0 else Graph()
+	check(label, isomorphic(graph, expected(names)))
+
+work = tempfile.mkdtemp()
+try :
+	manifest = os.path.join(work, "manifest")
+	names    = [os.path.join(work, "page%s.html" % i) for i in range(4)]
+	for (i, name) in enumerate(names) :
+		with open(name, "w") as f :
+			f.write(generate_page(chr(ord("A") + i)))
+
+	(added, removed) = run(names, manifest)
+	check("first run: %s additions" % added, added == 4 * 3 and removed == 0)
+	store_is("first run: same graph", names)
+	labels = set([line.split(b" ")[0] for line in store])
+	check("first run: one blank node label per source", len(labels) == len(names))
+
+	(added, removed) = run(names, manifest)
+	check("unchanged: empty patch", added == 0 and removed == 0)
+
+	with open(names[1], "w") as f :
+		f.write(generate_page("B", 1))
+	(added, removed) = run(names, manifest)
+	check("one page changed: %s additions, %s deletions" % (added, removed), added == 1 and removed == 1)
+	store_is("one page changed: same graph", names)
+
+	with open(names[2], "w") as f :
+		f.write(generate_page("C", 1))
+	check("interrupted run", run(names, manifest, n = 3) == None)
+	(added, removed) = run(names, manifest)
+	check("after the interruption: changes reported again", added == 1 and removed == 1)
+	store_is("after the interruption: same graph", names)
+
+	missing = names[3] + ".moved"
+	os.rename(names[3], missing)
+	(added, removed) = run(names, manifest)
+	check("missing page: triples kept", added == 0 and removed == 0)
+	os.rename(missing, names[3])
+	store_is("missing page: same graph", names)
+
+	(added, removed) = run(names[1:], manifest, prune = True)
+	check("pruned page: %s deletions" % removed, added == 0 and removed == 3)
+	store_is("pruned page: same graph", names[1:])
+	check("pruned page: removed from the manifest", Manifest(manifest).uris() == sorted(names[1:]))
+finally :
+	shutil.rmtree(work)
+
+sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Check of the resource limits (see L{limits}): a generated page is distilled with each limit (C{max_bytes}, C{max_nodes},
+C{max_triples}, C{max_stage_time}) set below and above what the page needs. Below the limit, the distillation must give
+an error graph with the HTTP status of the limit (413, or 504 for the time limit) when C{rdfOutput} is set, without any
+partial results of the source in the graph, and raise L{limits.LimitExceeded} otherwise; above it, the graph must be the
+same as without any limit. An endless input stream must be stopped at the size limit. The time limit must interrupt a
+stage in the main thread, and only be checked at the end of the stage in other threads. The exit code is 1 if any of
+the checks fails.
+"""
+
+import sys, io, time, signal, threading
+
+from rdflib import Graph, URIRef, Literal, RDF
+from rdflib.compare import isomorphic
+
+from pySde.options import SDEOptions
+from pySde.limits  import LimitExceeded, StageTimer
+from pySde import pySde, ns_sde
+
+###########################################
+
+usageText="""Usage: %s
+"""
+
+if len(sys.argv) > 1 :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+def generate_page(size) :
+	items = "\n".join(['<div about="#item%s" typeof="ex:Item"><span property="ex:name">Item %s</span></div>' % (i, i) for i in range(size)])
+	return ("""<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Limits</title></head><body>
+%s
+</body></html>
+""" % items).encode("utf-8")
+
+class Endless :
+	"""A file-like object that never ends"""
+	def read(self, size = -1) :
+		return b"<p>" * (size // 3 if size > 0 else 1000000)
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+existing = (URIRef("http://example.org/s"), URIRef("http://example.org/p"), Literal("already in the graph"))
+
+def status(graph) :
+	"""The HTTP status of an error graph, or None"""
+	for code in graph.objects(None, URIRef("http://www.w3.org/2006/http#responseCode")) :
+		return int(str(code).split("#")[-1])
+	return None
+
+def distill(options, data, rdfOutput) :
+	"""Distill the data (or an endless stream if it is None) into a graph with an existing triple"""
+	graph = Graph()
+	graph.add(existing)
+	return pySde(base = "http://example.org/page", options = options).graph_from_source(io.BytesIO(data) if data != None else Endless(), graph, rdfOutput)
+
+def error_graph(label, options, data, code) :
+	"""Check that the limit is hit, with and without rdfOutput"""
+	graph = distill(options, data, True)
+	check("%s: error graph, %s" % (label, code), (None, RDF.type, ns_sde["Error"]) in graph and status(graph) == code)
+	check("%s: no partial results" % label, existing in graph and len([t for t in graph if t[0] == URIRef("http://example.org/page#item0")]) == 0)
+	try :
+		distill(options, data, False)
+		check("%s: LimitExceeded raised" % label, False)
+	except LimitExceeded :
+		e = sys.exc_info()[1]
+		check("%s: LimitExceeded raised" % label, e.http_code == code)
+
+def same_graph(label, options, data, expected) :
+	check("%s: same graph above the limit" % label, isomorphic(distill(options, data, True), expected))
+
+page     = generate_page(100)
+expected = distill(SDEOptions(microdata = False), page, False)
+
+error_graph("max_bytes", SDEOptions(microdata = False, max_bytes = len(page) - 1), page, 413)
+same_graph("max_bytes", SDEOptions(microdata = False, max_bytes = len(page)), page, expected)
+start = time.perf_counter()
+error_graph("max_bytes, endless stream", SDEOptions(microdata = False, max_bytes = 1000000), None, 413)
+check("max_bytes, endless stream: stopped", time.perf_counter() - start < 5)
+
+error_graph("max_nodes", SDEOptions(microdata = False, max_nodes = 150), page, 413)
+same_graph("max_nodes", SDEOptions(microdata = False, max_nodes = 1000), page, expected)
+
+error_graph("max_triples", SDEOptions(microdata = False, max_triples = 150), page, 413)
+same_graph("max_triples", SDEOptions(microdata = False, max_triples = 200), page, expected)
+
+# The time limit, on a page whose distillation takes a while
+large    = generate_page(3000)
+start    = time.perf_counter()
+distill(SDEOptions(microdata = False), large, False)
+duration = time.perf_counter() - start
+limit    = duration / 10
+options  = SDEOptions(microdata = False, max_stage_time = limit)
+start    = time.perf_counter()
+error_graph("max_stage_time", options, large, 504)
+elapsed  = (time.perf_counter() - start) / 2
+print("distillation in %.2fs; with a limit of %.2fs, stopped after %.2fs in the main thread" % (duration, limit, elapsed))
+check("max_stage_time: interrupted in the main thread", elapsed < duration / 2)
+same_graph("max_stage_time", SDEOptions(microdata = False, max_stage_time = 60), page, expected)
+
+result = {}
+def in_thread() :
+	start = time.perf_counter()
+	result["graph"]   = distill(options, large, True)
+	result["elapsed"] = time.perf_counter() - start
+thread = threading.Thread(target = in_thread)
+thread.start()
+thread.join()
+print("with a limit of %.2fs, stopped after %.2fs in another thread" % (limit, result["elapsed"]))
+check("max_stage_time: error graph in another thread, 504", status(result["graph"]) == 504)
+check("max_stage_time: checked at the end of the stage in another thread", result["elapsed"] > 2 * limit)
+
+# The timer itself; an alarm set before is set again
+def timed(seconds, sleep) :
+	start = time.perf_counter()
+	try :
+		with StageTimer("test", seconds) :
+			time.sleep(sleep)
+		return (None, time.perf_counter() - start)
+	except LimitExceeded :
+		return (sys.exc_info()[1].http_code, time.perf_counter() - start)
+(code, elapsed) = timed(0.1, 1)
+check("StageTimer: interrupts in the main thread", code == 504 and elapsed < 0.5)
+check("StageTimer: no limit", timed(None, 0.1)[0] == None)
+thread = threading.Thread(target = lambda : result.update(timer = timed(0.1, 0.3)))
+thread.start()
+thread.join()
+check("StageTimer: checked at the end in another thread", result["timer"][0] == 504 and result["timer"][1] >= 0.3)
+
+alarms = []
+previous = signal.signal(signal.SIGALRM, lambda signum, frame : alarms.append(signum))
+signal.setitimer(signal.ITIMER_REAL, 0.5)
+timed(5, 0.1)
+time.sleep(0.6)
+signal.signal(signal.SIGALRM, previous)
+check("StageTimer: previous alarm set again", len(alarms) == 1)
+
+sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Check of the N-Triples form of the terms (see L{streaming.nt_term}), as used by the line based streaming formats and
+by the triple accumulator (see L{accumulator.TripleAccumulator}). A graph with literals that need escaping (quotes,
+backslashes, line breaks, language tags, datatypes, non ASCII characters) is serialized in N-Triples and in N-Quads
+through the chunked serialization and through the accumulator; the output must be the same graph when parsed back by
+the N-Triples (or N-Quads) parser of rdflib, one statement per line, and each literal must have the same form as in the
+N-Triples serializer of rdflib. The graph rebuilt by the accumulator must be the same, too. The exit code is 1 if any
+of the checks fails.
+"""
+
+import sys, io
+
+from rdflib import Graph, Dataset, URIRef, BNode, Literal, XSD, RDF
+from rdflib.compare import isomorphic
+
+from pySde.streaming   import nt_term, serialize_chunks
+from pySde.accumulator import TripleAccumulator
+
+###########################################
+
+usageText="""Usage: %s
+"""
+
+if len(sys.argv) > 1 :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+literals = [
+	Literal("plain"),
+	Literal('a "quoted" value'),
+	Literal("back\\slash"),
+	Literal("two\nlines"),
+	Literal("carriage\r\nreturn"),
+	Literal('multi "line"\nwith \\ and """ quotes'),
+	Literal("tab\tand é ü ✓"),
+	Literal("with\nlanguage", lang = "en"),
+	Literal("with\ndatatype", datatype = URIRef("http://example.org/type")),
+	Literal("<p>a\nb</p>", datatype = RDF.XMLLiteral),
+	Literal(1),
+	Literal(1.5),
+	Literal("1e3", datatype = XSD.double),
+	Literal(True),
+	Literal(""),
+]
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+graph = Graph()
+for (i, literal) in enumerate(literals) :
+	graph.add((URIRef("http://example.org/s%s" % i), URIRef("http://example.org/p"), literal))
+	graph.add((BNode(), URIRef("http://example.org/q"), literal))
+
+# The literals, one by one, in the same form as rdflib's N-Triples serializer
+for (i, literal) in enumerate(literals) :
+	single = Graph()
+	single.add((URIRef("http://example.org/s"), URIRef("http://example.org/p"), literal))
+	line = single.serialize(format = "nt").strip()
+	check("literal %s: as rdflib's N-Triples serializer" % i, line == "<http://example.org/s> <http://example.org/p> %s ." % nt_term(literal))
+
+def parsed(data, outputFormat) :
+	if outputFormat == "nt" :
+		return Graph().parse(data = data, format = "nt")
+	dataset = Dataset()
+	dataset.parse(data = data, format = "nquads")
+	return dataset
+
+for outputFormat in ["nt", "nquads"] :
+	name = "http://example.org/page" if outputFormat == "nquads" else None
+	data = b"".join(serialize_chunks(graph, outputFormat, chunk_size = 100, name = name)).decode("utf-8")
+	check("%s chunks: one statement per line" % outputFormat, len(data.splitlines()) == len(graph))
+	result = parsed(data, outputFormat)
+	if outputFormat == "nquads" :
+		result = result.graph(URIRef(name))
+	check("%s chunks: same graph" % outputFormat, isomorphic(result, graph))
+
+	accumulator = TripleAccumulator(named_graphs = outputFormat == "nquads")
+	accumulator.add(name if name != None else io.BytesIO(), graph)
+	sink = io.BytesIO()
+	accumulator.serialize(sink, outputFormat)
+	data = sink.getvalue().decode("utf-8")
+	check("%s accumulator: one statement per line" % outputFormat, len(data.splitlines()) == len(graph))
+	result = parsed(data, outputFormat)
+	if outputFormat == "nquads" :
+		result = result.graph(URIRef(name))
+	check("%s accumulator: same graph" % outputFormat, isomorphic(result, graph))
+	rebuilt = accumulator.graph()
+	if outputFormat == "nquads" :
+		rebuilt = rebuilt.graph(URIRef(name))
+	check("%s accumulator: same rebuilt graph" % outputFormat, isomorphic(rebuilt, graph))
+
+sys.exit(1 if failures > 0 else 0)
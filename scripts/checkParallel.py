@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Check of the parallel execution of the extractors (see L{parallel}): every file is distilled with the extractors run
+sequentially and in parallel, and the resulting graphs are compared (modulo blank node renaming). The extractors are
+run in the worker processes even if that would be pointless (e.g., on a single processor); a file for which they still
+run sequentially counts as a failure. The wall times of both runs are also printed. The files are then distilled again
+by a processor with a result cache (see L{cache.ResultCache}): the extractors must run in parallel for the cache misses,
+and not at all for the hits. The exit code is 1 if there is any difference.
+
+A corpus can be generated with C{benchSde.py -o directory}.
+"""
+
+import sys, os, glob, time
+
+from rdflib import Graph
+from rdflib.compare import isomorphic, to_isomorphic, graph_diff
+
+import pySde.parallel as parallel_module
+from pySde.options  import SDEOptions
+from pySde.parallel import graph_from_data, selected_extractors
+from pySde.cache    import ResultCache
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s [filename[s] or directory[ies]]
+
+The files of the tests directory are used if no file name is given; for a directory, all its .html files are used.
+"""
+
+if len(sys.argv) > 1 and sys.argv[1].startswith("-") :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+files = []
+for name in sys.argv[1:] :
+	if os.path.isdir(name) :
+		files += sorted(glob.glob(os.path.join(name, "*.html")))
+	else :
+		files.append(name)
+if len(files) == 0 :
+	files = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "*.html")))
+
+sequential = pySde(options = SDEOptions())
+parallel   = pySde(options = SDEOptions(parallel_extractors = True))
+
+def read(fname) :
+	with open(fname, "rb") as f :
+		return f.read()
+
+# The worker processes are started before the measurements
+graph_from_data(parallel, read(files[0]), files[0], force = True) if len(files) > 0 else None
+
+failures = 0
+for fname in files :
+	data = read(fname)
+	sequential.base = parallel.base = "file://" + os.path.abspath(fname)
+	start     = time.perf_counter()
+	reference = sequential.graph_from_source(fname)
+	middle    = time.perf_counter()
+	graph     = graph_from_data(parallel, data, fname, force = True)
+	end       = time.perf_counter()
+	times     = "sequential: %.3fs, parallel: %.3fs" % (middle - start, end - middle)
+	if graph == None :
+		if len(selected_extractors(data, parallel.options)) > 0 :
+			failures += 1
+			print("%-40s FAILED: the extractors were not run in the worker processes" % os.path.basename(fname))
+			continue
+		# Nothing to extract at all
+		graph = Graph()
+	if isomorphic(graph, reference) :
+		print("%-40s OK (%s triples; %s)" % (os.path.basename(fname), len(graph), times))
+	else :
+		failures += 1
+		(both, only_reference, only_parallel) = graph_diff(to_isomorphic(reference), to_isomorphic(graph))
+		print("%-40s DIFFERENT: %s triples missing, %s extra" % (os.path.basename(fname), len(only_reference), len(only_parallel)))
+
+# With a result cache; the calls are counted, and forced, as above
+calls = []
+def counting_graph_from_data(processor, data, label = None, force = False) :
+	calls.append(label)
+	return graph_from_data(processor, data, label, force = True)
+parallel_module.graph_from_data = counting_graph_from_data
+
+cached = pySde(options = SDEOptions(parallel_extractors = True, prefilter = False), result_cache = ResultCache())
+for fname in files :
+	sequential.base = cached.base = "file://" + os.path.abspath(fname)
+	reference = sequential.graph_from_source(fname)
+	del calls[:]
+	miss = cached.graph_from_source(fname)
+	hit  = cached.graph_from_source(fname)
+	if calls == [fname] and isomorphic(miss, reference) and isomorphic(hit, reference) :
+		print("%-40s OK with the result cache" % os.path.basename(fname))
+	else :
+		failures += 1
+		print("%-40s FAILED with the result cache: %s parallel runs, %s" % (os.path.basename(fname), len(calls),
+				"same graphs" if isomorphic(miss, reference) and isomorphic(hit, reference) else "different graphs"))
+
+sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Conformance check of the HTML parser backends: every file is distilled with each available backend, and the resulting
+graphs are compared (modulo blank node renaming) with the graph produced with html5lib. The exit code is 1 if there
+is any difference.
+"""
+
+import sys, os, glob
+
+from rdflib.compare import isomorphic, to_isomorphic, graph_diff
+
+from pySde.options import SDEOptions
+from pySde.parsers import backends
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s [filename[s]]
+
+The files of the tests directory are used if no file name is given.
+"""
+
+if len(sys.argv) > 1 and sys.argv[1].startswith("-") :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+files = sys.argv[1:]
+if len(files) == 0 :
+	files = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "*.html")))
+
+available = []
+for name in sorted(backends.keys()) :
+	try :
+		backends[name]()
+		available.append(name)
+	except Exception :
+		print("Backend %s is not available" % name)
+
+failures = 0
+for fname in files :
+	reference = pySde(options = SDEOptions(parser = "html5lib")).graph_from_source(fname)
+	for name in available :
+		if name == "html5lib" :
+			continue
+		graph = pySde(options = SDEOptions(parser = name)).graph_from_source(fname)
+		if isomorphic(graph, reference) :
+			print("%-40s %-14s OK (%s triples)" % (os.path.basename(fname), name, len(graph)))
+		else :
+			failures += 1
+			(both, only_reference, only_backend) = graph_diff(to_isomorphic(reference), to_isomorphic(graph))
+			print("%-40s %-14s DIFFERENT: %s triples missing, %s extra" % (os.path.basename(fname), name, len(only_reference), len(only_backend)))
+
+sys.exit(1 if failures > 0 else 0)
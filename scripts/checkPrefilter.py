@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Check of the byte level prefilter against a corpus: for each page, and for each extractor separately, the decision of
+the prefilter is compared with the result of the DOM pre-scan on the parsed page. A false negative (a page the
+prefilter would skip although the pre-scan finds structured data) means lost data; a false positive only means a
+page parsed for nothing. The rates are printed; the exit code is 1 if there is any false negative.
+
+If no file is given, a corpus is generated with C{benchSde.py -o} into a temporary directory: pages of several sizes and
+nesting depths, with each mix of structured data, and without any.
+"""
+
+import sys, os, glob, shutil, tempfile, subprocess
+
+from pySde.options   import SDEOptions
+from pySde.prefilter import may_contain_structured_data
+from pySde.scan      import scan_DOM
+from pySde           import pySde
+
+###########################################
+
+usageText="""Usage: %s [filename[s] or directory[ies]]
+
+A corpus is generated (with benchSde.py) if no file name is given; for a directory, all its .html files are used.
+"""
+
+if len(sys.argv) > 1 and sys.argv[1].startswith("-") :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+files = []
+for name in sys.argv[1:] :
+	if os.path.isdir(name) :
+		files += sorted(glob.glob(os.path.join(name, "*.html")))
+	else :
+		files.append(name)
+generated = None
+if len(files) == 0 :
+	generated = tempfile.mkdtemp()
+	subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchSde.py"), "-s", "10,100", "-o", generated], check = True)
+	files = sorted(glob.glob(os.path.join(generated, "*.html")))
+
+selections = {
+	"rdfa"      : SDEOptions(rdfa = True,  microdata = False, hturtle = False),
+	"microdata" : SDEOptions(rdfa = False, microdata = True,  hturtle = False),
+	"hturtle"   : SDEOptions(rdfa = False, microdata = False, hturtle = True),
+}
+
+parser = pySde(options = SDEOptions())
+counts = dict([(name, { "pages" : 0, "with_data" : 0, "false_negatives" : 0, "false_positives" : 0 }) for name in selections])
+
+for fname in files :
+	with open(fname, "rb") as f :
+		data = f.read()
+	dom = parser._parse(data)
+	for (name, options) in selections.items() :
+		scan     = scan_DOM(dom, options)
+		has_data = scan.rdfa or scan.microdata or len(scan.turtle_scripts) > 0
+		passes   = may_contain_structured_data(data, options)
+		counts[name]["pages"] += 1
+		if has_data :
+			counts[name]["with_data"] += 1
+		if has_data and not passes :
+			counts[name]["false_negatives"] += 1
+			print("%-40s %-10s FALSE NEGATIVE" % (os.path.basename(fname), name))
+		elif passes and not has_data :
+			counts[name]["false_positives"] += 1
+
+if generated != None :
+	shutil.rmtree(generated)
+
+failures = 0
+for (name, c) in counts.items() :
+	without_data = c["pages"] - c["with_data"]
+	print("%-10s pages: %5s, with data: %5s, false negatives: %5s (%.2f%%), false positives: %5s (%.2f%%)" % (
+		name, c["pages"], c["with_data"],
+		c["false_negatives"], 100.0 * c["false_negatives"] / c["with_data"] if c["with_data"] > 0 else 0,
+		c["false_positives"], 100.0 * c["false_positives"] / without_data if without_data > 0 else 0))
+	failures += c["false_negatives"]
+
+sys.exit(1 if failures > 0 else 0)
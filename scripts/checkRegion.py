@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Check of the restriction of the extraction to regions (see L{region}): each supported selector form (type, id, class,
+and attribute selectors, the descendant and child combinators, groups) is applied to a sample page, and the selected
+elements are compared with the expected ones; unsupported selectors must be refused. The page is then distilled with
+regions: only the triples of the regions must be extracted, the same as in the distillation of the full page, and the
+C{head} must be usable as a region; the C{base} element and the context of the ancestors (prefixes, vocabulary,
+language) must be kept in the restricted tree. An unsupported selector must give an error graph with the 400 status (or
+raise C{ValueError}). The exit code is 1 if any of the checks fails.
+"""
+
+import sys, io
+
+from rdflib import URIRef, RDF
+from rdflib.compare import isomorphic
+
+from pySde.options import SDEOptions
+from pySde.parsers import get_parser
+from pySde.region  import parse_selector, select_regions, restrict_DOM
+from pySde import pySde, ns_sde
+
+###########################################
+
+usageText="""Usage: %s
+"""
+
+if len(sys.argv) > 1 :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+page = b"""<!DOCTYPE html>
+<html prefix="ex: http://example.org/ns#" lang="en">
+<head><base href="http://base.example.org/dir/"><title>Regions</title><link rel="license" href="http://example.org/license"></head>
+<body vocab="http://schema.org/">
+<div id="header" class="banner"><span about="#header" property="ex:name">Header</span></div>
+<div id="main" class="content main">
+	<div id="product" class="item" typeof="Product" resource="#product"><span property="name">Product</span>
+		<div id="inner" class="item" itemscope itemtype="http://schema.org/Thing"><span itemprop="name">Inner</span></div>
+	</div>
+	<section id="offer" class="item offer" typeof="Offer" resource="#offer"><span property="price">10</span></section>
+	<p id="license" rel="license ex:license" resource="http://example.org/other-license">License</p>
+</div>
+<footer id="footer"><span about="#footer" property="ex:name">Footer</span></footer>
+</body>
+</html>
+"""
+
+selections = [
+	("div",                    ["header", "main"]),
+	("*",                      ["html"]),
+	("#product",               ["product"]),
+	(".item",                  ["product", "offer"]),
+	(".content.main",          ["main"]),
+	("div.item",               ["product"]),
+	("section",                ["offer"]),
+	("[typeof]",               ["product", "offer"]),
+	("[typeof=Offer]",         ["offer"]),
+	('[typeof="Product"]',     ["product"]),
+	("[rel~=license]",         ["link", "license"]),
+	("[rel=license]",          ["link"]),
+	("*[itemscope]",           ["inner"]),
+	("#main > .item",          ["product", "offer"]),
+	("#main>section",          ["offer"]),
+	("body > .item",           []),
+	("body .item",             ["product", "offer"]),
+	("div div.item",           ["product"]),
+	("#footer, #header",       ["header", "footer"]),
+	("span[property], #offer", ["span", "span", "offer", "span"]),
+	("#nothing",               []),
+]
+
+unsupported = ["", "div,", ",div", "div,,p", "div ~ p", "div + p", "a:hover", "div >", "> div", "[", "#", "div, > p"]
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+def status(graph) :
+	"""The HTTP status of an error graph, or None"""
+	for code in graph.objects(None, URIRef("http://www.w3.org/2006/http#responseCode")) :
+		return int(str(code).split("#")[-1])
+	return None
+
+document = "http://example.org/page"
+
+def distill(region, rdfOutput = True) :
+	options = SDEOptions(microdata = False, region = region)
+	return pySde(base = document, options = options).graph_from_source(io.BytesIO(page), rdfOutput = rdfOutput)
+
+dom = get_parser("html5lib")(io.BytesIO(page))
+for (selector, expected) in selections :
+	selected = [e.getAttribute("id") or e.tagName.lower() for e in select_regions(dom, selector)]
+	check("selector %s" % selector, selected == expected)
+for selector in unsupported :
+	try :
+		parse_selector(selector)
+		check("unsupported selector '%s'" % selector, False)
+	except ValueError :
+		check("unsupported selector '%s'" % selector, True)
+
+def region_of(graph, subjects) :
+	"""The triples of the full graph about the given subjects"""
+	return set([t for t in graph if str(t[0]) in subjects])
+
+full  = distill(None)
+uses  = (URIRef(document), URIRef("http://www.w3.org/ns/rdfa#usesVocabulary"), URIRef("http://schema.org/"))
+graph = distill("#product")
+check("region: the triples of the region only", set(graph) == region_of(full, [document + "#product"]) | set([uses]))
+graph = distill("#header")
+check("region: prefix of the ancestors kept", set(graph) - set([uses]) == region_of(full, [document + "#header"]))
+graph = distill("#header, #footer")
+check("group: both regions", set(graph) - set([uses]) == region_of(full, [document + "#header", document + "#footer"]))
+graph = distill("head")
+check("head region: license only", set(graph) == region_of(full, [document]) - set([t for t in full if t[2] == URIRef("http://example.org/other-license")]) - set([uses]))
+check("whole page selected: same graph", isomorphic(distill("html"), full))
+check("no region: empty graph", len(distill("#nothing")) == 0)
+
+# The context kept in the new tree
+restricted = restrict_DOM(get_parser("html5lib")(io.BytesIO(page)), "#product")
+head       = restricted.getElementsByTagName("head")[0]
+check("restricted tree: base element kept", [e.getAttribute("href") for e in head.getElementsByTagName("base")] == ["http://base.example.org/dir/"])
+wrapper    = [e for e in restricted.getElementsByTagName("div") if e.getAttribute("id") == "product"][0].parentNode
+check("restricted tree: context attributes copied", wrapper.getAttribute("prefix") == "ex: http://example.org/ns#" and
+	  wrapper.getAttribute("lang") == "en" and wrapper.getAttribute("vocab") == "http://schema.org/")
+restricted = restrict_DOM(get_parser("html5lib")(io.BytesIO(page)), "head, #offer")
+head       = restricted.getElementsByTagName("head")[0]
+check("restricted tree: head region kept", [e.tagName for e in head.childNodes if e.nodeType == e.ELEMENT_NODE] == ["base", "title", "link"])
+
+graph = distill("div >")
+check("unsupported selector: error graph, 400", (None, RDF.type, ns_sde["Error"]) in graph and status(graph) == 400)
+try :
+	distill("div >", rdfOutput = False)
+	check("unsupported selector: ValueError raised", False)
+except ValueError :
+	check("unsupported selector: ValueError raised", True)
+
+sys.exit(1 if failures > 0 else 0)
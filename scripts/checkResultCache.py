@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Check of the result cache (see L{cache.ResultCache}). Generated pages are distilled through processors sharing a result
+cache: the first distillation of a page must be a miss, the next ones hits, with the same graph (modulo blank node
+renaming) as without the cache; the bytes saved must add up. A change of the content, of the base, or of the options must
+be a miss. With a small memory tier and an on-disk tier, the entries evicted from the memory must be found on the disk
+and promoted back to the memory; a new cache on the same directory must find them, too. Error graphs must not be cached.
+The time spent per page, with and without the cache, is printed. The exit code is 1 if any of the checks fails.
+"""
+
+import sys, os, io, time, shutil, tempfile
+
+from rdflib.compare import isomorphic
+
+from pySde.options import SDEOptions
+from pySde.cache   import ResultCache
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s [number of pages]
+"""
+
+if len(sys.argv) > 2 or (len(sys.argv) > 1 and not sys.argv[1].isdigit()) :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+def generate_page(i) :
+	items = "\n".join(['<div about="#item%s" typeof="ex:Item"><span property="ex:name">Item %s of page %s</span></div>' % (j, j, i) for j in range(50)])
+	return ("""<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Page %s</title></head><body>
+%s
+<div typeof="ex:Thing"><span property="ex:name">Blank node of page %s</span></div>
+</body></html>
+""" % (i, items, i)).encode("utf-8")
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+def processor(cache, options = None) :
+	return pySde(base = "http://example.org/page", options = options if options != None else SDEOptions(microdata = False), result_cache = cache)
+
+def distill(processor, data) :
+	return processor.graph_from_source(io.BytesIO(data))
+
+work = tempfile.mkdtemp()
+try :
+	data = [generate_page(i) for i in range(pages)]
+	size = sum([len(d) for d in data])
+
+	start     = time.perf_counter()
+	expected  = [distill(processor(None), d) for d in data]
+	uncached  = (time.perf_counter() - start) / pages
+
+	# Memory only
+	cache  = ResultCache()
+	graphs = [distill(processor(cache), d) for d in data]
+	check("first run: misses", cache.misses == pages and cache.hits == 0 and cache.bytes_saved == 0)
+	check("first run: same graphs", all([isomorphic(g, e) for (g, e) in zip(graphs, expected)]))
+	start  = time.perf_counter()
+	graphs = [distill(processor(cache), d) for d in data]
+	cached = (time.perf_counter() - start) / pages
+	check("second run: hits", cache.misses == pages and cache.hits == pages)
+	check("second run: same graphs", all([isomorphic(g, e) for (g, e) in zip(graphs, expected)]))
+	check("second run: bytes saved", cache.bytes_saved == size and cache.stats()["bytes_saved"] == size)
+	print("%.2f ms per page without the cache, %.2f ms with a hit" % (1000 * uncached, 1000 * cached))
+
+	(hits, misses) = (cache.hits, cache.misses)
+	distill(processor(cache), data[0].replace(b"Item 0 ", b"Item zero "))
+	p = processor(cache)
+	p.base = "http://example.org/other"
+	distill(p, data[0])
+	distill(processor(cache, SDEOptions(microdata = False, hturtle = False)), data[0])
+	check("changed content, base, or options: misses", cache.misses == misses + 3 and cache.hits == hits)
+
+	# A memory tier for two entries at most, and a disk tier
+	directory = os.path.join(work, "results")
+	entry     = max([len(e.serialize(format = "nt", encoding = "utf-8")) for e in expected])
+	cache     = ResultCache(max_memory = 2 * entry, directory = directory)
+	for d in data :
+		distill(processor(cache), d)
+	check("memory tier: size bound", cache.memory_size <= 2 * entry and len(cache._memory) <= 2)
+	check("disk tier: every entry", cache.disk.size > 0 and len(cache.disk._index) == pages)
+	key = cache.key(data[0], "http://example.org/page", SDEOptions(microdata = False))
+	check("first entry evicted from the memory", key not in cache._memory)
+	graph = distill(processor(cache), data[0])
+	check("disk hit: same graph", cache.hits == 1 and isomorphic(graph, expected[0]))
+	check("disk hit: promoted to the memory", key in cache._memory)
+	distill(processor(cache), data[0])
+	check("memory hit after the promotion", cache.hits == 2 and cache.misses == pages)
+
+	cache = ResultCache(directory = directory)
+	graphs = [distill(processor(cache), d) for d in data]
+	check("new cache on the directory: hits", cache.hits == pages and cache.misses == 0)
+	check("new cache on the directory: same graphs", all([isomorphic(g, e) for (g, e) in zip(graphs, expected)]))
+
+	# Errors
+	cache = ResultCache()
+	p = processor(cache, SDEOptions(microdata = False, max_triples = 10))
+	p.graph_from_source(io.BytesIO(data[0]), rdfOutput = True)
+	check("error graph not cached", len(cache._memory) == 0)
+finally :
+	shutil.rmtree(work)
+
+sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Startup regression check for the command line path (C{localSde.py}): the import of the package is measured, in a
+fresh interpreter, with C{python -X importtime}, and compared with a budget. It is also checked that the extractor
+packages (pyRdfa, pyMicrodata) are not imported by the package itself, and that distilling a small page only imports
+the extractors switched on in the options. The exit code is 1 if any of the checks fails.
+"""
+
+import sys, os, getopt, subprocess
+
+###########################################
+
+usageText="""Usage: %s -[b:r:]
+where:
+  -b: import time budget, in milliseconds (default: 300)
+  -r: number of runs; the best import time is used (default: 5)
+"""
+
+def usage() :
+	print(usageText % sys.argv[0])
+
+# The same imports as localSde.py
+startup = "from pySde.options import SDEOptions; from pySde import pySde"
+
+page = """<html prefix="ex: http://www.example.org/terms/"><body>
+<div about="http://www.example.org/item" property="ex:label">An item</div>
+<div itemscope itemtype="http://schema.org/Thing"><span itemprop="name">A thing</span></div>
+<script type="text/turtle">@prefix ex: <http://www.example.org/terms/> . ex:a ex:b ex:c .</script>
+</body></html>"""
+
+extractors = {
+	"pyRdfa"      : "rdfa",
+	"pyMicrodata" : "microdata",
+}
+
+def run(code) :
+	"""Run the code in a fresh interpreter, with the package's directory on the path"""
+	env = dict(os.environ)
+	root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+	env["PYTHONPATH"] = os.pathsep.join([root] + ([env["PYTHONPATH"]] if "PYTHONPATH" in env else []))
+	return subprocess.run([sys.executable, "-X", "importtime", "-c", code], env = env, capture_output = True, text = True, check = True)
+
+def import_time(stderr) :
+	"""The cumulative import time of the package, in milliseconds, from the C{-X importtime} output"""
+	for line in stderr.splitlines() :
+		fields = [f.strip() for f in line.split("|")]
+		if len(fields) == 3 and fields[2] == "pySde" :
+			return int(fields[1]) / 1000.0
+	return None
+
+def loaded(code) :
+	"""The extractor packages that are imported after running the code"""
+	result = run(code + "\nimport sys\nprint(' '.join([m for m in %r if m in sys.modules]))" % list(extractors.keys()))
+	return result.stdout.split()
+
+budget = 300
+runs   = 5
+
+try :
+	opts, value = getopt.getopt(sys.argv[1:],"b:r:")
+	for o,a in opts:
+		if o == "-b" :
+			budget = float(a)
+		elif o == "-r" :
+			runs = int(a)
+		else :
+			usage()
+			sys.exit(1)
+except :
+	usage()
+	sys.exit(1)
+
+failures = 0
+
+best = min([import_time(run(startup).stderr) for _ in range(runs)])
+if best <= budget :
+	print("import time: %.1f ms (budget: %.1f ms) OK" % (best, budget))
+else :
+	failures += 1
+	print("import time: %.1f ms (budget: %.1f ms) OVER BUDGET" % (best, budget))
+
+packages = loaded(startup)
+if len(packages) == 0 :
+	print("extractors imported at startup: none OK")
+else :
+	failures += 1
+	print("extractors imported at startup: %s WRONG" % ", ".join(packages))
+
+for selection in ["rdfa", "microdata", "hturtle"] :
+	code = "%s\nimport io\npySde(options = SDEOptions(rdfa = %s, microdata = %s, hturtle = %s)).graph_from_source(io.BytesIO(%r))" % (
+		startup, selection == "rdfa", selection == "microdata", selection == "hturtle", page.encode("utf-8"))
+	packages = loaded(code)
+	unexpected = [p for p in packages if extractors[p] != selection]
+	if len(unexpected) == 0 :
+		print("extractors imported for %-10s: %s OK" % (selection, ", ".join(packages) if len(packages) > 0 else "none"))
+	else :
+		failures += 1
+		print("extractors imported for %-10s: %s WRONG" % (selection, ", ".join(packages)))
+
+sys.exit(1 if failures > 0 else 0)
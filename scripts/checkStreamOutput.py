@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Check of the streaming output of several sources (see L{pySde.stream_from_sources}): generated pages (files, and one
+file-like object) are distilled into a sink in N-Triples, N-Quads, and Turtle, and the output is compared (modulo blank
+node renaming) with the one of L{pySde.rdf_from_sources}. For the line based formats, the triples of each source must be
+in the sink before the next source is processed, and no merged graph must be built; in N-Quads each source must be in
+its own named graph (see L{graph_name}), the same as its direct distillation. The exit code is 1 if any of the checks
+fails.
+"""
+
+import sys, os, io, shutil, tempfile
+
+from rdflib import Graph, Dataset, BNode
+from rdflib.compare import isomorphic
+
+import pySde as pySde_module
+from pySde.options import SDEOptions
+from pySde import pySde, graph_name
+
+###########################################
+
+usageText="""Usage: %s [number of pages]
+"""
+
+if len(sys.argv) > 2 or (len(sys.argv) > 1 and not sys.argv[1].isdigit()) :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+pages = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+def generate_page(i) :
+	return ("""<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Page %s</title></head><body>
+<div about="#item" typeof="ex:Item"><span property="ex:name">Item %s</span></div>
+<div typeof="ex:Thing"><span property="ex:name">Blank node %s</span></div>
+<script type="text/turtle">@prefix ex: <http://example.org/ns#> . <http://example.org/turtle%s> ex:p "turtle %s" .</script>
+</body></html>
+""" % (i, i, i, i, i)).encode("utf-8")
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+merges = []
+original_merge = pySde_module._merge
+def counting_merge(graph, source_graph) :
+	merges.append(source_graph)
+	return original_merge(graph, source_graph)
+pySde_module._merge = counting_merge
+
+def processor() :
+	return pySde(options = SDEOptions(microdata = False))
+
+def sources() :
+	"""The file names, and a file-like object"""
+	return files + [io.BytesIO(extra)]
+
+def streamed(names, sink) :
+	"""The sources, recording the size of the sink when each source is taken, ie, after the previous one is written"""
+	for name in names :
+		sizes.append(len(sink.getvalue()))
+		yield name
+
+work = tempfile.mkdtemp()
+try :
+	files = []
+	for i in range(pages) :
+		files.append(os.path.join(work, "page%s.html" % i))
+		with open(files[-1], "wb") as f :
+			f.write(generate_page(i))
+	extra = generate_page(pages)
+
+	reference = Graph().parse(data = processor().rdf_from_sources(sources(), "nt"), format = "nt")
+
+	for (outputFormat, sink) in [("nt", io.BytesIO()), ("nquads", io.BytesIO())] :
+		(sizes, merges[:]) = ([], [])
+		processor().stream_from_sources(streamed(sources(), sink), sink, outputFormat)
+		check("%s: no merged graph" % outputFormat, len(merges) == 0)
+		check("%s: each source written before the next one" % outputFormat, all([sizes[i] < sizes[i + 1] for i in range(len(sizes) - 1)]))
+		if outputFormat == "nt" :
+			graph = Graph().parse(data = sink.getvalue(), format = "nt")
+			check("nt: same graph as rdf_from_sources", isomorphic(graph, reference))
+		else :
+			dataset = Dataset()
+			dataset.parse(data = sink.getvalue(), format = "nquads")
+			direct  = processor()
+			check("nquads: one named graph per file", all([isomorphic(dataset.graph(graph_name(f)), direct.graph_from_source(f)) for f in files]))
+			contexts = [g for g in dataset.contexts() if isinstance(g.identifier, BNode) and len(g) > 0]
+			check("nquads: a blank node graph for the file-like object", len(contexts) == 1 and isomorphic(contexts[0], direct.graph_from_source(io.BytesIO(extra))))
+			merged = Graph()
+			for g in dataset.contexts() :
+				merged += g
+			check("nquads: same triples as rdf_from_sources", isomorphic(merged, reference))
+
+	for (label, sink) in [("turtle, binary sink", io.BytesIO()), ("turtle, text sink", io.StringIO())] :
+		processor().stream_from_sources(sources(), sink, "turtle")
+		check("%s: same graph as rdf_from_sources" % label, isomorphic(Graph().parse(data = sink.getvalue(), format = "turtle"), reference))
+finally :
+	shutil.rmtree(work)
+
+sys.exit(1 if failures > 0 else 0)
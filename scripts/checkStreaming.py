@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Check of the streaming responses (see L{streaming}): a large page is distilled through L{pySde.processURI} and through
+its streaming counterpart L{pySde.processURI_chunks}, for several serialization formats. The two outputs are compared
+(modulo blank node renaming), and the time to the first byte of the serialization, the total time, and the number of
+chunks are printed. The exit code is 1 if the outputs differ.
+"""
+
+import sys, getopt, time
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from pySde import processURI, processURI_chunks
+from pySde.wsgi import Form
+
+###########################################
+
+usageText="""Usage: %s -[s:c:]
+where:
+  -s: number of items on the generated page (default: 5000)
+  -c: chunk size, in bytes (default: 65536)
+"""
+
+def usage() :
+	print(usageText % sys.argv[0])
+
+def generate_page(size) :
+	items = "\n".join(['<div about="http://www.example.org/item/%s" typeof="ex:Item"><span property="ex:label">Item %s</span>'
+					   '<a rel="ex:next" href="http://www.example.org/item/%s">next</a></div>' % (i, i, i + 1) for i in range(size)])
+	return '<html prefix="ex: http://www.example.org/terms/"><body>\n%s\n</body></html>' % items
+
+def form(page, outputFormat) :
+	"""A form with the page as text input, as posted to the service"""
+	import urllib.parse
+	body = urllib.parse.urlencode([("text", page), ("format", outputFormat), ("source", "rdfa")]).encode("utf-8")
+	from io import BytesIO
+	return Form({ "REQUEST_METHOD" : "POST", "CONTENT_LENGTH" : str(len(body)), "wsgi.input" : BytesIO(body) })
+
+size       = 5000
+chunk_size = 65536
+
+try :
+	opts, value = getopt.getopt(sys.argv[1:],"s:c:")
+	for o,a in opts:
+		if o == "-s" :
+			size = int(a)
+		elif o == "-c" :
+			chunk_size = int(a)
+		else :
+			usage()
+			sys.exit(1)
+except :
+	usage()
+	sys.exit(1)
+
+page     = generate_page(size)
+failures = 0
+for (outputFormat, parse_format) in [("turtle", "turtle"), ("nt", "nt"), ("pretty-xml", "xml")] :
+	start    = time.perf_counter()
+	response = processURI("text:", outputFormat, form(page, outputFormat))
+	total    = time.perf_counter() - start
+
+	start  = time.perf_counter()
+	chunks = processURI_chunks("text:", outputFormat, form(page, outputFormat), chunk_size = chunk_size)
+	header = next(chunks)
+	first  = next(chunks)
+	ttfb   = time.perf_counter() - start
+	rest   = [first] + list(chunks)
+	body   = b"".join(rest)
+	stream_total = time.perf_counter() - start
+
+	expected = Graph().parse(data = response.partition("\n\n")[2], format = parse_format)
+	graph    = Graph().parse(data = body, format = parse_format)
+	same     = isomorphic(graph, expected)
+	if not same :
+		failures += 1
+	print("%-10s processURI: %.3fs; processURI_chunks: first byte after %.3fs, %.3fs in total, %s chunks of at most %s bytes; %s (%s triples)" % (
+		outputFormat, total, ttfb, stream_total, len(rest), max([len(c) for c in rest]), "OK" if same else "DIFFERENT", len(graph)))
+
+sys.exit(1 if failures > 0 else 0)
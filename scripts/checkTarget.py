@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Check of the targets (see L{target}): generated pages are stored into an rdflib graph through L{target.GraphTarget}, and
+merged by L{pySde.rdf_from_sources} into a given graph. The triples must be the same (modulo blank node renaming) as in
+the graph of L{pySde.rdf_from_sources} without a target graph, and added in batches of the given size; the namespace
+bindings of the target graph must not be overridden. With named graphs, each source must be in its own graph (see
+L{graph_name}). A transaction aware store must get a commit per source. A subclass of L{target.Target} without an
+C{add} method must not be instantiable. The exit code is 1 if any of the checks fails.
+"""
+
+import sys, os, io, shutil, tempfile
+
+from rdflib import Graph, Dataset, Namespace, URIRef
+from rdflib.compare import isomorphic
+from rdflib.plugins.stores.memory import Memory
+
+from pySde.options import SDEOptions
+from pySde.target  import Target, GraphTarget
+from pySde import pySde, graph_name
+
+###########################################
+
+usageText="""Usage: %s [number of pages]
+"""
+
+if len(sys.argv) > 2 or (len(sys.argv) > 1 and not sys.argv[1].isdigit()) :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+pages = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+def generate_page(i) :
+	items = "\n".join(['<div about="#item%s" typeof="ex:Item"><span property="ex:name">Item %s of page %s</span></div>' % (j, j, i) for j in range(20)])
+	return ("""<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>Page %s</title></head><body>
+%s
+<div typeof="ex:Thing"><span property="ex:name">Blank node of page %s</span></div>
+</body></html>
+""" % (i, items, i)).encode("utf-8")
+
+class CountingStore(Memory) :
+	"""A transaction aware memory store, recording the commits and the size of the C{addN} batches"""
+	transaction_aware = True
+	def __init__(self, *args, **kwargs) :
+		Memory.__init__(self, *args, **kwargs)
+		(self.commits, self.batches) = (0, [])
+
+	def addN(self, quads) :
+		quads = list(quads)
+		self.batches.append(len(quads))
+		Memory.addN(self, quads)
+
+	def commit(self) :
+		self.commits += 1
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+def processor() :
+	return pySde(options = SDEOptions(microdata = False))
+
+work = tempfile.mkdtemp()
+try :
+	files = []
+	for i in range(pages) :
+		files.append(os.path.join(work, "page%s.html" % i))
+		with open(files[-1], "wb") as f :
+			f.write(generate_page(i))
+	reference = Graph().parse(data = processor().rdf_from_sources(files, "nt"), format = "nt")
+
+	# A graph target, with small batches
+	graph = Graph(store = CountingStore())
+	graph.bind("ex", Namespace("http://example.org/other#"))
+	with GraphTarget(graph, batch_size = 8) as target :
+		count = processor().store_from_sources(files, target)
+	check("graph target: same graph as rdf_from_sources", isomorphic(graph, reference))
+	check("graph target: number of triples", count == len(reference) and target.triples == count)
+	check("graph target: batches of the given size", max(graph.store.batches) == 8 and sum(graph.store.batches) == count)
+	check("graph target: a commit per source, and at the end", graph.store.commits == pages + 1)
+	check("graph target: bindings not overridden", dict(graph.namespaces())["ex"] == URIRef("http://example.org/other#"))
+
+	# Named graphs
+	dataset = Dataset()
+	with GraphTarget(dataset, named_graphs = True) as target :
+		processor().store_from_sources(files, target)
+	direct = processor()
+	check("named graphs: one graph per source", all([isomorphic(dataset.graph(graph_name(f)), direct.graph_from_source(f)) for f in files]))
+	check("named graphs: nothing in the default graph", len(dataset.default_context) == 0)
+
+	# rdf_from_sources into a given graph
+	graph  = Graph(store = CountingStore())
+	output = processor().rdf_from_sources(files, "nt", graph = graph)
+	check("rdf_from_sources(graph): the triples in the graph", isomorphic(graph, reference))
+	check("rdf_from_sources(graph): same serialization", isomorphic(Graph().parse(data = output, format = "nt"), reference))
+	check("rdf_from_sources(graph): in batches", len(graph.store.batches) == pages)
+	output = processor().rdf_from_sources(files, "nt", workers = 2, graph = Graph())
+	check("rdf_from_sources(graph), 2 workers: same serialization", isomorphic(Graph().parse(data = output, format = "nt"), reference))
+
+	# The interface
+	class Incomplete(Target) :
+		pass
+	try :
+		Incomplete()
+		check("Target without add: not instantiable", False)
+	except TypeError :
+		check("Target without add: not instantiable", True)
+finally :
+	shutil.rmtree(work)
+
+sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Check of the vocabulary expansion with the vocabulary cache (see L{vocab.VocabCache}). A small vocabulary is served by
+a local HTTP server, which counts the requests; pages using it (via C{@vocab}) are distilled with the vocabulary
+expansion, and the result is compared (modulo blank node renaming) with the expansion done the way pyRdfa does it
+(see C{pyRdfa.rdfs.process.process_rdfa_sem}, which cannot be used directly with some pyRdfa releases). The
+vocabulary must be retrieved only once for all the pages, not at all if it is preloaded or on the disk, and again
+after its time-to-live. The time spent per page, with and without the cache, is printed. The exit code is 1 if any of
+the checks fails.
+"""
+
+import sys, os, io, time, shutil, tempfile, threading
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from rdflib.compare import isomorphic
+
+from pySde.options import SDEOptions
+from pySde.vocab   import VocabCache
+from pySde import pySde
+
+###########################################
+
+usageText="""Usage: %s [number of pages]
+"""
+
+if len(sys.argv) > 2 or (len(sys.argv) > 1 and not sys.argv[1].isdigit()) :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+vocabulary = """@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix owl:  <http://www.w3.org/2002/07/owl#> .
+@prefix ex:   <%s> .
+ex:Book        rdfs:subClassOf ex:CreativeWork .
+ex:CreativeWork rdfs:subClassOf ex:Thing .
+ex:author      rdfs:subPropertyOf ex:creator .
+ex:creator     rdfs:subPropertyOf ex:contributor .
+ex:writer      owl:equivalentProperty ex:author .
+ex:title       owl:equivalentProperty ex:name .
+"""
+
+class Counter :
+	requests = 0
+	lock     = threading.Lock()
+
+class Handler(BaseHTTPRequestHandler) :
+	def do_GET(self) :
+		with Counter.lock :
+			Counter.requests += 1
+		self.send_response(200)
+		self.send_header("Content-Type", "text/turtle")
+		self.send_header("Content-Length", str(len(vocabulary)))
+		self.end_headers()
+		self.wfile.write(vocabulary)
+
+	def log_message(self, *args) :
+		pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+threading.Thread(target = server.serve_forever, daemon = True).start()
+vocab_uri = "http://127.0.0.1:%s/vocab#" % server.server_address[1]
+vocabulary = (vocabulary % vocab_uri).encode("utf-8")
+
+def page(i) :
+	return """<!DOCTYPE html><html><head><title>Book %s</title></head><body vocab="%s">
+<div typeof="Book" resource="#book%s"><span property="title">Title %s</span>
+<span property="writer">Author %s</span><span property="author">Other %s</span></div>
+</body></html>""" % (i, vocab_uri, i, i, i, i)
+
+def reference(data) :
+	"""The expansion of pyRdfa, with the vocabulary retrieved for the page"""
+	from rdflib              import Graph
+	from pyRdfa              import pyRdfa, RDFA_VOCAB
+	from pyRdfa.options      import Options
+	from pyRdfa.host         import HostLanguage
+	from pyRdfa.rdfs.process import MiniOWL, return_graph
+	options = Options(embedded_rdf = False)
+	options.set_host_language(HostLanguage.html5)
+	graph = pyRdfa(options, "http://example.org/page").graph_from_source(io.BytesIO(data.encode("utf-8")))
+	vocab_graph = Graph()
+	for v in set(graph.objects(None, RDFA_VOCAB)) :
+		(v_graph, expiration_date) = return_graph(str(v), options)
+		if v_graph != None :
+			for t in v_graph :
+				vocab_graph.add(t)
+	MiniOWL(vocab_graph, schema_semantics = True).closure()
+	for t in vocab_graph :
+		graph.add(t)
+	MiniOWL(graph).closure()
+	for t in vocab_graph :
+		graph.remove(t)
+	return graph
+
+def distill(processor, data) :
+	return processor.graph_from_source(io.BytesIO(data.encode("utf-8")))
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+work    = tempfile.mkdtemp()
+options = SDEOptions(microdata = False, hturtle = False, vocab_expansion = True)
+try :
+	data      = [page(i) for i in range(pages)]
+	start     = time.perf_counter()
+	expected  = [reference(d) for d in data]
+	uncached  = (time.perf_counter() - start) / pages
+	check("vocabulary retrieved for each page without the cache", Counter.requests == pages)
+
+	# Memory cache
+	Counter.requests = 0
+	processor = pySde(base = "http://example.org/page", options = options, vocab_cache = VocabCache())
+	start     = time.perf_counter()
+	graphs    = [distill(processor, d) for d in data]
+	cached    = (time.perf_counter() - start) / pages
+	check("memory cache: same graphs", all([isomorphic(g, r) for (g, r) in zip(graphs, expected)]))
+	check("memory cache: retrieved once", Counter.requests == 1 and processor.vocab_cache.misses == 1)
+	print("%.2f ms per page with the vocabulary retrieved for each page, %.2f ms with the cache" % (1000 * uncached, 1000 * cached))
+
+	# Disk cache, used by a second cache
+	Counter.requests = 0
+	directory = os.path.join(work, "vocabs")
+	distill(pySde(base = "http://example.org/page", options = options, vocab_cache = VocabCache(directory)), data[0])
+	processor = pySde(base = "http://example.org/page", options = options, vocab_cache = VocabCache(directory))
+	check("disk cache: same graph", isomorphic(distill(processor, data[0]), expected[0]))
+	check("disk cache: retrieved once", Counter.requests == 1)
+
+	# Time-to-live
+	Counter.requests = 0
+	processor = pySde(base = "http://example.org/page", options = options, vocab_cache = VocabCache(ttl = 0.5))
+	distill(processor, data[0])
+	distill(processor, data[1])
+	time.sleep(0.6)
+	check("time-to-live: same graph after expiration", isomorphic(distill(processor, data[2]), expected[2]))
+	check("time-to-live: retrieved again after expiration", Counter.requests == 2)
+
+	# Preloaded
+	Counter.requests = 0
+	fname = os.path.join(work, "vocab.ttl")
+	with open(fname, "wb") as f :
+		f.write(vocabulary)
+	cache = VocabCache()
+	cache.preload(vocab_uri, fname)
+	processor = pySde(base = "http://example.org/page", options = options, vocab_cache = cache)
+	check("preloaded: same graphs", all([isomorphic(distill(processor, d), r) for (d, r) in zip(data, expected)]))
+	check("preloaded: never retrieved", Counter.requests == 0)
+finally :
+	server.shutdown()
+	shutil.rmtree(work)
+
+sys.exit(1 if failures > 0 else 0)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Check of the WSGI application (see L{wsgi}), called directly, as a test client would, with hand made WSGI environments:
+the requests without a URI or a referer, and the URIs that are not http or https, must be rejected (400); the metrics
+must be served on C{/metrics}; the text and uploaded inputs (as POST requests), and a page served by a local HTTP server,
+must give the same graph (modulo blank node renaming) as L{pySde.processURI}. The exit code is 1 if any of the checks
+fails.
+"""
+
+import sys, os, io, threading, functools, urllib.parse, tempfile, shutil
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from wsgiref.util import setup_testing_defaults
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from pySde.wsgi    import make_application, Form
+from pySde.metrics import Metrics
+from pySde import processURI
+
+###########################################
+
+usageText="""Usage: %s
+"""
+
+if len(sys.argv) > 1 :
+	print(usageText % sys.argv[0])
+	sys.exit(1)
+
+page = """<!DOCTYPE html><html prefix="ex: http://example.org/ns#"><head><title>WSGI check</title></head><body>
+<div about="http://example.org/item" typeof="ex:Item"><span property="ex:name">Item</span></div>
+<script type="text/turtle">@prefix ex: <http://example.org/ns#> . <http://example.org/other> ex:p "turtle" .</script>
+</body></html>
+"""
+
+class QuietHandler(SimpleHTTPRequestHandler) :
+	def log_message(self, *args) :
+		pass
+
+def environ(path = "/", query = "", method = "GET", body = b"", content_type = "application/x-www-form-urlencoded", referer = None) :
+	retval = { "PATH_INFO" : path, "QUERY_STRING" : query, "REQUEST_METHOD" : method }
+	if method == "POST" :
+		retval.update({ "CONTENT_TYPE" : content_type, "CONTENT_LENGTH" : str(len(body)), "wsgi.input" : io.BytesIO(body) })
+	if referer != None :
+		retval["HTTP_REFERER"] = referer
+	setup_testing_defaults(retval)
+	return retval
+
+def call(app, env) :
+	"""Call the application; return the status code, the headers, and the body"""
+	response = {}
+	def start_response(status, headers) :
+		response["status"]  = int(status.split()[0])
+		response["headers"] = dict(headers)
+	body = b"".join(app(env, start_response))
+	return (response["status"], response["headers"], body)
+
+def reference(uri, env) :
+	"""The body of the processURI response for the same request"""
+	return processURI(uri, "turtle", Form(env)).partition("\n\n")[2]
+
+def same_graph(body, expected) :
+	"""Whether the body and the expected output are the same graph, with the triples of both extractors"""
+	graph = Graph().parse(data = body.decode("utf-8"), format = "turtle")
+	return len(graph) == 3 and isomorphic(graph, Graph().parse(data = expected, format = "turtle"))
+
+failures = 0
+def check(label, ok) :
+	global failures
+	print("%-60s %s" % (label, "OK" if ok else "FAILED"))
+	if not ok :
+		failures += 1
+
+site = tempfile.mkdtemp()
+with open(os.path.join(site, "page.html"), "w") as f :
+	f.write(page)
+server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory = site))
+threading.Thread(target = server.serve_forever, daemon = True).start()
+uri = "http://127.0.0.1:%s/page.html" % server.server_address[1]
+
+try :
+	metrics = Metrics()
+	app     = make_application(metrics = metrics)
+	sources = "source=rdfa&source=hturtle"
+
+	(status, headers, body) = call(app, environ())
+	check("no URI: 400", status == 400)
+	(status, headers, body) = call(app, environ(query = "uri=referer"))
+	check("no referer: 400", status == 400)
+	(status, headers, body) = call(app, environ(query = "uri=referer", referer = uri))
+	check("referer: redirected", status == 307 and headers.get("Location") == "?uri=" + urllib.parse.quote(uri, safe = ""))
+	for forbidden in ["file:///etc/passwd", "/etc/passwd", "ftp://example.org/page.html"] :
+		(status, headers, body) = call(app, environ(query = urllib.parse.urlencode({ "uri" : forbidden })))
+		check("%s: 400" % forbidden, status == 400)
+
+	# Text input, in a URL encoded POST
+	data = urllib.parse.urlencode({ "text" : page, "source" : ["rdfa", "hturtle"] }, doseq = True).encode("utf-8")
+	(status, headers, body) = call(app, environ(method = "POST", body = data))
+	check("text POST: 200, turtle", status == 200 and headers.get("Content-Type", "").startswith("text/turtle"))
+	check("text POST: same as processURI", same_graph(body, reference("text:", environ(method = "POST", body = data))))
+
+	# Uploaded file, in a multipart POST
+	boundary = "----sdecheck"
+	data = ("--%s\r\nContent-Disposition: form-data; name=\"uploaded\"; filename=\"page.html\"\r\nContent-Type: text/html\r\n\r\n%s\r\n"
+			"--%s\r\nContent-Disposition: form-data; name=\"source\"\r\n\r\nrdfa\r\n"
+			"--%s\r\nContent-Disposition: form-data; name=\"source\"\r\n\r\nhturtle\r\n--%s--\r\n" % (boundary, page, boundary, boundary, boundary)).encode("utf-8")
+	content_type = "multipart/form-data; boundary=%s" % boundary
+	(status, headers, body) = call(app, environ(method = "POST", body = data, content_type = content_type))
+	check("uploaded POST: 200", status == 200)
+	check("uploaded POST: same as processURI", same_graph(body, reference("uploaded:", environ(method = "POST", body = data, content_type = content_type))))
+
+	# A URI
+	query = "uri=%s&%s" % (urllib.parse.quote(uri, safe = ""), sources)
+	(status, headers, body) = call(app, environ(query = query))
+	check("URI: 200", status == 200)
+	check("URI: same as processURI", same_graph(body, reference(uri, environ(query = query))))
+	(status, headers, body) = call(app, environ(query = "uri=%s&%s" % (urllib.parse.quote(uri + ".missing", safe = ""), sources)))
+	check("missing URI: 404", status == 404)
+
+	# Metrics
+	(status, headers, body) = call(app, environ(path = "/metrics"))
+	check("/metrics: 200, Prometheus text", status == 200 and headers.get("Content-Type", "").startswith("text/plain") and b"rdfa" in body)
+	(status, headers, body) = call(make_application(), environ(path = "/metrics"))
+	check("/metrics without metrics: 400", status == 400)
+finally :
+	server.shutdown()
+	shutil.rmtree(site)
+
+sys.exit(1 if failures > 0 else 0)
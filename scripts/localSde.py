@@ -17,7 +17,7 @@ from pySde import pySde
 ###########################################
 
 
-usageText="""Usage: %s -[armsvxtjnpb:] [filename[s]]
+usageText="""Usage: %s -[armsvxtjnqpPcb:w:e:i:l:S:d:o:k:V:L:] [filename[s]]
 where:
   -r: distill RDFa
   -m: distill Microdata
@@ -27,9 +27,26 @@ where:
   -t: output format Turtle (default)
   -j: output format JSON-LD
   -n: output format N Triples
+  -q: output format N Quads, each file in its own named graph
   -p: output format pretty RDF/XML
   -b: give the base URI; if a file name is given, this can be left empty and the file name is used
   -v: (in case RDFa is used) expand vocabularies
+  -V: directory of the on-disk vocabulary cache, used with -v; the vocabularies are retrieved only once a day
+  -L: vocabulary preloaded from a local file, in the form 'URI=filename', used with -v; can be repeated
+  -w: number of parallel workers used to process the files (default: 1, ie, sequential processing)
+  -P: use separate processes (instead of threads) for the parallel workers
+  -c: run the extractors concurrently on each file, in separate processes (useful for large files)
+  -e: CSS selector (e.g., '#product' or 'head'); only the matching parts of the pages are distilled
+  -i: manifest directory for an incremental run: only the files changed since the previous run are distilled, and
+      the triples added and removed are written in the RDF Patch format (with -q, each file in its own named graph)
+
+Batch mode (for the crawl of a site):
+  -l: file with a list of URIs (or file names), one per line
+  -S: URI or file name of a sitemap (or of a sitemap index)
+  -d: directory for the output, one file per source, in the chosen format
+  -o: file for the output, in N-Quads, each source in its own named graph (instead of -d)
+  -k: checkpoint file; an interrupted run is resumed by running the same command again
+  The -w and -P options set the number of parallel workers; a summary is printed on the standard error at the end.
 
 'Filename' can be a local file name or a URI. In case there is no filename, stdin is used.
 
@@ -44,9 +61,21 @@ rdfa         = False
 microdata    = False
 hturtle      = False
 vocab_expand = False
+workers      = 1
+processes    = False
+region       = None
+concurrent   = False
+manifest     = None
+uri_list     = None
+sitemap      = None
+directory    = None
+sink         = None
+checkpoint   = None
+vocab_dir    = None
+vocab_files  = []
 
 try :
-	opts, value = getopt.getopt(sys.argv[1:],"armsvxtjnpb:")
+	opts, value = getopt.getopt(sys.argv[1:],"armsvxtjnqpPcb:w:e:i:l:S:d:o:k:V:L:")
 	for o,a in opts:
 		if o == "-t" :
 			format = "turtle"
@@ -54,6 +83,8 @@ try :
 			format = "json-ld"
 		elif o == "-n" :
 			format = "nt"
+		elif o == "-q" :
+			format = "nquads"
 		elif o == "-p" or o == "-x":
 			format = "pretty-xml"
 		elif o == "-b" :
@@ -68,6 +99,32 @@ try :
 			rdfa = microdata = hturtle = True
 		elif o == "-v" :
 			vocab_expand = True
+		elif o == "-w" :
+			workers = int(a)
+		elif o == "-P" :
+			processes = True
+		elif o == "-c" :
+			concurrent = True
+		elif o == "-e" :
+			region = a
+		elif o == "-i" :
+			manifest = a
+		elif o == "-l" :
+			uri_list = a
+		elif o == "-S" :
+			sitemap = a
+		elif o == "-d" :
+			directory = a
+		elif o == "-o" :
+			sink = a
+		elif o == "-k" :
+			checkpoint = a
+		elif o == "-V" :
+			vocab_dir = a
+		elif o == "-L" :
+			if "=" not in a :
+				raise getopt.GetoptError("-L should be of the form URI=filename")
+			vocab_files.append(tuple(a.rsplit("=", 1)))
 		else :
 			usage()
 			sys.exit(1)
@@ -75,10 +132,52 @@ except :
 	usage()
 	sys.exit(1)
 
-options = SDEOptions(hturtle=hturtle, rdfa = rdfa, microdata = microdata, vocab_expansion = vocab_expand)
+options = SDEOptions(hturtle=hturtle, rdfa = rdfa, microdata = microdata, vocab_expansion = vocab_expand, region = region,
+					 parallel_extractors = concurrent)
 processor = pySde(base, options)
 
-if len(value) >= 1 :
-	print(processor.rdf_from_sources(value, outputFormat = format))
+if vocab_dir != None or len(vocab_files) > 0 :
+	from pySde.vocab import VocabCache
+	processor.vocab_cache = VocabCache(vocab_dir)
+	for (uri, fname) in vocab_files :
+		processor.vocab_cache.preload(uri, fname)
+
+if uri_list != None or sitemap != None :
+	from pySde.crawl import read_uri_list, read_sitemap, crawl
+	from pySde.fetch import PooledHTTPFetcher
+	# URIOpener returns the body of an HTTP error response as content, whereas errors should be reported as such in a
+	# crawl; also, the connections to the site are kept open between the sources
+	processor.fetcher = PooledHTTPFetcher()
+	if (directory == None) == (sink == None) :
+		print("Exactly one of -d and -o should be given in batch mode", file = sys.stderr)
+		sys.exit(1)
+	sources = value + (read_uri_list(uri_list) if uri_list != None else []) + (read_sitemap(sitemap, processor.fetcher) if sitemap != None else [])
+
+	def progress(name, summary) :
+		if summary.sources % 100 == 0 :
+			print("%s sources distilled..." % summary.sources, file = sys.stderr)
+
+	summary = crawl(processor, sources, outputFormat = format, directory = directory, sink = sink, checkpoint = checkpoint,
+					workers = workers, processes = processes, progress = progress)
+	print(summary, file = sys.stderr)
+elif len(value) >= 1 and manifest != None :
+	from pySde.incremental import Manifest, changes_from_sources, write_patch
+
+	def report(changes) :
+		for change in changes :
+			if change.status == "error" :
+				print("%s could not be distilled; its previous triples are kept" % change.name, file = sys.stderr)
+			yield change
+
+	manifest = Manifest(manifest)
+	write_patch(report(changes_from_sources(processor, value, manifest, rdfOutput = True)), sys.stdout,
+				named_graphs = format == "nquads", manifest = manifest)
+elif len(value) >= 1 and format in ["nt", "nquads"] :
+	# Line based formats are written out file by file, without building a global graph
+	processor.stream_from_sources(value, sys.stdout, outputFormat = format, workers = workers, processes = processes)
+elif len(value) >= 1 :
+	print(processor.rdf_from_sources(value, outputFormat = format, workers = workers, processes = processes))
+elif format in ["nt", "nquads"] :
+	processor.stream_from_sources([sys.stdin], sys.stdout, outputFormat = format)
 else :
 	print(processor.rdf_from_source(sys.stdin, outputFormat = format))